@@ -0,0 +1,234 @@
+"""Veri sürümüne bağlı, diskte kalıcı cevap önbelleği.
+
+Anahtar: (niyet, normalize edilmiş soru, data/*.json içerik hash'i). Birebir
+eşleşme yoksa aynı niyet ve veri sürümündeki önceki soruların embedding'leri
+arasında benzerlik araması yapılır ("Luka Doncic average points" ~ "what's
+Luka's PPG"). Benzer soru ancak aynı imzayı (ismi geçen kayıtlar, sayılar,
+istatistik, toplam/ortalama ve sıralama yönü) taşıyorsa kabul edilir; "Jokic
+rebounds" ile "Embiid rebounds" ya da "over 20 points" ile "over 25 points"
+birbirinin cevabını almaz. Fetch scriptleri yeni veri yazınca hash değişir ve eski cevaplar
+kendiliğinden geçersiz olur.
+"""
+import glob
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+from stats_engine import _ASCENDING, _RAW_STAT_PATTERNS, STAT_PATTERNS
+from text_utils import fold_text
+
+_version_cache = {}
+
+
+def data_version(data_dir):
+    """data/*.json dosyalarının içerik hash'i. Dosya değişmedikçe tekrar okunmaz."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        st = os.stat(path)
+        key = (path, st.st_mtime_ns, st.st_size)
+        file_hash = _version_cache.get(key)
+        if file_hash is None:
+            with open(path, "rb") as f:
+                file_hash = hashlib.sha256(f.read()).hexdigest()
+            _version_cache[key] = file_hash
+        digest.update(os.path.basename(path).encode("utf-8"))
+        digest.update(file_hash.encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def normalize_query(query):
+    return fold_text(query)
+
+
+def query_signature(query, entity_ids=()):
+    """Benzer soru eşleşmesinde birebir aynı olması gereken parçalar: kayıt ID'leri, sayılar,
+    istatistikler, toplam/ortalama ve artan/azalan sıralama."""
+    folded = fold_text(query)
+    numbers = [f"{float(n):g}" for n in re.findall(r"\d+(?:[.,]\d+)?", query.replace(",", "."))]
+    stats = {stat for pattern, stat in STAT_PATTERNS if re.search(pattern, folded)}
+    stats.update(stat for pattern, stat in _RAW_STAT_PATTERNS if re.search(pattern, query))
+    parts = [
+        ",".join(sorted(set(entity_ids))),
+        ",".join(sorted(numbers)),
+        ",".join(sorted(stats)),
+        "total" if re.search(r"\b(total|totals|toplam\w*)\b", folded) else "",
+        "asc" if re.search(_ASCENDING, folded) else "",
+    ]
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+class AnswerCache:
+    def __init__(self, path, similarity_threshold=0.95, max_entries=5000,
+                 ttl_seconds=7 * 24 * 3600, clock=time.time, entity_matcher=None):
+        # entity_matcher(soru) -> kayıt ID listesi (runtime'da entity_index); imzaya girer
+        self.path = path
+        self.entity_matcher = entity_matcher
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._vectors = {}  # (niyet, sürüm, imza) -> (anahtarlar, normalize matris)
+        self.counts = Counter()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS answers (
+                key TEXT PRIMARY KEY,
+                intent TEXT NOT NULL,
+                query TEXT NOT NULL,
+                data_version TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                context_ids TEXT NOT NULL,
+                embedding BLOB,
+                created REAL NOT NULL,
+                last_used REAL NOT NULL,
+                signature TEXT
+            )""")
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(answers)")}
+        if "signature" not in columns:
+            # Eski kayıtların imzası yok (NULL): sadece birebir eşleşmeyle kullanılırlar
+            self._db.execute("ALTER TABLE answers ADD COLUMN signature TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_version ON answers (data_version, intent)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self._db.commit()
+
+    @staticmethod
+    def make_key(intent, query, version):
+        return hashlib.sha256(f"{intent}\n{version}\n{normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def _row_to_entry(self, row, match):
+        return {
+            "answer": row[0],
+            "context_ids": json.loads(row[1]),
+            "query": row[2],
+            "match": match,
+        }
+
+    def signature(self, query):
+        entity_ids = self.entity_matcher(query) if self.entity_matcher is not None else ()
+        return query_signature(query, entity_ids)
+
+    def _similar_key(self, intent, version, signature, query_vector):
+        cached = self._vectors.get((intent, version, signature))
+        if cached is None:
+            rows = self._db.execute(
+                "SELECT key, embedding FROM answers WHERE intent = ? AND data_version = ? AND signature = ?"
+                " AND embedding IS NOT NULL",
+                (intent, version, signature)).fetchall()
+            keys = [r[0] for r in rows]
+            if rows:
+                matrix = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows])
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            else:
+                matrix = np.zeros((0, len(query_vector)), dtype=np.float32)
+            cached = (keys, matrix)
+            self._vectors[(intent, version, signature)] = cached
+        keys, matrix = cached
+        if not keys:
+            return None
+        vec = np.asarray(query_vector, dtype=np.float32)
+        sims = matrix @ (vec / max(float(np.linalg.norm(vec)), 1e-12))
+        best = int(np.argmax(sims))
+        if sims[best] >= self.similarity_threshold:
+            return keys[best]
+        return None
+
+    def lookup(self, intent, query, version, query_vector=None):
+        """Önbellekteki cevabı döndürür ya da None. query_vector verilirse benzerlik araması da yapılır."""
+        now = self._clock()
+        with self._lock:
+            key = self.make_key(intent, query, version)
+            match = "exact"
+            row = self._db.execute(
+                "SELECT answer, context_ids, query, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None and query_vector is not None:
+                key = self._similar_key(intent, version, self.signature(query), query_vector)
+                match = "similar"
+                if key is not None:
+                    row = self._db.execute(
+                        "SELECT answer, context_ids, query, created FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[3] > self.ttl_seconds:
+                self._delete([key])
+                row = None
+            if row is None:
+                self.counts["miss"] += 1
+                return None
+            self._db.execute("UPDATE answers SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.counts[f"hit_{match}"] += 1
+            return self._row_to_entry(row, match)
+
+    def store(self, intent, query, version, answer, context_ids, query_vector=None):
+        now = self._clock()
+        embedding = None
+        if query_vector is not None:
+            embedding = np.asarray(query_vector, dtype=np.float32).tobytes()
+        signature = self.signature(query)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO answers VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self.make_key(intent, query, version), intent, normalize_query(query), version,
+                 answer, json.dumps(list(context_ids)), embedding, now, now, signature))
+            self._vectors.pop((intent, version, signature), None)
+            self._evict()
+            self._db.commit()
+            self.counts["store"] += 1
+
+    def _delete(self, keys):
+        self._db.executemany("DELETE FROM answers WHERE key = ?", [(k,) for k in keys])
+        self._vectors.clear()
+
+    def _evict(self):
+        """max_entries aşılırsa en uzun süredir kullanılmayanlar (LRU) silinir."""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+        extra = count - self.max_entries
+        if extra > 0:
+            self._db.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used LIMIT ?)",
+                (extra,))
+            self._vectors.clear()
+            self.counts["evicted"] += extra
+
+    def purge(self, version):
+        """Başka veri sürümüne ait ya da süresi dolmuş kayıtları siler."""
+        with self._lock:
+            cur = self._db.execute(
+                "DELETE FROM answers WHERE data_version != ? OR created < ?",
+                (version, self._clock() - self.ttl_seconds))
+            self._db.commit()
+            self._vectors.clear()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM answers")
+            self._db.commit()
+            self._vectors.clear()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM answers").fetchone()
+        hits = self.counts["hit_exact"] + self.counts["hit_similar"]
+        lookups = hits + self.counts["miss"]
+        return {
+            "entries": entries,
+            "hits_exact": self.counts["hit_exact"],
+            "hits_similar": self.counts["hit_similar"],
+            "misses": self.counts["miss"],
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "evicted": self.counts["evicted"],
+        }
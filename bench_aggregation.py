@@ -0,0 +1,144 @@
+"""Eski saf Python lig özeti döngüsü ile league_engine'i sentetik veri üzerinde karşılaştırır.
+
+    python bench_aggregation.py --leagues 50 --weeks 25 --teams 12
+"""
+import argparse
+import json
+import random
+import time
+
+from league_engine import LeagueAggregator
+
+
+def synthetic_league(n_weeks, n_teams, rng):
+    raw = {}
+    for week in range(1, n_weeks + 1):
+        teams = []
+        for t in range(n_teams):
+            fga, fta = rng.randint(350, 480), rng.randint(80, 160)
+            teams.append({"team_name": f"Team {t + 1}", "stats": {
+                "FGM/A": f"{int(fga * rng.uniform(0.42, 0.52))}/{fga}", "FG%": "-",
+                "FTM/A": f"{int(fta * rng.uniform(0.7, 0.85))}/{fta}", "FT%": "-",
+                "3PTM": str(rng.randint(30, 80)), "PTS": str(rng.randint(400, 650)),
+                "REB": str(rng.randint(120, 230)), "AST": str(rng.randint(80, 160)),
+                "ST": str(rng.randint(20, 55)), "BLK": str(rng.randint(10, 45)), "TO": str(rng.randint(50, 90)),
+            }})
+        raw[f"week_{week}"] = teams
+    return raw
+
+
+def legacy_aggregate(raw_data):
+    """convert_to_avg_total.py'nin önceki hali (toplam + ortalama kısmı)."""
+    def parse_fraction(val):
+        try:
+            made, att = map(float, val.split('/'))
+            return made, att
+        except:
+            return 0.0, 0.0
+
+    team_aggregates = {}
+    for week_id, matchups in raw_data.items():
+        for team in matchups:
+            name = team["team_name"]
+            stats = team["stats"]
+            if name not in team_aggregates:
+                team_aggregates[name] = {"weeks_played": 0, "FGM": 0.0, "FGA": 0.0, "FTM": 0.0, "FTA": 0.0,
+                                         "3PTM": 0.0, "PTS": 0.0, "REB": 0.0, "AST": 0.0,
+                                         "ST": 0.0, "BLK": 0.0, "TO": 0.0}
+            agg = team_aggregates[name]
+            agg["weeks_played"] += 1
+            fgm, fga = parse_fraction(stats.get("FGM/A", "0/0"))
+            ftm, fta = parse_fraction(stats.get("FTM/A", "0/0"))
+            agg["FGM"] += fgm
+            agg["FGA"] += fga
+            agg["FTM"] += ftm
+            agg["FTA"] += fta
+            for k in ("3PTM", "PTS", "REB", "AST", "ST", "BLK", "TO"):
+                agg[k] += float(stats.get(k, 0))
+    summary = {}
+    for name, t in team_aggregates.items():
+        wp = t["weeks_played"]
+        summary[name] = {**{k: round(t[k] / wp, 2) for k in ("PTS", "REB", "AST", "ST", "BLK", "3PTM", "TO")},
+                         "FG%": round(t["FGM"] / t["FGA"], 3) if t["FGA"] > 0 else 0,
+                         "FT%": round(t["FTM"] / t["FTA"], 3) if t["FTA"] > 0 else 0}
+    return summary
+
+
+def timed(fn, repeat=1, setup=None):
+    """fn'in en iyi süresi (ms); setup verilirse her denemeden önce çağrılır, sonucu fn'e geçer."""
+    best, result = None, None
+    for _ in range(repeat):
+        arg = setup() if setup is not None else None
+        started = time.perf_counter()
+        result = fn(arg) if setup is not None else fn()
+        elapsed = round(1000 * (time.perf_counter() - started), 1)
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leagues", type=int, default=50)
+    parser.add_argument("--weeks", type=int, default=25)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="her ölçüm bu kadar tekrarlanır, en iyisi alınır")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    leagues = {f"league_{i}": synthetic_league(args.weeks, args.teams, rng) for i in range(args.leagues)}
+    # Son hafta "yeni gelen" hafta; önceki haftalar zaten işlenmiş kabul edilir
+    last_key = f"week_{args.weeks}"
+    history = {lid: {k: v for k, v in raw.items() if k != last_key} for lid, raw in leagues.items()}
+    # convert_to_avg_total her çalıştırmada dosyayı yeniden okur: aynı içerik, yeni nesneler
+    reloaded = json.loads(json.dumps(leagues))
+
+    # Eski yol: her çalıştırmada her şey baştan; üstüne sıralama da yok
+    _, legacy_ms = timed(lambda: {lid: legacy_aggregate(raw) for lid, raw in leagues.items()}, args.repeat)
+
+    def fold_all(agg, data, **kwargs):
+        # Tüm ligler tek fold_many çağrısında: parse ve toplama bir kez
+        agg.fold_many(data, **kwargs)
+        return agg
+
+    def folded(data):
+        return lambda: fold_all(LeagueAggregator(), data)
+
+    # Yeni yol: tam hesap (sadece toplamlar, ve sıralamalarla birlikte)
+    _, fold_ms = timed(lambda agg: fold_all(agg, leagues), args.repeat, setup=LeagueAggregator)
+    (agg_full, totals, _), full_ms = timed(
+        lambda agg: (fold_all(agg, leagues), agg.totals(), agg.ranks()), args.repeat, setup=LeagueAggregator)
+
+    # Yeni yol: geçmiş hazır, sadece son hafta eklenir
+    _, incremental_ms = timed(lambda agg: (fold_all(agg, leagues), agg.totals(), agg.ranks()),
+                              args.repeat, setup=folded(history))
+    # CLI'daki durum: hiçbir hafta değişmedi, dosya yeniden okundu; ham içerikler karşılaştırılır
+    _, recheck_ms = timed(lambda agg: (fold_all(agg, reloaded), agg.totals(), agg.ranks()),
+                          args.repeat, setup=folded(leagues))
+    agg = fold_all(LeagueAggregator(), leagues)
+    _, rolling_ms = timed(lambda: (agg.totals(last_n=4), agg.ranks(last_n=4)), args.repeat)
+
+    # Doğruluk: eski döngüyle aynı ortalamalar
+    check = legacy_aggregate(leagues["league_0"])
+    row = totals.loc[("league_0", "Team 1")]
+    assert abs(check["Team 1"]["PTS"] - round(row["AVG_PTS"], 2)) < 1e-9
+    assert abs(check["Team 1"]["FG%"] - round(row["FG%"], 3)) < 1e-9
+
+    rows = args.leagues * args.weeks * args.teams
+    print(json.dumps({
+        "rows": rows,
+        "legacy_full_ms": legacy_ms,
+        "engine_fold_full_ms": fold_ms,
+        "engine_full_ms": full_ms,
+        "engine_incremental_one_week_ms": incremental_ms,
+        "engine_recheck_unchanged_ms": recheck_ms,
+        "engine_rolling_last4_ms": rolling_ms,
+        "speedup_fold_full": round(legacy_ms / fold_ms, 2) if fold_ms else None,
+        "speedup_full": round(legacy_ms / full_ms, 2) if full_ms else None,
+        "speedup_incremental": round(legacy_ms / incremental_ms, 2) if incremental_ms else None,
+        "speedup_recheck_unchanged": round(legacy_ms / recheck_ms, 2) if recheck_ms else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
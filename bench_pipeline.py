@@ -0,0 +1,238 @@
+"""Gerçek RAG akışını sahte (deterministik, gecikmesi ayarlanabilir) chat ve embedding
+modelleriyle, farklı veri büyüklüklerinde uçtan uca ölçer.
+
+    python bench_pipeline.py --sizes 450,5000 --queries 40
+    python bench_pipeline.py --sizes 450 --ttft 0.3 --token-latency 0.01 --embed-latency 0.05
+    python bench_pipeline.py --baseline cache/bench/onceki.json   # gerileme varsa çıkış kodu 1
+
+Her büyüklük için kurulum aşamaları (JSON okuma, döküman/indeks kurulumu,
+Chroma'ya yazma, runtime kurulumu), sorgu başına aşamaların p50/p95'i, kurulumun
+bellek tepe noktası ve eşzamanlı sorgu throughput'u JSON olarak yazılır.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from langchain_chroma import Chroma
+
+from build_index import sync_index
+from documents import build_documents, load_json
+from entity_index import EntityIndex
+from fake_models import FakeChatModel, FakeEmbeddings
+from pipeline import run_sync
+from runtime import BASE_DIR, ChatbotRuntime
+from stats_engine import StatsIndex
+from synthetic_data import write_league
+
+QUERY_TEMPLATES = [
+    ("STATS", "Who has the highest average block?"),
+    ("STATS", "Top 5 free agents by steals"),
+    ("STATS", "What is the average points of {player}?"),
+    ("STATS", "Which team has the highest total rebound?"),
+    ("TRADE", "Should I trade {player} for {other}?"),
+    ("TRADE", "I need more blocks, who can I get for {player}?"),
+    ("GENERAL", "Who are {team}'s players?"),
+    ("GENERAL", "Tell me about {player}"),
+    ("GREETING", "Hello"),
+]
+
+
+def percentiles(values):
+    if not values:
+        return None
+    arr = np.asarray(values, dtype=float)
+    return {"n": len(values), "p50": round(float(np.percentile(arr, 50)), 2),
+            "p95": round(float(np.percentile(arr, 95)), 2), "max": round(float(arr.max()), 2)}
+
+
+def make_queries(players, teams, n, seed=0):
+    rng = random.Random(seed)
+    queries = []
+    for i in range(n):
+        _, template = QUERY_TEMPLATES[i % len(QUERY_TEMPLATES)]
+        queries.append(template.format(player=rng.choice(players)["name"], other=rng.choice(players)["name"],
+                                       team=rng.choice(teams)["team_name"]))
+    return queries
+
+
+def timed(setup, name, fn):
+    started = time.perf_counter()
+    result = fn()
+    setup[name] = round(1000 * (time.perf_counter() - started), 1)
+    return result
+
+
+def load_stages(players_path, teams_path, setup):
+    players = timed(setup, "load_players_json", lambda: load_json(players_path))
+    teams = timed(setup, "load_teams_json", lambda: load_json(teams_path))
+    docs = timed(setup, "build_documents", lambda: build_documents(players_path, teams_path, players, teams))
+    timed(setup, "stats_index", lambda: StatsIndex(players, teams))
+    timed(setup, "entity_index", lambda: EntityIndex(players, teams))
+    return players, teams, docs
+
+
+def bench_size(records, args, work_dir):
+    size_dir = os.path.join(work_dir, f"league_{records}")
+    players_path, teams_path = write_league(size_dir, records, seed=args.seed)
+    chroma_dir = os.path.join(size_dir, "chroma")
+    cache_dir = os.path.join(size_dir, "cache")
+
+    embeddings = FakeEmbeddings(size=args.dim, query_latency=args.embed_latency,
+                                batch_latency=args.embed_batch_latency)
+    llm = FakeChatModel(ttft=args.ttft, token_latency=args.token_latency, answer_tokens=args.answer_tokens)
+
+    # 1. Kurulum aşamaları; bellek tepe noktası ayrı bir geçişte ölçülür (tracemalloc süreleri şişirir)
+    setup = {}
+    players, teams, docs = load_stages(players_path, teams_path, setup)
+    setup_peak = None
+    if args.memory:
+        tracemalloc.start()
+        load_stages(players_path, teams_path, {})
+        _, setup_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    vector_store = Chroma(embedding_function=embeddings, persist_directory=chroma_dir)
+    timed(setup, "index_build", lambda: sync_index(vector_store, docs, batch_size=args.batch_size,
+                                                   log=lambda *_: None))
+    rt = timed(setup, "runtime_init", lambda: ChatbotRuntime(players_path, teams_path, chroma_dir,
+                                                             embeddings=embeddings, llm=llm, cache_dir=cache_dir,
+                                                             tracing=args.trace))
+
+    # 2. Sıralı sorgular: aşama başına gecikme
+    queries = make_queries(players, teams, args.queries, seed=args.seed)
+    run_sync(rt.pipeline.run(queries[0], use_cache=False))  # ısınma
+    stages, totals, paths = {}, [], {}
+    for query in queries:
+        started = time.perf_counter()
+        response = run_sync(rt.pipeline.run(query, use_cache=False))
+        totals.append(1000 * (time.perf_counter() - started))
+        for name, stage in response.get("stages", {}).items():
+            if stage["status"] == "ok":
+                stages.setdefault(name, []).append(stage["ms"])
+        timings = response.get("timings")
+        if timings:
+            stages.setdefault("ttft", []).append(timings["ttft_ms"])
+        path = response["route"]["path"]
+        paths[path] = paths.get(path, 0) + 1
+    stages["total"] = totals
+
+    # 3. Eşzamanlı sorgular: throughput
+    async def burst():
+        sem = asyncio.Semaphore(args.concurrency)
+
+        async def one(q):
+            async with sem:
+                await rt.pipeline.run(q, use_cache=False)
+        await asyncio.gather(*(one(q) for q in queries))
+
+    started = time.perf_counter()
+    run_sync(burst())
+    burst_s = time.perf_counter() - started
+
+    return {
+        "records": records,
+        "players": len(players),
+        "teams": len(teams),
+        "setup_ms": setup,
+        "memory": {
+            "setup_peak_mb": round(setup_peak / 2 ** 20, 1) if setup_peak is not None else None,
+            "process_max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        },
+        "query_ms": {name: percentiles(values) for name, values in stages.items()},
+        "intent_paths": paths,
+        "throughput": {"queries": len(queries), "concurrency": args.concurrency,
+                       "seconds": round(burst_s, 3), "qps": round(len(queries) / burst_s, 2)},
+    }
+
+
+def compare(current, baseline, tolerance):
+    """Baseline'a göre p95'i tolerance oranından fazla artan aşamaların listesi."""
+    regressions = []
+    old_by_size = {r["records"]: r for r in baseline.get("results", [])}
+    for result in current["results"]:
+        old = old_by_size.get(result["records"])
+        if old is None:
+            continue
+        for name, stats in result["query_ms"].items():
+            prev = (old.get("query_ms") or {}).get(name)
+            if not stats or not prev:
+                continue
+            # 1 ms altı farklar gürültü
+            if stats["p95"] > prev["p95"] * (1 + tolerance) and stats["p95"] - prev["p95"] > 1.0:
+                regressions.append({"records": result["records"], "stage": name,
+                                    "baseline_p95": prev["p95"], "p95": stats["p95"]})
+        for name, ms in result["setup_ms"].items():
+            prev = old.get("setup_ms", {}).get(name)
+            if prev and ms > prev * (1 + tolerance) and ms - prev > 5.0:
+                regressions.append({"records": result["records"], "stage": f"setup:{name}",
+                                    "baseline_ms": prev, "ms": ms})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="450,5000", help="virgülle ayrılmış kayıt sayıları (ör. 450,5000,100000)")
+    parser.add_argument("--queries", type=int, default=36)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttft", type=float, default=0.0, help="sahte LLM ilk token gecikmesi (sn)")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="sahte LLM token başına gecikme (sn)")
+    parser.add_argument("--answer-tokens", type=int, default=30)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="sahte query embedding gecikmesi (sn)")
+    parser.add_argument("--embed-batch-latency", type=float, default=0.0,
+                        help="sahte embed_documents çağrısı başına gecikme (sn)")
+    parser.add_argument("--dim", type=int, default=256, help="sahte embedding boyutu")
+    parser.add_argument("--batch-size", type=int, default=500, help="indeksleme batch boyutu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="tracemalloc ile kurulum bellek ölçümünü atla")
+    parser.add_argument("--trace", action="store_true", help="istek izlemeyi açık ölç (varsayılan kapalı)")
+    parser.add_argument("--out", default=None, help="sonuç JSON yolu (varsayılan cache/bench/pipeline_<zaman>.json)")
+    parser.add_argument("--baseline", default=None, help="karşılaştırılacak önceki sonuç JSON'u")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="izin verilen p95 artış oranı")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as work_dir:
+        for records in sizes:
+            print(f"{records} kayıt ölçülüyor...", file=sys.stderr)
+            results.append(bench_size(records, args, work_dir))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "env": {"python": platform.python_version(), "platform": platform.platform()},
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline")},
+        "results": results,
+    }
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            report["regressions"] = compare(report, json.load(f), args.tolerance)
+
+    out = args.out or os.path.join(BASE_DIR, "cache", "bench", f"pipeline_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for result in results:
+        q = result["query_ms"]
+        print(f"{result['records']:>7} kayıt | kurulum: {result['setup_ms']} | "
+              f"toplam p50/p95: {q['total']['p50']}/{q['total']['p95']} ms | "
+              f"{result['throughput']['qps']} sorgu/sn | bellek: {result['memory']}")
+    print(f"Sonuçlar: {out}")
+    if report.get("regressions"):
+        print(f"GERİLEME: {report['regressions']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
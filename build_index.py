@@ -0,0 +1,138 @@
+"""nba_fantasy_db Chroma indeksini artımlı olarak günceller.
+
+Her oyuncu/takım kaydı kalıcı bir ID ve içerik hash'i ile saklanır. Sadece yeni
+ya da değişmiş kayıtlar embed edilir, veride artık olmayan kayıtlar silinir.
+
+    python build_index.py
+    python build_index.py --dry-run
+    python build_index.py --fake-embeddings --persist-dir /tmp/test_db
+    python build_index.py --league 466.l.12345      # leagues/<lig>/chroma
+"""
+import argparse
+import os
+import time
+from langchain_core.embeddings import Embeddings, DeterministicFakeEmbedding
+from langchain_chroma import Chroma
+
+from documents import build_documents
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from rate_limit import TokenBucket, call_with_retry
+from leagues import league_paths
+from runtime import CACHE_DIR
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """embed_documents çağrılarını batch'ler ve her batch'i token bucket arkasından gönderir."""
+
+    def __init__(self, inner, limiter, batch_size=100, retries=5):
+        self.inner = inner
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.retries = retries
+        self.calls = 0
+
+    def _call(self, fn):
+        self.calls += 1
+        return call_with_retry(fn, limiter=self.limiter, retries=self.retries)
+
+    def embed_documents(self, texts):
+        vectors = []
+        for i in range(0, len(texts), self.batch_size):
+            batch = texts[i:i + self.batch_size]
+            vectors.extend(self._call(lambda: self.inner.embed_documents(batch)))
+        return vectors
+
+    def embed_query(self, text):
+        return self._call(lambda: self.inner.embed_query(text))
+
+
+def existing_hashes(vector_store):
+    """Koleksiyondaki {id: content_hash} eşlemesi (eski rastgele ID'li kayıtlarda hash None)."""
+    got = vector_store.get(include=["metadatas"])
+    return {
+        doc_id: (metadata or {}).get("content_hash")
+        for doc_id, metadata in zip(got["ids"], got["metadatas"])
+    }
+
+
+def plan_sync(docs, existing):
+    """Eklenecek/güncellenecek dökümanlar ve silinecek ID'ler."""
+    to_upsert = [d for d in docs if existing.get(d.id) != d.metadata["content_hash"]]
+    current_ids = {d.id for d in docs}
+    stale_ids = [doc_id for doc_id in existing if doc_id not in current_ids]
+    return to_upsert, stale_ids
+
+
+def sync_index(vector_store, docs, batch_size=100, dry_run=False, log=print):
+    started = time.perf_counter()
+    existing = existing_hashes(vector_store)
+    to_upsert, stale_ids = plan_sync(docs, existing)
+    log(f"{len(docs)} kayıt: {len(to_upsert)} yeni/değişmiş, "
+        f"{len(docs) - len(to_upsert)} aynı, {len(stale_ids)} silinecek")
+
+    if not dry_run:
+        for i in range(0, len(stale_ids), 500):
+            vector_store.delete(ids=stale_ids[i:i + 500])
+
+        for i in range(0, len(to_upsert), batch_size):
+            batch = to_upsert[i:i + batch_size]
+            vector_store.add_documents(documents=batch, ids=[d.id for d in batch])
+            log(f"{i + len(batch)} / {len(to_upsert)} embed edildi")
+
+    return {
+        "total": len(docs),
+        "upserted": 0 if dry_run else len(to_upsert),
+        "unchanged": len(docs) - len(to_upsert),
+        "deleted": 0 if dry_run else len(stale_ids),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="nba_fantasy_db indeksini artımlı günceller.")
+    parser.add_argument("--league", default=None,
+                        help="lig ID'si; --players/--teams/--persist-dir verilmezse ligin yolları kullanılır")
+    parser.add_argument("--players", default=None)
+    parser.add_argument("--teams", default=None)
+    parser.add_argument("--persist-dir", default=None)
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="embed_documents çağrısı başına döküman sayısı")
+    parser.add_argument("--rpm", type=float, default=15,
+                        help="dakikadaki en fazla embedding isteği (429 gelirse otomatik düşer)")
+    parser.add_argument("--dry-run", action="store_true", help="sadece yapılacakları yazdır")
+    parser.add_argument("--no-embedding-cache", action="store_true",
+                        help="cache/embeddings.sqlite3'ü kullanma, her dökümanı yeniden embed et")
+    parser.add_argument("--fake-embeddings", action="store_true",
+                        help="ağa çıkmadan deterministik sahte embedding kullan (test için)")
+    args = parser.parse_args(argv)
+    paths = league_paths(args.league)
+    args.players = args.players or paths["players_path"]
+    args.teams = args.teams or paths["teams_path"]
+    args.persist_dir = args.persist_dir or paths["chroma_dir"]
+
+    if args.fake_embeddings:
+        inner = DeterministicFakeEmbedding(size=768)
+    else:
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        inner = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+
+    rate = args.rpm / 60.0
+    limiter = TokenBucket(rate, capacity=1)
+    embeddings = limited = RateLimitedEmbeddings(inner, limiter, batch_size=args.batch_size)
+    if not args.no_embedding_cache:
+        # Önbellekte olan dökümanlar (ör. silinip yeniden kurulan indeks) ağa çıkmadan gelir
+        embeddings = CachedEmbeddings(limited, EmbeddingCache(os.path.join(CACHE_DIR, "embeddings.sqlite3")))
+    vector_store = Chroma(embedding_function=embeddings, persist_directory=args.persist_dir)
+
+    docs = build_documents(args.players, args.teams)
+    stats = sync_index(vector_store, docs, batch_size=args.batch_size, dry_run=args.dry_run)
+    stats["embedding_calls"] = limited.calls
+    if not args.no_embedding_cache:
+        stats["embedding_cache"] = embeddings.cache.stats()
+    stats["throttled"] = limiter.throttled
+    print(f"Tamamlandı: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    main()
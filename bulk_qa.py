@@ -0,0 +1,245 @@
+"""Toplu soru-cevap: JSONL'deki soruları toplu embed, toplu retrieval ve sınırlı eşzamanlı üretimle cevaplar.
+
+    python bulk_qa.py questions.jsonl --out answers.jsonl
+    python bulk_qa.py questions.jsonl --league 466.l.12345 --concurrency 8 --rate 4
+
+Girdi satırları {"id": ..., "question": ...} biçimindedir (id yoksa satır numarası).
+Adımlar:
+  1. aynı (normalize edilmiş) sorular bir kez işlenir, cevap hepsine yazılır
+  2. sorular parça parça batch embedding çağrılarıyla vektörlenir (embedding önbelleği arkasında);
+     başarısız bir parçanın soruları hata satırı olarak yazılır
+  3. niyet: kurallar ve centroid hazır vektörlerle, kalanlar sınırlı eşzamanlı LLM çağrısıyla
+  4. STATS/TRADE soruları stats_engine/trade_engine'den; kalanların vektör aramaları
+     Chroma'ya tek sorguda gider, ortak kayıtlar aynı Document nesnesini paylaşır
+  5. cevaplar sınırlı eşzamanlılık ve token bucket ile üretilir, biten her cevap
+     hemen çıktı dosyasına yazılır
+
+Sonunda aşama süreleri ve soru/sn özeti stderr'e yazılır.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import Counter
+
+from answer_cache import normalize_query
+from embedding_cache import embed_query_batch
+from leagues import DEFAULT_LEAGUE, get_registry
+from pipeline import run_sync
+from prompts import GREETING_MESSAGE
+from rate_limit import TokenBucket, acall_with_retry, call_with_retry
+
+
+def read_questions(path):
+    """[{"index", "id", "question"}]; soru alanı olmayan satırlar "error" ile döner."""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for index, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                items.append({"index": index, "id": index, "question": None, "error": f"JSON hatası: {e}"})
+                continue
+            question = (record.get("question") or record.get("query") or "").strip()
+            items.append({"index": index, "id": record.get("id", index), "question": question or None,
+                          **({} if question else {"error": "soru alanı boş"})})
+    return items
+
+
+EMBED_CHUNK = 256
+
+
+def embed_all(runtime, questions, chunk_size=EMBED_CHUNK):
+    """Soru vektörleri, chunk_size'lık batch'lerle. Başarısız bir parçanın her sorusunun yerine
+    istisna konur; sonraki adımlar onu o sorunun hatası olarak taşır."""
+    vectors = []
+    for start in range(0, len(questions), chunk_size):
+        chunk = questions[start:start + chunk_size]
+        try:
+            vectors.extend(call_with_retry(lambda: embed_query_batch(runtime.embeddings, chunk)))
+        except Exception as e:
+            vectors.extend([e] * len(chunk))
+    return vectors
+
+
+async def _ready(value):
+    return value
+
+
+async def classify_all(runtime, questions, vectors, concurrency):
+    """Niyetler; kural ve centroid adımları hazır vektörü kullanır, sadece kalanlar LLM'e gider.
+    Vektörü olmayan (embedding'i başarısız) soruların niyeti o istisnadır."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(question, vector):
+        if isinstance(vector, Exception):
+            return vector
+        async with sem:
+            return await acall_with_retry(
+                lambda: runtime.intent_router.aclassify(question, lambda: _ready(vector)))
+
+    return await asyncio.gather(*(one(q, v) for q, v in zip(questions, vectors)), return_exceptions=True)
+
+
+def prepare_all(runtime, questions, vectors, routes):
+    """Her soru için hazır girdiler (ya da GREETING/hata). Retrieval gerekenler tek toplu sorguda aranır.
+
+    Bir sorunun hazırlığı hata verirse yerine istisna konur; generate_all onu o sorunun hatası yazar.
+    """
+    prepared = [None] * len(questions)
+    engines = {"STATS": runtime.prepare_stats, "TRADE": runtime.prepare_trade}
+    need_docs = []
+    for i, (question, route) in enumerate(zip(questions, routes)):
+        if isinstance(route, Exception) or route["intent"] == "GREETING":
+            continue
+        engine = engines.get(route["intent"])
+        try:
+            if engine is not None:
+                prepared[i] = engine(question)
+        except Exception as e:
+            prepared[i] = e
+            continue
+        if prepared[i] is None:
+            need_docs.append(i)
+
+    doc_lists = runtime.retriever.search_many([questions[i] for i in need_docs], [vectors[i] for i in need_docs])
+    for i, docs in zip(need_docs, doc_lists):
+        try:
+            prepared[i] = runtime.prepare_docs(questions[i], routes[i]["intent"], docs)
+        except Exception as e:
+            prepared[i] = e
+    return prepared, len(need_docs)
+
+
+async def generate_all(runtime, work, emit, concurrency=8, rate=4.0, use_cache=True):
+    """work: [(soru, vektör, rota, hazır girdiler)]. Biten her cevap için emit(i, sonuç) çağrılır."""
+    sem = asyncio.Semaphore(concurrency)
+    limiter = TokenBucket(rate, capacity=concurrency)
+    version = runtime.data_version
+
+    async def one(i, question, vector, route, prepared):
+        started = time.perf_counter()
+        result = {"intent": None, "path": None, "answer": None, "context_ids": [], "cached": False}
+        try:
+            if isinstance(route, Exception):
+                raise route
+            result.update(intent=route["intent"], path=route["path"])
+            if isinstance(prepared, Exception):
+                raise prepared
+            if route["intent"] == "GREETING":
+                result["answer"] = GREETING_MESSAGE
+            else:
+                result["context_ids"] = [doc.id for doc in prepared["context"] if doc.id]
+                entry = None
+                if use_cache:
+                    entry = await asyncio.to_thread(runtime.answer_cache.lookup, route["intent"], question, version,
+                                                    vector)
+                if entry is not None:
+                    result.update(answer=entry["answer"], cached=entry["match"])
+                else:
+                    async with sem:
+                        result["answer"] = await acall_with_retry(
+                            lambda: prepared["chain"].ainvoke(prepared["inputs"]), limiter=limiter)
+                    if use_cache:
+                        await asyncio.to_thread(runtime.answer_cache.store, route["intent"], question, version,
+                                                result["answer"], result["context_ids"], vector)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        emit(i, result)
+
+    await asyncio.gather(*(one(i, *args) for i, args in enumerate(work)))
+
+
+def run_bulk(runtime, items, out, concurrency=8, rate=4.0, use_cache=True):
+    """items'ı cevaplar, her cevabı out'a (yazılabilir dosya) JSONL olarak yazar; özet sözlüğü döndürür."""
+    phases = {}
+    started = time.perf_counter()
+
+    def write(item, result):
+        out.write(json.dumps({"id": item["id"], "question": item["question"], **result}, ensure_ascii=False) + "\n")
+        out.flush()
+
+    # 1. Aynı sorular bir kez
+    groups = {}
+    for item in items:
+        if item.get("error"):
+            write(item, {"error": item["error"]})
+            continue
+        groups.setdefault(normalize_query(item["question"]), []).append(item)
+    keys = list(groups)
+    questions = [groups[key][0]["question"] for key in keys]
+
+    # 2. Toplu embedding
+    t0 = time.perf_counter()
+    vectors = embed_all(runtime, questions)
+    phases["embedding"] = time.perf_counter() - t0
+
+    # 3. Niyetler
+    t0 = time.perf_counter()
+    routes = run_sync(classify_all(runtime, questions, vectors, concurrency))
+    phases["intent"] = time.perf_counter() - t0
+
+    # 4. Motorlar ve toplu retrieval
+    t0 = time.perf_counter()
+    prepared, retrieved = prepare_all(runtime, questions, vectors, routes)
+    phases["retrieval"] = time.perf_counter() - t0
+
+    # 5. Üretim; biten cevap aynı sorunun tüm satırlarına yazılır
+    counts = Counter()
+
+    def emit(i, result):
+        counts["failed" if "error" in result else "answered"] += len(groups[keys[i]])
+        if result.get("cached"):
+            counts["cached"] += len(groups[keys[i]])
+        counts[f"path_{result['path']}"] += len(groups[keys[i]])
+        for item in groups[keys[i]]:
+            write(item, result)
+
+    t0 = time.perf_counter()
+    run_sync(generate_all(runtime, list(zip(questions, vectors, routes, prepared)), emit,
+                          concurrency, rate, use_cache))
+    phases["generation"] = time.perf_counter() - t0
+
+    total = time.perf_counter() - started
+    return {
+        "questions": len(items),
+        "unique": len(questions),
+        "answered": counts["answered"],
+        "cached": counts["cached"],
+        "failed": counts["failed"] + sum(1 for item in items if item.get("error")),
+        "retrieved": retrieved,
+        "intent_paths": {p: counts[f"path_{p}"] for p in ("rules", "centroid", "llm") if counts[f"path_{p}"]},
+        "seconds": {name: round(s, 2) for name, s in phases.items()} | {"total": round(total, 2)},
+        "questions_per_s": round(len(items) / total, 2) if total else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="JSONL soru dosyası")
+    parser.add_argument("--out", default=None, help="JSONL cevap dosyası (varsayılan stdout)")
+    parser.add_argument("--league", default=DEFAULT_LEAGUE)
+    parser.add_argument("--concurrency", type=int, default=8, help="aynı anda en fazla LLM çağrısı")
+    parser.add_argument("--rate", type=float, default=4.0, help="saniyedeki en fazla üretim isteği")
+    parser.add_argument("--no-cache", action="store_true", help="cevap önbelleğini okuma/yazma")
+    args = parser.parse_args(argv)
+
+    runtime = get_registry().get(args.league)
+    items = read_questions(args.questions)
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        summary = run_bulk(runtime, items, out, args.concurrency, args.rate, use_cache=not args.no_cache)
+    finally:
+        if args.out:
+            out.close()
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Çok turlu sohbet oturumları: zamir çözümleme, oturum döküman önbelleği ve sınırlı geçmiş.
+
+Takip soruları ("and what about his rebounds?", "compare him with Jokic") önce
+önceki turların odaktaki oyuncu/takım isimleriyle yeniden yazılır. Soru yeniden
+yazıldıysa ya da bir devam sorusuysa ("and ...", "peki ...") ve isimleri birebir
+çözüyorsa vektör araması ve embedding yapılmaz: dökümanlar ID ile (önce oturumun kendi
+önbelleğinden) alınır, niyet kurallardan ya da önceki turdan gelir ve prompt
+sadece bu birkaç kayıt ile token sınırlı geçmişten oluşur. Diğer sorular
+normal akıştan (pipeline.AsyncPipeline) geçer; getirdikleri dökümanlar oturum
+önbelleğine eklenir.
+"""
+import asyncio
+import re
+from collections import OrderedDict, deque
+
+from context_format import estimate_tokens
+from pipeline import StageTimer, iterate_async
+from prompts import GREETING_MESSAGE
+from text_utils import fold_text
+
+# Katlanmış (küçük harf, aksansız) metin üzerinde
+# "it" bilerek yok: "is it worth it?" gibi sorularda isim yerine geçmiyor;
+# "her" de yok: Türkçede "her" (her takım, her hafta) zamir değil
+_POSSESSIVE = r"his|hers|their|theirs|onun"
+_PRONOUN = rf"\b(?:{_POSSESSIVE}|he|him|she|they|them|ona|onu)\b"
+_PLURAL = {"they", "them", "their", "theirs"}
+_CONTINUATION = re.compile(r"^(?:and|what about|how about|also|peki|ya)\b")
+
+
+class ChatSession:
+    """Tek kullanıcının sohbeti. stream/ask_stream, runtime.ask_stream ile aynı olayları üretir."""
+
+    def __init__(self, runtime, max_turns=8, history_token_budget=300, answer_tokens=80, max_docs=50):
+        self.docs = OrderedDict()  # döküman id -> Document, en son kullanılan sonda
+        self.runtime = runtime
+        self.turns = deque(maxlen=max_turns)
+        self.history_token_budget = history_token_budget
+        self.answer_tokens = answer_tokens
+        self.max_docs = max_docs
+        self.counts = {"turns": 0, "followups": 0}
+
+    @property
+    def runtime(self):
+        return self._runtime
+
+    @runtime.setter
+    def runtime(self, runtime):
+        # Lig değişti ya da veri yenilendi: önbellekteki dökümanlar eski veriden
+        if getattr(self, "_runtime", None) is not runtime:
+            self.docs.clear()
+        self._runtime = runtime
+
+    # --- Yeniden yazma ---
+    def focus(self):
+        """Son turda konuşulan kayıtlar: soruda geçen isimler, yoksa cevabın ilk kaynağı."""
+        for turn in reversed(self.turns):
+            if turn["entity_ids"]:
+                return turn["entity_ids"]
+            if turn["context_ids"]:
+                return turn["context_ids"][:1]
+        return []
+
+    def rewrite(self, query):
+        """Zamirleri ve isimsiz devam sorularını odaktaki isimlerle açar; gerek yoksa soru aynen döner."""
+        names = [self.runtime.entity_index.names[i] for i in self.focus() if i in self.runtime.entity_index.names]
+        if not names or self.runtime.entity_index.match(query)["ids"] and not re.search(_PRONOUN, fold_text(query)):
+            return query
+
+        def name_for(word):
+            chosen = " and ".join(names) if fold_text(word) in _PLURAL else names[0]
+            return f"{chosen}'s" if re.fullmatch(_POSSESSIVE, fold_text(word)) else chosen
+
+        rewritten, n = re.subn(_PRONOUN, lambda m: name_for(m.group()), query, flags=re.IGNORECASE)
+        if n == 0 and _CONTINUATION.match(fold_text(query)) and not self.runtime.entity_index.match(query)["ids"]:
+            rewritten = f"{query.rstrip(' ?')} for {' and '.join(names)}?"
+        return rewritten
+
+    # --- Oturum önbelleği ve geçmiş ---
+    def _remember(self, docs):
+        for doc in docs:
+            if doc.id:
+                self.docs[doc.id] = doc
+                self.docs.move_to_end(doc.id)
+        while len(self.docs) > self.max_docs:
+            self.docs.popitem(last=False)
+
+    def _doc(self, doc_id):
+        doc = self.docs.get(doc_id)
+        if doc is not None:
+            self.docs.move_to_end(doc_id)
+            return doc
+        return self.runtime.docs_by_id.get(doc_id)
+
+    def history_text(self):
+        """Son turlar, en yeniden geriye token sınırına kadar; uzun cevaplar kısaltılır."""
+        lines, used = [], 0
+        for turn in reversed(self.turns):
+            answer = turn["answer"]
+            if estimate_tokens(answer) > self.answer_tokens:
+                answer = answer[:4 * self.answer_tokens].rsplit(" ", 1)[0] + " ..."
+            block = f"User: {turn['query']}\nAssistant: {answer}"
+            cost = estimate_tokens(block)
+            if used + cost > self.history_token_budget:
+                break
+            lines.append(block)
+            used += cost
+        return "\n".join(reversed(lines))
+
+    # --- Takip sorusu yolu ---
+    def _followup_docs(self, query, rewritten):
+        """Takip sorusu (yeniden yazılmış ya da devam sorusu) isimleri birebir çözüyorsa o kayıtlar
+        (vektör araması yok), yoksa None. Yeni sorular önbellek ve filtreler için normal akışa gider."""
+        if not self.turns or rewritten == query and not _CONTINUATION.match(fold_text(query)):
+            return None
+        match = self.runtime.entity_index.match(rewritten)
+        if not (match["ids"] and match["resolved"]):
+            return None
+        docs = [self._doc(i) for i in match["ids"]]
+        return [d for d in docs if d is not None] or None
+
+    def _followup_route(self, rewritten):
+        intent, confidence = self.runtime.intent_router.classify_rules(rewritten)
+        if intent is not None and confidence >= self.runtime.intent_router.rule_threshold:
+            return {"intent": intent, "confidence": confidence, "path": "rules"}
+        # Kurallar emin değilse konu değişmemiş sayılır
+        previous = self.turns[-1]["intent"] if self.turns else "GENERAL"
+        return {"intent": previous if previous != "GREETING" else "GENERAL", "confidence": 0.5, "path": "session"}
+
+    def _prepare_followup(self, rewritten, intent, docs):
+        rt = self.runtime
+        engines = {"STATS": rt.prepare_stats, "TRADE": rt.prepare_trade}
+        prepared = engines[intent](rewritten) if intent in engines else None
+        if prepared is None:
+            prepared = rt.prepare_docs(rewritten, intent, docs)
+        history = self.history_text()
+        if history:
+            prepared["inputs"] = {**prepared["inputs"],
+                                  "input": f"Conversation so far:\n{history}\n\nCurrent question: {rewritten}"}
+            prepared["tokens"] = {**prepared["tokens"],
+                                  "prompt_tokens": prepared["tokens"]["prompt_tokens"] + estimate_tokens(history),
+                                  "history_tokens": estimate_tokens(history)}
+        return prepared
+
+    async def _followup_stream(self, query, rewritten, docs):
+        rt = self.runtime
+        timer = StageTimer()
+        trace = rt.tracer.start(rewritten)
+        error = None
+        try:
+            start = timer.now_ms()
+            route = self._followup_route(rewritten)
+            timer.record("intent", start)
+            intent = route["intent"]
+            yield {"type": "route", "intent": intent, "route": route}
+            response = {"input": query, "intent": intent, "route": route, "context": [], "cached": False}
+            if intent == "GREETING":
+                response.update(answer=GREETING_MESSAGE, stages=timer.stages)
+                yield {"type": "token", "text": GREETING_MESSAGE}
+                yield {"type": "done", "response": response}
+                return
+
+            start = timer.now_ms()
+            # Motorlar ve prepare_docs senkron; event loop'u (sunucu) bloklamasın
+            prepared = await asyncio.to_thread(self._prepare_followup, rewritten, intent, docs)
+            timer.record("session_context", start)
+            response.update(context=prepared["context"], tokens=prepared["tokens"])
+            yield {"type": "context", "context": prepared["context"], "tokens": prepared["tokens"]}
+
+            generation_start = timer.now_ms()
+            first_token = None
+            parts = []
+            async for chunk in prepared["chain"].astream(prepared["inputs"]):
+                if not chunk:
+                    continue
+                if first_token is None:
+                    first_token = timer.now_ms()
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+            timer.record("generation", generation_start)
+            finished = timer.now_ms()
+            response["answer"] = "".join(parts)
+            response["stages"] = timer.stages
+            response["timings"] = {
+                "prepare_ms": generation_start,
+                "ttft_ms": first_token if first_token is not None else finished,
+                "generation_ms": round(finished - generation_start, 1),
+                "total_ms": finished,
+                "intent_retrieval_overlap_ms": 0.0,
+            }
+            rt.timings.append({"intent": intent, **response["timings"]})
+            if trace:
+                trace.set(intent=intent, path=route["path"], cached=False, followup=True,
+                          context_ids=[doc.id for doc in response["context"] if doc.id], total_ms=finished)
+            yield {"type": "done", "response": response}
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if trace:
+                rt.tracer.finish(trace, timer.stages, error)
+
+    # --- Giriş noktaları ---
+    async def stream(self, query):
+        rewritten = self.rewrite(query)
+        docs = self._followup_docs(query, rewritten)
+        if docs is not None:
+            self.counts["followups"] += 1
+            events = self._followup_stream(query, rewritten, docs)
+        else:
+            events = self.runtime.pipeline.stream(rewritten)
+        response = None
+        async for event in events:
+            if event["type"] == "done":
+                response = event["response"]
+                response["session"] = {"rewritten": rewritten if rewritten != query else None,
+                                       "followup": docs is not None, "turn": self.counts["turns"] + 1}
+            yield event
+        if response is not None:
+            self._record(query, rewritten, response)
+
+    def _record(self, query, rewritten, response):
+        self._remember(response["context"])
+        self.turns.append({
+            "query": rewritten,
+            "answer": response.get("answer") or "",
+            "intent": response["intent"],
+            "entity_ids": self.runtime.entity_index.match(rewritten)["ids"],
+            "context_ids": [doc.id for doc in response["context"] if doc.id],
+        })
+        self.counts["turns"] += 1
+
+    def ask_stream(self, query):
+        """stream'in senkron hali (Streamlit)."""
+        yield from iterate_async(self.stream(query))
+
+    def reset(self):
+        self.turns.clear()
+        self.docs.clear()
+
+    def stats(self):
+        return {**self.counts, "history_turns": len(self.turns), "cached_docs": len(self.docs),
+                "history_tokens": estimate_tokens(self.history_text())}
@@ -0,0 +1,142 @@
+"""Retrieve edilen kayıtları niyete göre sadeleştirilmiş, kompakt bir tabloya çevirir.
+
+Her kaydın ~22 alanlık JSON'unu olduğu gibi prompta yapıştırmak yerine sadece
+niyetle ilgili sütunlar tutulur (TRADE için 9 kategori ortalamaları, STATS için
+sorulan istatistik) ve toplam metin bir token bütçesiyle sınırlandırılır.
+"""
+import json
+import math
+import re
+
+from stats_engine import CATEGORIES, STAT_PATTERNS
+from text_utils import fold_text
+
+NINE_CAT = [f"AVG_{c}" for c in CATEGORIES] + ["FG%", "FT%"]
+
+PLAYER_BASE = ["name", "current_team", "position"]
+PLAYER_FIELDS = {
+    "TRADE": PLAYER_BASE + NINE_CAT,
+    "GENERAL": PLAYER_BASE + NINE_CAT,
+    # Soruda belirli bir istatistik geçmiyorsa toplamlar da verilir
+    "STATS": PLAYER_BASE + NINE_CAT + [f"TOTAL_{c}" for c in CATEGORIES] + ["FGM/A", "FTM/A"],
+}
+TEAM_NINE_CAT = [("averages", c) for c in CATEGORIES] + [("averages", "FG%"), ("averages", "FT%")]
+
+DEFAULT_TOKEN_BUDGET = 1500
+
+
+def estimate_tokens(text):
+    """Gemini tokenizer'ı yerelde yok; ~4 karakter/token yaklaşımı yeterince iyi."""
+    return math.ceil(len(text) / 4)
+
+
+def requested_stats(query):
+    """Soruda geçen istatistikler (ör. ["BLK"], ["FG%"]); yoksa boş liste."""
+    folded = fold_text(query)
+    found = []
+    for pattern, stat in STAT_PATTERNS:
+        if re.search(pattern, folded) and stat not in found:
+            found.append(stat)
+    return found
+
+
+def _player_columns(intent, stats):
+    if intent == "STATS" and stats:
+        cols = list(PLAYER_BASE)
+        for stat in stats:
+            if stat in CATEGORIES:
+                cols += [f"AVG_{stat}", f"TOTAL_{stat}"]
+            elif stat in ("FG%", "FGM", "FGA"):
+                cols += ["FG%", "FGM/A"]
+            else:
+                cols += ["FT%", "FTM/A"]
+        return list(dict.fromkeys(cols))
+    return PLAYER_FIELDS.get(intent, PLAYER_FIELDS["GENERAL"])
+
+
+def _team_columns(intent, stats):
+    if intent == "STATS" and stats:
+        cols = []
+        for stat in stats:
+            if stat in CATEGORIES:
+                cols += [("totals", stat), ("averages", stat)]
+            elif stat in ("FG%", "FGM", "FGA"):
+                cols += [("totals", "FGM/A"), ("averages", "FG%")]
+            else:
+                cols += [("totals", "FTM/A"), ("averages", "FT%")]
+        return list(dict.fromkeys(cols))
+    return TEAM_NINE_CAT
+
+
+def _cell(value):
+    if isinstance(value, float):
+        return f"{value:g}"
+    return str(value)
+
+
+def _team_header(col):
+    section, stat = col
+    return f"{'TOTAL' if section == 'totals' else 'AVG'}_{stat}" if "%" not in stat else stat
+
+
+def parse_record(doc):
+    try:
+        record = json.loads(doc.page_content)
+    except (ValueError, TypeError):
+        return None, None
+    if not isinstance(record, dict):
+        return None, None
+    if "player_id" in record:
+        return "player", record
+    if "team_name" in record:
+        return "team", record
+    return None, record
+
+
+def format_context(docs, intent, query, token_budget=DEFAULT_TOKEN_BUDGET):
+    """(metin, bilgi) döndürür. Kayıtlar retrieval sırasıyla, bütçe dolana kadar eklenir."""
+    stats = requested_stats(query)
+    player_cols = _player_columns(intent, stats)
+    team_cols = _team_columns(intent, stats)
+
+    player_rows, team_rows, other_rows = [], [], []
+    used, dropped = 0, 0
+    header_cost = estimate_tokens("|".join(player_cols)) + estimate_tokens(
+        "|".join(["team_name", "weeks"] + [_team_header(c) for c in team_cols]))
+    tokens = header_cost
+
+    for doc in docs:
+        kind, record = parse_record(doc)
+        if kind == "player":
+            row = "|".join(_cell(record.get(c, "")) for c in player_cols)
+        elif kind == "team":
+            cells = [record.get("team_name", ""), _cell(record.get("weeks_counted", ""))]
+            cells += [_cell(record.get(section, {}).get(stat, "")) for section, stat in team_cols]
+            row = "|".join(cells)
+        else:
+            row = doc.page_content[:400]
+
+        cost = estimate_tokens(row) + 1
+        if tokens + cost > token_budget:
+            dropped += 1
+            continue
+        tokens += cost
+        used += 1
+        {"player": player_rows, "team": team_rows}.get(kind, other_rows).append(row)
+
+    sections = []
+    if player_rows:
+        sections.append("Players:\n" + "|".join(player_cols) + "\n" + "\n".join(player_rows))
+    if team_rows:
+        header = "|".join(["team_name", "weeks"] + [_team_header(c) for c in team_cols])
+        sections.append("Fantasy teams:\n" + header + "\n" + "\n".join(team_rows))
+    if other_rows:
+        sections.append("\n".join(other_rows))
+    text = "\n\n".join(sections)
+
+    return text, {
+        "records_used": used,
+        "records_dropped": dropped,
+        "context_tokens": estimate_tokens(text),
+        "raw_context_tokens": sum(estimate_tokens(d.page_content) for d in docs),
+    }
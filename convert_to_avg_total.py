@@ -1,100 +1,54 @@
 # %%
+import argparse
 import json
 import os
-# Eğer şu an 'notebooks' klasöründeysek ana dizine çık
 
-    
+from league_engine import LeagueAggregator
+from league_store import LeagueStore
+from leagues import league_paths
+
+# Eğer şu an 'notebooks' klasöründeysek ana dizine çık
 if os.getcwd().endswith("notebooks"):
     os.chdir("..")
-input_path = os.path.join("data", "nba_league_stats.json")
-with open(input_path, "r", encoding="utf-8") as f:
-    raw_data = json.load(f)
 
-# 2. İstatistikleri Takım Bazlı Grupla
-team_aggregates = {}
 
-def parse_fraction(val):
-    """'191/390' gibi değerleri pay ve payda olarak ayırır."""
-    try:
-        made, att = map(float, val.split('/'))
-        return made, att
-    except:
-        return 0.0, 0.0
 
-for week_id, matchups in raw_data.items():
-    for team in matchups:
-        name = team["team_name"]
-        stats = team["stats"]
-        
-        if name not in team_aggregates:
-            team_aggregates[name] = {
-                "weeks_played": 0,
-                "FGM": 0.0, "FGA": 0.0,
-                "FTM": 0.0, "FTA": 0.0,
-                "3PTM": 0.0, "PTS": 0.0,
-                "REB": 0.0, "AST": 0.0,
-                "ST": 0.0, "BLK": 0.0, "TO": 0.0
-            }
-        
-        # Toplamları Güncelle
-        team_aggregates[name]["weeks_played"] += 1
-        
-        fgm, fga = parse_fraction(stats.get("FGM/A", "0/0"))
-        ftm, fta = parse_fraction(stats.get("FTM/A", "0/0"))
-        
-        team_aggregates[name]["FGM"] += fgm
-        team_aggregates[name]["FGA"] += fga
-        team_aggregates[name]["FTM"] += ftm
-        team_aggregates[name]["FTA"] += fta
-        team_aggregates[name]["3PTM"] += float(stats.get("3PTM", 0))
-        team_aggregates[name]["PTS"] += float(stats.get("PTS", 0))
-        team_aggregates[name]["REB"] += float(stats.get("REB", 0))
-        team_aggregates[name]["AST"] += float(stats.get("AST", 0))
-        team_aggregates[name]["ST"] += float(stats.get("ST", 0))
-        team_aggregates[name]["BLK"] += float(stats.get("BLK", 0))
-        team_aggregates[name]["TO"] += float(stats.get("TO", 0))
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Haftalık takım istatistiklerinden lig özeti üretir.")
+    parser.add_argument("--full", action="store_true", help="Kayıtlı toplamları yok sayıp baştan hesapla")
+    parser.add_argument("--last", type=int, default=None, help="Son N haftanın ortalamalarını ve sıralamalarını yazdır")
+    parser.add_argument("--league", default=None, help="Lig ID'si (varsayılan: data/ altındaki lig)")
+    args = parser.parse_args(argv)
+
+    paths = league_paths(args.league)
+    input_path, output_path, store_path = paths["stats_path"], paths["teams_path"], paths["store_path"]
+    # Önceki çalıştırmanın toplamları; sadece yeni/değişen haftalar eklenir
+    state_path = os.path.join(paths["cache_dir"], "league_aggregates.pkl")
 
-# 3. Ortalamaları Hesapla ve Format
-final_summary = []
+    with open(input_path, "r", encoding="utf-8") as f:
+        raw_data = json.load(f)
 
-for team_name, totals in team_aggregates.items():
-    wp = totals["weeks_played"]
-    
-    summary = {
-        "team_name": team_name,
-        "weeks_counted": wp,
-        "totals": {
-            "PTS": totals["PTS"],
-            "REB": totals["REB"],
-            "AST": totals["AST"],
-            "ST": totals["ST"],
-            "BLK": totals["BLK"],
-            "3PTM": totals["3PTM"],
-            "TO": totals["TO"],
-            "FGM/A": f"{int(totals['FGM'])}/{int(totals['FGA'])}",
-            "FTM/A": f"{int(totals['FTM'])}/{int(totals['FTA'])}"
-        },
-        "averages": {
-            "PTS": round(totals["PTS"] / wp, 2),
-            "REB": round(totals["REB"] / wp, 2),
-            "AST": round(totals["AST"] / wp, 2),
-            "ST": round(totals["ST"] / wp, 2),
-            "BLK": round(totals["BLK"] / wp, 2),
-            "3PTM": round(totals["3PTM"] / wp, 2),
-            "TO": round(totals["TO"] / wp, 2),
-            "FG%": round(totals["FGM"] / totals["FGA"], 3) if totals["FGA"] > 0 else 0,
-            "FT%": round(totals["FTM"] / totals["FTA"], 3) if totals["FTA"] > 0 else 0
-        }
-    }
-    final_data = f"{team_name} takımı {wp} hafta boyunca toplam {totals['PTS']} sayı attı ve maç başına {summary['averages']['PTS']} ortalama yakaladı."
-    summary["text_description"] = final_data # RAG için açıklama metni
-    final_summary.append(summary)
+    # 1. Yeni haftaları toplamlara ekle
+    agg = LeagueAggregator() if args.full else LeagueAggregator.load(state_path)
+    added, changed, removed = agg.fold(raw_data)
+    print(f"Eklenen haftalar: {added or '-'}, güncellenen haftalar: {changed or '-'}, "
+          f"silinen haftalar: {removed or '-'}")
 
-# 4. Kaydet
-output_path = os.path.join("data", "nba_league_summary.json")
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(final_summary, f, ensure_ascii=False, indent=4)
+    # 2. Özeti kaydet: SQLite deposuna sadece değişen takımlar, JSON depodan üretilir
+    store = LeagueStore(store_path)
+    changes = store.upsert_teams(agg.to_records(), source="convert_to_avg_total")
+    if changes["snapshot"] is not None or not store.json_in_sync(output_path):
+        store.export_json(players_path=None, teams_path=output_path, weeks_path=None)
+    store.close()
+    agg.save(state_path)
+    print(f"Lig özeti oluşturuldu: {output_path} ({changes})")
 
-print(f"Lig özeti oluşturuldu: {output_path}")
+    if args.last:
+        view = agg.totals(last_n=args.last).join(agg.ranks(last_n=args.last), rsuffix="_rank")
+        print(f"\nSon {args.last} hafta:")
+        print(view[["weeks_played", "AVG_PTS", "AVG_REB", "AVG_AST", "FG%", "FT%",
+                    "PTS_rank", "REB_rank", "AST_rank", "TO_rank"]].round(3).to_string())
 
 
+if __name__ == "__main__":
+    main()
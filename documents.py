@@ -0,0 +1,100 @@
+import hashlib
+import json
+from langchain_core.documents import Document
+
+# stats_engine.CATEGORIES ile aynı; documents hafif kalsın diye pandas'lı modül import edilmiyor
+CATEGORIES = ["PTS", "REB", "AST", "ST", "BLK", "3PTM", "TO"]
+
+# Döküman metni ya da metadata şeması değişirse bu sayı artırılır;
+# böylece indexer tüm kayıtları bir kez yeniden embed eder.
+INDEX_SCHEMA_VERSION = 2
+
+
+def load_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def record_id(record_type, record):
+    """Her kayıt için kalıcı ID: oyuncular Yahoo player_id'si, takımlar isimleriyle."""
+    if record_type == "player":
+        return f"player:{record['player_id']}"
+    return f"team:{record['team_name']}"
+
+
+def content_hash(text):
+    payload = f"{INDEX_SCHEMA_VERSION}\n{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def _number(value):
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _ratio(fraction):
+    try:
+        made, att = map(float, str(fraction).split("/"))
+    except (TypeError, ValueError):
+        return 0.0
+    return made / att if att else 0.0
+
+
+def record_metadata(record_type, record):
+    """Chroma where filtreleri için tipli alanlar (query_filters ile aynı anahtarlar).
+
+    Oyuncular: current_team, pozisyon başına pos_<kod> bayrakları, AVG_/TOTAL_ istatistikler
+    ve FG_PCT/FT_PCT. Takımlar: team_name ve aynı istatistik anahtarları (haftalık ortalama/toplam).
+    """
+    if record_type == "player":
+        positions = {p for p in str(record.get("position") or "").split("/") if p and p != "N/A"}
+        metadata = {"current_team": record.get("current_team") or "",
+                    **{f"pos_{code}": True for code in sorted(positions)}}
+        for cat in CATEGORIES:
+            metadata[f"AVG_{cat}"] = _number(record.get(f"AVG_{cat}"))
+            metadata[f"TOTAL_{cat}"] = _number(record.get(f"TOTAL_{cat}"))
+        metadata["FG_PCT"] = _number(record.get("FG%"))
+        metadata["FT_PCT"] = _number(record.get("FT%"))
+        return metadata
+
+    totals, averages = record.get("totals", {}), record.get("averages", {})
+    metadata = {"team_name": record.get("team_name") or ""}
+    for cat in CATEGORIES:
+        metadata[f"AVG_{cat}"] = _number(averages.get(cat))
+        metadata[f"TOTAL_{cat}"] = _number(totals.get(cat))
+    metadata["FG_PCT"] = _ratio(totals.get("FGM/A"))
+    metadata["FT_PCT"] = _ratio(totals.get("FTM/A"))
+    return metadata
+
+
+def record_to_document(record_type, record, source, seq_num):
+    # JSONLoader(text_content=False) ile aynı metin: kaydın json.dumps hali
+    text = json.dumps(record)
+    return Document(
+        id=record_id(record_type, record),
+        page_content=text,
+        metadata={
+            "source": source,
+            "seq_num": seq_num,
+            "record_type": record_type,
+            "content_hash": content_hash(text),
+            **record_metadata(record_type, record),
+        },
+    )
+
+
+def build_documents(players_path, teams_path, players=None, teams=None):
+    """Oyuncu ve takım kayıtlarını kalıcı ID'li Document listesine çevirir."""
+    if players is None:
+        players = load_json(players_path)
+    if teams is None:
+        teams = load_json(teams_path)
+
+    docs = []
+    for i, record in enumerate(players, 1):
+        docs.append(record_to_document("player", record, players_path, i))
+    for i, record in enumerate(teams, 1):
+        docs.append(record_to_document("team", record, teams_path, i))
+    return docs
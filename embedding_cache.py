@@ -0,0 +1,245 @@
+"""Diskte kalıcı embedding önbelleği; indeksleme, uygulama ve değerlendirme aynı dosyayı paylaşır.
+
+Anahtar: (model, görev, metnin SHA-256'sı). Gemini sorgu ve döküman metinlerini
+farklı task_type ile embed ettiği için embed_query ve embed_documents ayrı
+tutulur. Vektörler float32 BLOB olarak cache/embeddings.sqlite3'e yazılır
+(768 boyutta kayıt başına ~3 KB). Toplam boyut max_bytes'ı aşınca en uzun
+süredir kullanılmayan kayıtlar silinir. Aynı soru ya da değişmemiş döküman
+tekrar geldiğinde ağa hiç çıkılmaz. Okumalarda last_used bellekte toplanır ve
+toplu yazılır (her isabette diske yazılmaz); async metodlar SQLite işini
+thread'de yapar.
+"""
+import asyncio
+import hashlib
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+QUERY, DOCUMENT = "query", "document"
+# Bekleyen last_used güncellemeleri bu kadar kayıt ya da bu kadar saniye birikince yazılır
+TOUCH_FLUSH_ROWS = 256
+TOUCH_FLUSH_SECONDS = 30.0
+
+
+def embedding_model_name(embeddings):
+    """Önbellek anahtarındaki model adı; sarmalayıcılar (inner) açılarak bulunur."""
+    while getattr(embeddings, "inner", None) is not None:
+        embeddings = embeddings.inner
+    name = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    if name:
+        return str(name)
+    # Sahte modellerde boyut da anahtara girer, farklı boyutlu vektörler karışmasın
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'size', '')}"
+
+
+def embed_query_batch(embeddings, texts):
+    """Birden çok sorgu için embed_query ile aynı vektörler, mümkünse tek batch çağrısında.
+
+    Gemini'nin embed_query'si zaten embed_documents([metin], task_type="RETRIEVAL_QUERY")
+    çağırır; burada tüm sorgular aynı task_type ile tek embed_documents'e verilir.
+    Toplu sorgu desteği olmayan modellerde embed_query tek tek çağrılır.
+    """
+    if not texts:
+        return []
+    if hasattr(embeddings, "embed_queries"):
+        return embeddings.embed_queries(texts)
+    if "task_type" in inspect.signature(embeddings.embed_documents).parameters:
+        task_type = getattr(embeddings, "task_type", None) or "RETRIEVAL_QUERY"
+        return embeddings.embed_documents(texts, task_type=task_type)
+    return [embeddings.embed_query(text) for text in texts]
+
+
+class EmbeddingCache:
+    def __init__(self, path, max_bytes=512 * 2 ** 20, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self.counts = Counter()
+        self._touched = {}  # anahtar -> henüz yazılmamış last_used
+        self._flushed_at = clock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key BLOB PRIMARY KEY,
+                model TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        (self._bytes,) = self._db.execute("SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings").fetchone()
+
+    @staticmethod
+    def make_key(model, kind, text):
+        return hashlib.sha256(f"{model}\n{kind}\n{text}".encode("utf-8")).digest()
+
+    def get_many(self, model, kind, texts):
+        """Metin sırasıyla float32 vektörler; önbellekte olmayanlar None."""
+        keys = [self.make_key(model, kind, text) for text in texts]
+        found = {}
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch)
+                found.update((key, np.frombuffer(vector, dtype=np.float32)) for key, vector in rows)
+            if found:
+                now = self._clock()
+                self._touched.update(dict.fromkeys(found, now))
+                if len(self._touched) >= TOUCH_FLUSH_ROWS or now - self._flushed_at >= TOUCH_FLUSH_SECONDS:
+                    self._flush_touched()
+                    self._db.commit()
+        vectors = [found.get(key) for key in keys]
+        hits = sum(v is not None for v in vectors)
+        self.counts[f"hit_{kind}"] += hits
+        self.counts[f"miss_{kind}"] += len(vectors) - hits
+        return vectors
+
+    def put_many(self, model, kind, texts, vectors):
+        now = self._clock()
+        rows = [(self.make_key(model, kind, text), model, kind, np.asarray(vector, dtype=np.float32).tobytes(), now)
+                for text, vector in zip(texts, vectors)]
+        with self._lock:
+            old = self._sizes([row[0] for row in rows])
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+            for row in rows:
+                self._touched.pop(row[0], None)
+            self._bytes += sum(len(row[3]) for row in {row[0]: row for row in rows}.values()) - old
+            self._evict()
+            self._db.commit()
+            self.counts["store"] += len(rows)
+
+    def _flush_touched(self):
+        """Bellekte biriken last_used değerlerini yazar (commit çağırana kalır)."""
+        if self._touched:
+            self._db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                 [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+        self._flushed_at = self._clock()
+
+    def flush(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+
+    def _sizes(self, keys):
+        total = 0
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            (size,) = self._db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vector)), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                batch).fetchone()
+            total += size
+        return total
+
+    def _evict(self):
+        """max_bytes aşılırsa en uzun süredir kullanılmayanlar %90'a inene kadar silinir."""
+        if not self.max_bytes or self._bytes <= self.max_bytes:
+            return
+        target = 0.9 * self.max_bytes
+        # Sıralama son okumaları da görsün
+        self._flush_touched()
+        rows = self._db.execute("SELECT key, LENGTH(vector) FROM embeddings ORDER BY last_used")
+        doomed = []
+        for key, size in rows:
+            if self._bytes <= target:
+                break
+            doomed.append((key,))
+            self._bytes -= size
+        self._db.executemany("DELETE FROM embeddings WHERE key = ?", doomed)
+        self.counts["evicted"] += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM embeddings")
+            self._db.commit()
+            self._touched.clear()
+            self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        stats = {"entries": entries, "mb": round(self._bytes / 2 ** 20, 2)}
+        for kind in (QUERY, DOCUMENT):
+            hits, misses = self.counts[f"hit_{kind}"], self.counts[f"miss_{kind}"]
+            stats[f"{kind}_hits"] = hits
+            stats[f"{kind}_misses"] = misses
+            stats[f"{kind}_hit_rate"] = round(hits / (hits + misses), 3) if hits + misses else 0.0
+        stats["evicted"] = self.counts["evicted"]
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings sarmalayıcısı: önbellekte olmayan metinler tek çağrıda inner'a gider.
+
+    Dönen vektörler her zaman float32 hassasiyetindedir; ilk çağrı ile önbellekten
+    gelen sonuç birebir aynıdır.
+    """
+
+    def __init__(self, inner, cache, model=None):
+        self.inner = inner
+        self.cache = cache
+        self.model = model or embedding_model_name(inner)
+
+    def _split(self, kind, texts):
+        vectors = self.cache.get_many(self.model, kind, texts)
+        missing = list(dict.fromkeys(text for text, v in zip(texts, vectors) if v is None))
+        return vectors, missing
+
+    def _merge(self, kind, texts, vectors, missing, fresh):
+        self.cache.put_many(self.model, kind, missing, fresh)
+        fresh = {text: np.asarray(v, dtype=np.float32) for text, v in zip(missing, fresh)}
+        return [(v if v is not None else fresh[text]).tolist() for text, v in zip(texts, vectors)]
+
+    def embed_documents(self, texts):
+        vectors, missing = self._split(DOCUMENT, texts)
+        fresh = self.inner.embed_documents(missing) if missing else []
+        return self._merge(DOCUMENT, texts, vectors, missing, fresh)
+
+    def embed_query(self, text):
+        (vector,) = self.cache.get_many(self.model, QUERY, [text])
+        if vector is None:
+            vector = self.inner.embed_query(text)
+            self.cache.put_many(self.model, QUERY, [text], [vector])
+            vector = np.asarray(vector, dtype=np.float32)
+        return vector.tolist()
+
+    def embed_queries(self, texts):
+        """Toplu embed_query: önbellekte olmayan sorgular tek batch çağrısıyla embed edilir."""
+        vectors, missing = self._split(QUERY, texts)
+        fresh = embed_query_batch(self.inner, missing)
+        return self._merge(QUERY, texts, vectors, missing, fresh)
+
+    # Async metodlarda SQLite okuma/yazma event loop'u bloklamasın diye thread'de yapılır
+    async def aembed_documents(self, texts):
+        vectors, missing = await asyncio.to_thread(self._split, DOCUMENT, texts)
+        fresh = await self.inner.aembed_documents(missing) if missing else []
+        return await asyncio.to_thread(self._merge, DOCUMENT, texts, vectors, missing, fresh)
+
+    async def aembed_query(self, text):
+        (vector,) = await asyncio.to_thread(self.cache.get_many, self.model, QUERY, [text])
+        if vector is None:
+            vector = await self.inner.aembed_query(text)
+            await asyncio.to_thread(self.cache.put_many, self.model, QUERY, [text], [vector])
+            vector = np.asarray(vector, dtype=np.float32)
+        return vector.tolist()
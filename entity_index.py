@@ -0,0 +1,282 @@
+"""Oyuncu ve fantasy takım isimleri için birebir varlık indeksi ve hibrit retriever.
+
+Soru "Donovan Mitchell" ya da "Ati and The Hippos" gibi bir isim içeriyorsa kayıt
+ID ile doğrudan alınır ve vektör sonuçlarıyla birleştirilir. Tüm isimler
+çözüldüğünde vektör aramasının k değeri otomatik küçülür. Soruda takım kadrosu,
+pozisyon, free agent ya da istatistik eşiği gibi kısıtlar varsa (query_filters)
+arama Chroma'da sadece filtreye uyan kayıtlarda yapılır; uyan kayıt sayısı
+k_filtered'ı aşmıyorsa vektör araması yapılmadan kümenin tamamı döner.
+"""
+import difflib
+import re
+from collections import Counter
+from typing import Any
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from query_filters import to_where
+from text_utils import fold_text
+
+# Bulanık eşleşmede tek başına isim sayılmayacak yaygın kelimeler
+_STOPWORDS = {
+    "who", "what", "which", "is", "the", "a", "an", "of", "and", "or", "for", "to", "in", "on", "with",
+    "his", "her", "their", "my", "me", "i", "does", "do", "how", "many", "much", "average", "total",
+    "points", "rebounds", "assists", "steals", "blocks", "team", "player", "players", "trade", "s",
+    "kim", "ne", "kac", "takim", "oyuncu", "ile", "ve", "mi", "mu", "in", "nin", "un", "nun",
+}
+# Oyuncu adı/soyadı olup günlük İngilizcede de geçen kelimeler ("Will I beat ...?", "mark", "young");
+# tek başına alias olmazlar, oyuncu tam adıyla bulunur
+_COMMON_WORDS = {
+    "will", "mark", "young", "black", "white", "green", "brown", "smart", "rich", "king", "love", "rose",
+    "early", "price", "hill", "miles", "banks", "bridges", "holiday", "hunter", "walker", "wood", "woods",
+    "grant", "bell", "house", "fears", "castle", "prince", "queen", "post", "topic", "temple", "moody",
+    "lively", "bones", "pope", "potter", "waters", "wells", "ware", "monk", "hardy", "brook", "brooks",
+    "amen", "prosper", "wade", "dick", "gill", "hart", "dean", "bane", "huff", "mason", "marshall",
+    "turner", "carter", "porter", "cole", "grimes", "gay", "best", "most", "last", "week", "this", "that",
+    "what", "when", "with", "have", "more", "less", "over", "under", "top", "good", "better", "free",
+    "agent", "center", "guard", "forward", "point", "points", "block", "blocks", "steal", "steals",
+}
+
+
+class EntityIndex:
+    """Kelime dizileri üzerinde trie (Aho-Corasick benzeri en uzun eşleşme) + difflib yedeği."""
+
+    def __init__(self, players, teams, fuzzy_cutoff=0.85):
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.names = {}  # kayıt id -> görünen isim
+        self._trie = {}
+        self._aliases = {}  # alias metni -> kayıt id listesi
+        # Sadece ad ya da soyaddan oluşan alias'lar ("young", "green") soruda büyük harfle geçmeli
+        self._partial = set()
+
+        for p in players:
+            self._add(f"player:{p['player_id']}", p["name"])
+        for t in teams:
+            self._add(f"team:{t['team_name']}", t["team_name"])
+
+        # Tek başına yeterince ayırt edici soyadı/adlar ("Jokic", "Wembanyama") da alias olur
+        parts = Counter()
+        for record_id, name in self.names.items():
+            if record_id.startswith("player:"):
+                for token in set(fold_text(name).split()):
+                    parts[token] += 1
+        for record_id, name in list(self.names.items()):
+            if not record_id.startswith("player:"):
+                continue
+            for token in fold_text(name).split():
+                if parts[token] == 1 and len(token) >= 4 and token not in _STOPWORDS \
+                        and token not in _COMMON_WORDS and token not in self._aliases:
+                    self._insert(token, record_id)
+                    self._partial.add(token)
+
+        self._alias_list = sorted(self._aliases)
+
+    def _add(self, record_id, name):
+        self.names[record_id] = name
+        self._insert(fold_text(name), record_id)
+
+    def _insert(self, alias, record_id):
+        if not alias:
+            return
+        node = self._trie
+        for token in alias.split():
+            node = node.setdefault(token, {})
+        ids = node.setdefault(None, [])
+        if record_id not in ids:
+            ids.append(record_id)
+        self._aliases.setdefault(alias, [])
+        if record_id not in self._aliases[alias]:
+            self._aliases[alias].append(record_id)
+
+    @staticmethod
+    def _sentence_starts(text):
+        """Cümle başındaki kelimelerin (fold_text kelime sırasına göre) konumları."""
+        starts, position = set(), 0
+        for sentence in re.split(r"[.!?]+", text):
+            words = fold_text(sentence).split()
+            if words:
+                starts.add(position)
+            position += len(words)
+        return starts
+
+    def match_exact(self, text):
+        """Metindeki isimleri soldan sağa, en uzun eşleşmeyle bulur.
+
+        Tek kelimelik ad/soyad alias'ı ancak büyük harfle ve cümle başı dışında yazılmışsa
+        sayılır (cümle başındaki her kelime büyük harfle başlar).
+        """
+        tokens = fold_text(text).split()
+        cased = fold_text(text, casefold=False).split()
+        starts = self._sentence_starts(text)
+        found = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            best_end, best_ids = None, None
+            j = i
+            while j < len(tokens) and tokens[j] in node:
+                node = node[tokens[j]]
+                j += 1
+                if None in node:
+                    if j - i == 1 and tokens[i] in self._partial and (
+                            not cased[i][:1].isupper() or i in starts):
+                        continue
+                    best_end, best_ids = j, node[None]
+            if best_end is None:
+                i += 1
+                continue
+            # Belirsiz alias (iki oyuncu) eşleşmeyi tek kayda indirmez, hepsi döner
+            for record_id in best_ids:
+                if record_id not in found:
+                    found.append(record_id)
+            i = best_end
+        return found
+
+    def match_fuzzy(self, text):
+        """Yazım hatalı isimler için ("Doncik", "Wembanyamma") 1-3 kelimelik parçalarda difflib eşleşmesi."""
+        tokens = fold_text(text).split()
+        cased = fold_text(text, casefold=False).split()
+        found = []
+        for size in (3, 2, 1):
+            for i in range(len(tokens) - size + 1):
+                gram_tokens = tokens[i:i + size]
+                if all(t in _STOPWORDS or t in _COMMON_WORDS for t in gram_tokens):
+                    continue
+                # Tek kelimelik parçalar ancak büyük harfle yazılmışsa isim sayılır
+                if size == 1 and (len(gram_tokens[0]) < 4 or not cased[i][:1].isupper()):
+                    continue
+                gram = " ".join(gram_tokens)
+                # Aynı harfle başlayan alias'larla sınırla, difflib ucuz kalsın
+                candidates = [a for a in self._alias_list if a[0] == gram[0]]
+                for alias in difflib.get_close_matches(gram, candidates, n=1, cutoff=self.fuzzy_cutoff):
+                    for record_id in self._aliases[alias]:
+                        if record_id not in found:
+                            found.append(record_id)
+        return found
+
+    def _initial_partials(self, text):
+        """Cümle başında büyük harfle yazılmış tek kelimelik alias'ların kayıtları ("Jokic or Embiid?")."""
+        tokens = fold_text(text).split()
+        found = []
+        for i in sorted(self._sentence_starts(text)):
+            if tokens[i] in self._partial and (i + 1 >= len(tokens) or tokens[i + 1] not in self._trie[tokens[i]]):
+                found.extend(record_id for record_id in self._aliases[tokens[i]] if record_id not in found)
+        return found
+
+    def match(self, text):
+        """{"ids": [...], "resolved": bool, "fuzzy": bool} döndürür.
+
+        Cümle başındaki ad/soyad alias'ları birebir eşleşme sayılmaz; bulunurlarsa sonuç
+        resolved=False olur.
+        """
+        ids = self.match_exact(text)
+        initial = [i for i in self._initial_partials(text) if i not in ids]
+        if ids and initial:
+            return {"ids": ids + initial, "resolved": False, "fuzzy": False}
+        if ids:
+            return {"ids": ids, "resolved": True, "fuzzy": False}
+        ids = self.match_fuzzy(text)
+        return {"ids": ids, "resolved": False, "fuzzy": bool(ids)}
+
+
+class HybridRetriever(BaseRetriever):
+    """İsmi geçen kayıtları ID ile, kalanı vektör benzerliğiyle getirir."""
+
+    vector_store: Any
+    entity_index: Any
+    docs_by_id: dict
+    k: int = 10
+    # Tüm isimler birebir çözüldüğünde vektör aramasından alınacak ek döküman sayısı
+    k_resolved: int = 2
+    # query_filters.QueryFilterParser; None ise filtre uygulanmaz
+    filter_parser: Any = None
+    # Filtreye uyan kayıt sayısı bunu aşmıyorsa hepsi döner (ör. bir takımın tüm kadrosu)
+    k_filtered: int = 20
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun):
+        return self.search(query)
+
+    def _plan(self, query):
+        """İsmi geçen kayıtlar, vektör aramasından alınacak döküman sayısı ve (varsa) kısıtlar."""
+        match = self.entity_index.match(query)
+        entity_docs = [self.docs_by_id[i] for i in match["ids"] if i in self.docs_by_id][:self.k]
+        k_vector = self.k - len(entity_docs)
+        parsed = (self.filter_parser.parse(query, match["ids"] if match["resolved"] else ())
+                  if self.filter_parser is not None else None)
+        if match["resolved"] and parsed is None:
+            k_vector = min(k_vector, self.k_resolved)
+        return entity_docs, max(k_vector, 0), parsed
+
+    def _as_docs(self, ids, texts, metadatas):
+        return [self.docs_by_id.get(doc_id) or Document(id=doc_id, page_content=text, metadata=metadata or {})
+                for doc_id, text, metadata in zip(ids, texts, metadatas)]
+
+    def filtered_set(self, parsed):
+        """Filtreye uyan kayıtların tamamı (en fazla k_filtered); daha fazlaysa None.
+
+        En fazla k_filtered + 1 kayıt istenir; fazlası varsa küme kullanılmaz, yani sıralanan her
+        zaman kümenin tamamıdır. Eşik kısıtı varsa ilk eşiğin istatistiğine göre azalan, yoksa
+        oyuncu dosyasındaki sırayla (seq_num).
+        """
+        got = self.vector_store._collection.get(where=to_where(parsed), limit=self.k_filtered + 1,
+                                                include=["documents", "metadatas"])
+        if len(got["ids"]) > self.k_filtered:
+            return None
+        docs = self._as_docs(got["ids"], got["documents"], got["metadatas"])
+        if parsed["thresholds"]:
+            key = parsed["thresholds"][0][0]
+            return sorted(docs, key=lambda d: -float(d.metadata.get(key, 0)))
+        return sorted(docs, key=lambda d: d.metadata.get("seq_num", 0))
+
+    def search(self, query, query_vector=None):
+        """query_vector verilirse (ör. önceden hesaplanmış embedding) tekrar embed edilmez."""
+        entity_docs, k_vector, parsed = self._plan(query)
+        where = None
+        if parsed is not None:
+            exact = self.filtered_set(parsed)
+            if exact is not None:
+                return self._merge(entity_docs, exact)
+            where = to_where(parsed)
+        if k_vector <= 0:
+            vector_docs = []
+        elif query_vector is not None:
+            vector_docs = self.vector_store.similarity_search_by_vector(query_vector, k=k_vector, filter=where)
+        else:
+            vector_docs = self.vector_store.similarity_search(query, k=k_vector, filter=where)
+        return self._merge(entity_docs, vector_docs)
+
+    def search_many(self, queries, query_vectors):
+        """search'ün toplu hali: filtresiz vektör aramaları Chroma'ya tek sorguda gider.
+
+        Kısıt içeren sorular (where her soru için farklı) tek tek search ile aranır. Aynı kayıt
+        birden çok sorunun sonucunda çıkarsa docs_by_id'deki tek Document paylaşılır.
+        """
+        plans = [self._plan(query) for query in queries]
+        results = {i: self.search(queries[i], query_vectors[i])
+                   for i, (_, _, parsed) in enumerate(plans) if parsed is not None}
+        needed = [i for i, (_, k_vector, parsed) in enumerate(plans) if k_vector > 0 and parsed is None]
+        vector_docs = {}
+        if needed:
+            result = self.vector_store._collection.query(
+                query_embeddings=[query_vectors[i] for i in needed],
+                n_results=max(plans[i][1] for i in needed),
+                include=["documents", "metadatas"],
+            )
+            for row, i in enumerate(needed):
+                vector_docs[i] = self._as_docs(result["ids"][row], result["documents"][row],
+                                               result["metadatas"][row])[:plans[i][1]]
+        return [results[i] if i in results else self._merge(entity_docs, vector_docs.get(i, []))
+                for i, (entity_docs, _, _) in enumerate(plans)]
+
+    @staticmethod
+    def _merge(entity_docs, vector_docs):
+        docs = list(entity_docs)
+        seen = {doc.id or doc.page_content for doc in docs}
+        for doc in vector_docs:
+            key = doc.id or doc.page_content
+            if key not in seen:
+                seen.add(key)
+                docs.append(doc)
+        return docs
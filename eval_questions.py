@@ -0,0 +1,219 @@
+"""Değerlendirme soru/cevaplarını doğrudan data/*.json dosyalarından üretir.
+
+Elle yazılmış ground truth'lar her veri yenilemesinde eskiyor; burada her
+çalıştırmada güncel veriden yüzlerce soru türetilir:
+
+  player_leader   "Who has the highest average blocks?"        -> oyuncu + değer
+  free_agent      "Who is the best free agent by average steals?"
+  team_leader     "Which team has the highest total rebounds?" -> takım + değer
+  player_lookup   "What is the average points of Luka Dončić?" -> değer
+  team_total      "What is Haramball's total number of steals?"
+
+Her kayıtta beklenen sayılar ve isimler bulunur; score_answer bunları cevap
+metninde arar (RAGAS'tan önce, yerel ve ücretsiz doğruluk kontrolü).
+
+    python eval_questions.py --per-player 9 --out cache/eval/questions.json
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+
+from stats_engine import parse_fraction
+from text_utils import fold_text
+
+STAT_WORDS = {"PTS": "points", "REB": "rebounds", "AST": "assists", "ST": "steals",
+              "BLK": "blocks", "3PTM": "three pointers made", "TO": "turnovers"}
+PCT_WORDS = {"FG%": "field goal percentage", "FT%": "free throw percentage"}
+PCT_ATTEMPTS = {"FG%": "FGM/A", "FT%": "FTM/A"}
+FREE_AGENT = "Free Agent"
+
+KINDS = ["player_leader", "free_agent", "team_leader", "player_lookup", "team_total"]
+
+
+def _item(kind, question, ground_truth, numbers, names=(), percent=False):
+    return {
+        "id": hashlib.sha1(question.encode("utf-8")).hexdigest()[:12],
+        "kind": kind,
+        "question": question,
+        "ground_truth": ground_truth,
+        "expected": {"numbers": list(numbers), "names": list(names), "percent": percent},
+    }
+
+
+def _pct_eligible(players, pct):
+    """stats_engine ile aynı kural: denemesi medyan denemenin yarısından az olanlar yüzde lideri sayılmaz."""
+    attempts = [parse_fraction(p.get(PCT_ATTEMPTS[pct]))[1] for p in players]
+    positive = sorted(a for a in attempts if a > 0)
+    if not positive:
+        return []
+    mid = len(positive) // 2
+    median = positive[mid] if len(positive) % 2 else (positive[mid - 1] + positive[mid]) / 2
+    threshold = max(1.0, 0.5 * median)
+    return [p for p, a in zip(players, attempts) if a >= threshold]
+
+
+def _leader(records, value):
+    """En yüksek değerli kayıt; ilk iki eşitse soru belirsiz olacağı için None."""
+    ranked = sorted(records, key=value, reverse=True)
+    if not ranked or (len(ranked) > 1 and value(ranked[0]) == value(ranked[1])):
+        return None
+    return ranked[0]
+
+
+def player_leaders(players, kind="player_leader", free_agent=False):
+    pool = [p for p in players if p.get("current_team") == FREE_AGENT] if free_agent else players
+    items = []
+    for stat, word in STAT_WORDS.items():
+        for prefix, label in (("AVG_", "average"), ("TOTAL_", "total")):
+            if free_agent and prefix == "TOTAL_":
+                continue
+            # TO'da az olan iyidir; "best ... by turnovers" sorusunun cevabı belirsiz olduğu için sorulmaz
+            if free_agent and stat == "TO":
+                continue
+            col = prefix + stat
+            leader = _leader(pool, lambda p: float(p.get(col) or 0))
+            if leader is None:
+                continue
+            value = float(leader[col])
+            if free_agent:
+                question = f"Who is the best free agent by {label} {word}?"
+            else:
+                question = f"Who has the highest {label} {word}?"
+            truth = f"{leader['name']} has the highest {label} {word} with {value:g}."
+            items.append(_item(kind, question, truth, [value], [leader["name"]]))
+    for pct, word in PCT_WORDS.items():
+        # Eşik (stats_engine'deki gibi) tüm lig üzerinden hesaplanır, sonra havuza daraltılır
+        eligible = [p for p in _pct_eligible(players, pct) if not free_agent or p.get("current_team") == FREE_AGENT]
+        leader = _leader(eligible, lambda p: float(p.get(pct) or 0))
+        if leader is None:
+            continue
+        value = float(leader[pct])
+        question = (f"Who is the best free agent by {word}?" if free_agent
+                    else f"Who has the highest {word}?")
+        truth = f"{leader['name']} has the highest {word} with {value:.1%}."
+        items.append(_item(kind, question, truth, [value], [leader["name"]], percent=True))
+    return items
+
+
+def team_leaders(teams):
+    items = []
+    for stat, word in STAT_WORDS.items():
+        leader = _leader(teams, lambda t: float(t["totals"].get(stat) or 0))
+        if leader is None:
+            continue
+        value = float(leader["totals"][stat])
+        items.append(_item("team_leader", f"Which team has the highest total {word}?",
+                           f"{leader['team_name']} has the highest total {word} with {value:g}.",
+                           [value], [leader["team_name"]]))
+    return items
+
+
+def player_lookups(players, per_player=9, n_players=40, seed=0):
+    """Rastgele (tohumlu) seçilen oyuncular için ortalama ve yüzde soruları."""
+    rng = random.Random(seed)
+    # Hiç oynamamış oyuncuların tüm değerleri 0, soruları bilgi taşımaz
+    active = [p for p in players if float(p.get("TOTAL_PTS") or 0) > 0]
+    chosen = rng.sample(active, min(n_players, len(active)))
+    stats = [(f"AVG_{s}", f"average {w}", False) for s, w in STAT_WORDS.items()]
+    stats += [(pct, word, True) for pct, word in PCT_WORDS.items()]
+    items = []
+    for player in chosen:
+        for col, label, percent in rng.sample(stats, min(per_player, len(stats))):
+            value = float(player.get(col) or 0)
+            question = f"What is the {label} of {player['name']}?"
+            shown = f"{value:.1%}" if percent else f"{value:g}"
+            items.append(_item("player_lookup", question, f"{player['name']} has a {label} of {shown}.",
+                               [value], percent=percent))
+    return items
+
+
+def team_totals(teams):
+    items = []
+    for team in teams:
+        for stat, word in STAT_WORDS.items():
+            value = float(team["totals"].get(stat) or 0)
+            items.append(_item("team_total", f"What is {team['team_name']}'s total number of {word}?",
+                               f"{team['team_name']} have a total of {value:g} {word}.", [value]))
+    return items
+
+
+def generate(players, teams, per_player=9, n_players=40, seed=0, kinds=KINDS):
+    """Tüm soru tipleri; aynı soru iki kez üretilirse biri atılır."""
+    builders = {
+        "player_leader": lambda: player_leaders(players),
+        "free_agent": lambda: player_leaders(players, kind="free_agent", free_agent=True),
+        "team_leader": lambda: team_leaders(teams),
+        "player_lookup": lambda: player_lookups(players, per_player, n_players, seed),
+        "team_total": lambda: team_totals(teams),
+    }
+    items, seen = [], set()
+    for kind in kinds:
+        for item in builders[kind]():
+            if item["id"] not in seen:
+                seen.add(item["id"])
+                items.append(item)
+    return items
+
+
+# --- Yerel puanlama ---
+
+_NUMBER = re.compile(r"(?<![\w.])-?\d{1,3}(?:,\d{3})+(?:\.\d+)?|(?<![\w.])-?\d+(?:\.\d+)?")
+
+
+def extract_numbers(text):
+    """Metindeki sayılar (ondalık basamak sayısıyla): [(değer, basamak)]. "2,371" -> 2371."""
+    numbers = []
+    for match in _NUMBER.finditer(text):
+        raw = match.group().replace(",", "")
+        decimals = len(raw.split(".", 1)[1]) if "." in raw else 0
+        numbers.append((float(raw), decimals))
+    return numbers
+
+
+def number_matches(expected, found, decimals):
+    """Cevap kendi yazdığı hassasiyette beklenen değere eşitse doğru (33.66 -> "33.7" ya da "34")."""
+    tolerance = 0.5 * 10 ** -decimals + 1e-9
+    if abs(found - expected) > tolerance:
+        return False
+    # Tam sayıya yuvarlamayı küçük değerlerde kabul etme (0.6 blok -> "1" doğru sayılmasın)
+    return decimals > 0 or abs(expected) >= 10 or abs(found - expected) < 0.05
+
+
+def score_answer(item, answer):
+    """{"numbers_ok", "names_ok", "correct", "missing_numbers", "missing_names"}."""
+    found = extract_numbers(answer or "")
+    missing_numbers = []
+    for value in item["expected"]["numbers"]:
+        candidates = [value, value * 100] if item["expected"]["percent"] else [value]
+        if not any(number_matches(c, f, d) for c in candidates for f, d in found):
+            missing_numbers.append(value)
+    folded = fold_text(answer or "")
+    missing_names = [name for name in item["expected"]["names"] if fold_text(name) not in folded]
+    return {
+        "numbers_ok": not missing_numbers,
+        "names_ok": not missing_names,
+        "correct": not missing_numbers and not missing_names,
+        "missing_numbers": missing_numbers,
+        "missing_names": missing_names,
+    }
+
+
+if __name__ == "__main__":
+    from runtime import PLAYERS_PATH, TEAMS_PATH, load_league_data
+
+    parser = argparse.ArgumentParser(description="Veri dosyalarından değerlendirme soruları üretir.")
+    parser.add_argument("--per-player", type=int, default=9)
+    parser.add_argument("--players", type=int, default=40, help="soru sorulacak oyuncu sayısı")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+
+    players, teams = load_league_data(PLAYERS_PATH, TEAMS_PATH)
+    questions = generate(players, teams, args.per_player, args.players, args.seed)
+    counts = {kind: sum(1 for q in questions if q["kind"] == kind) for kind in KINDS}
+    print(f"{len(questions)} soru: {counts}")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(questions, f, ensure_ascii=False, indent=2)
@@ -1,154 +1,259 @@
+"""RAG değerlendirmesi: veriden üretilen sorular, sınırlı eşzamanlılık, önbellek ve kaldığı yerden devam.
+
+    python evaluate_rag.py                          # tüm sorular, yerel puanlama
+    python evaluate_rag.py --limit 100 --concurrency 4
+    python evaluate_rag.py --k 6                    # farklı k; önbellek anahtarı değişir
+    python evaluate_rag.py --ragas 30               # ayrıca 30 soruluk örnek üzerinde RAGAS
+
+Sorular eval_questions.py ile güncel data/*.json dosyalarından üretilir. Her
+üretim (soru, prompt sürümü, model, veri sürümü, k) anahtarıyla
+cache/eval/generations.sqlite3'e biter bitmez yazılır; yarıda kesilen bir
+çalıştırma tekrar başlatıldığında sadece eksik sorular üretilir. Cevaplar önce
+yerelde, beklenen sayı/isimleri içeriyor mu diye puanlanır; RAGAS sadece
+istenirse ve seçilen örnek üzerinde çalışır.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
 import os
+import random
+import sqlite3
+import sys
+import threading
 import time
-from dotenv import load_dotenv
-from datasets import Dataset
-
-from ragas import evaluate
-from ragas.metrics import faithfulness, context_recall
-
-from langchain_google_genai import (
-    ChatGoogleGenerativeAI,
-    GoogleGenerativeAIEmbeddings
-)
-from langchain_chroma import Chroma
-from langchain.chains import create_retrieval_chain
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
-load_dotenv()
-
-embeddings = GoogleGenerativeAIEmbeddings(
-    model="models/gemini-embedding-001"
-)
-
-vector_store = Chroma(
-    persist_directory="nba_fantasy_db",
-    embedding_function=embeddings
-)
-
-retriever = vector_store.as_retriever(
-    search_kwargs={"k": 10}  
-)
-
-llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0.3,max_tokens=500)
-
-
-test_set = [
-    {
-        "question": "What is the average points of Luka Doncic?",
-        "ground_truth": "Luka Doncic has an average of 33.7 points per game."
-    },
-    {
-        "question": "Who has the highest average block?",
-        "ground_truth": "victor Wembanyama has the highest average block with 3.0 blocks per game."
-    },
-    {
-        "question": "What is the field goald percentage of Donovan Mitchell?",
-        "ground_truth": "Donovan Mitchell has a field goal percentage of 49.2%."
-    },
-    {
-        "question": "Which team has the highest total rebound?",
-        "ground_truth": "Haramball has the highest total rebound with 2,371 rebounds."
-    },
-    {
-        "question": "What is Ati and The Hippos's total number of steals?",
-        "ground_truth": "Ati and The Hippos have a total of 447 steals."
+
+from eval_questions import KINDS, generate, score_answer
+from pipeline import run_sync
+from prompts import (INTENT_PROMPTS, intent_system_prompt, matchup_result_prompt_str, stats_result_prompt_str,
+                     trade_result_prompt_str)
+from rate_limit import TokenBucket, acall_with_retry
+from runtime import CACHE_DIR, get_runtime
+
+EVAL_DIR = os.path.join(CACHE_DIR, "eval")
+
+
+def prompt_version(runtime):
+    """Cevabı etkileyen promptların ve bağlam ayarlarının hash'i."""
+    payload = json.dumps({
+        "intent": intent_system_prompt,
+        "qa": INTENT_PROMPTS,
+        "stats": stats_result_prompt_str,
+        "trade": trade_result_prompt_str,
+        "matchup": matchup_result_prompt_str,
+        "budget": runtime.context_token_budget,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+def model_name(llm):
+    return getattr(llm, "model", None) or getattr(llm, "model_name", None) or type(llm).__name__
+
+
+def generation_key(question, prompt, model, version, k):
+    payload = json.dumps([question, prompt, model, version, k], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Üretilmiş cevaplar; her kayıt hemen commit edilir, kesintide sadece yarım kalanlar kaybolur."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()  # put() iş parçacıklarından çağrılır
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY,
+                question TEXT NOT NULL,
+                record TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._db.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            rows = self._db.execute(
+                f"SELECT key, record FROM generations WHERE key IN ({','.join('?' * len(batch))})", batch)
+            found.update((key, json.loads(record)) for key, record in rows)
+        return found
+
+    def put(self, key, question, record):
+        payload = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?)",
+                             (key, question, payload, time.time()))
+            self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+
+def response_record(response, seconds):
+    return {
+        "answer": response["answer"],
+        "intent": response["intent"],
+        "path": response["route"]["path"],
+        "contexts": [doc.page_content for doc in response["context"]],
+        "context_ids": [doc.id for doc in response["context"] if doc.id],
+        "tokens": response.get("tokens"),
+        "seconds": round(seconds, 3),
+    }
+
+
+async def generate_missing(runtime, pending, cache, concurrency=4, rate=2.0, retries=5):
+    """pending: [(anahtar, soru)]. Sonuçları cache'e yazar; {anahtar: kayıt} ve hata listesi döndürür."""
+    sem = asyncio.Semaphore(concurrency)
+    limiter = TokenBucket(rate, capacity=concurrency)
+    results, failed = {}, []
+    done = 0
+    started = time.perf_counter()
+
+    async def one(key, question):
+        nonlocal done
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                response = await acall_with_retry(
+                    lambda: runtime.pipeline.run(question, use_cache=False), limiter=limiter, retries=retries)
+            except Exception as e:
+                failed.append({"question": question, "error": f"{type(e).__name__}: {e}"})
+                return
+            record = response_record(response, time.perf_counter() - t0)
+        await asyncio.to_thread(cache.put, key, question, record)
+        results[key] = record
+        done += 1
+        if done % 25 == 0 or done == len(pending):
+            elapsed = time.perf_counter() - started
+            print(f"  {done}/{len(pending)} üretildi ({done / elapsed:.1f} soru/sn)", file=sys.stderr)
+
+    await asyncio.gather(*(one(key, question) for key, question in pending))
+    return results, failed
+
+
+def summarize(rows):
+    def block(subset):
+        n = len(subset)
+        if not n:
+            return {"n": 0}
+        return {
+            "n": n,
+            "accuracy": round(sum(r["score"]["correct"] for r in subset) / n, 3),
+            "numbers_ok": round(sum(r["score"]["numbers_ok"] for r in subset) / n, 3),
+            "names_ok": round(sum(r["score"]["names_ok"] for r in subset) / n, 3),
+        }
+
+    summary = {"overall": block(rows)}
+    summary["by_kind"] = {kind: block([r for r in rows if r["kind"] == kind]) for kind in KINDS}
+    intents = sorted({r["intent"] for r in rows})
+    summary["by_intent"] = {intent: block([r for r in rows if r["intent"] == intent]) for intent in intents}
+    return summary
+
+
+def run_ragas(rows, runtime, sample, seed=0):
+    """Yerel puanlamadan sonra, istenen büyüklükte örnek üzerinde RAGAS (LLM hakemli, yavaş)."""
+    from datasets import Dataset
+    from langchain_google_genai import ChatGoogleGenerativeAI
+    from ragas import evaluate
+    from ragas.metrics import context_recall, faithfulness
+
+    chosen = random.Random(seed).sample(rows, min(sample, len(rows)))
+    dataset = Dataset.from_dict({
+        "question": [r["question"] for r in chosen],
+        "answer": [r["answer"] for r in chosen],
+        "contexts": [r["contexts"] for r in chosen],
+        "ground_truth": [r["ground_truth"] for r in chosen],
+        "intent": [r["intent"] for r in chosen],
+    })
+    print("RAGAS skorları hesaplanıyor", file=sys.stderr)
+    return evaluate(
+        dataset=dataset,
+        metrics=[faithfulness, context_recall],
+        llm=ChatGoogleGenerativeAI(model="gemini-1.5-pro", temperature=0),
+        embeddings=runtime.embeddings,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=None, help="en fazla bu kadar soru (tohumlu örnek)")
+    parser.add_argument("--kinds", nargs="*", default=KINDS, choices=KINDS)
+    parser.add_argument("--per-player", type=int, default=9)
+    parser.add_argument("--players", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=2.0, help="saniyedeki en fazla istek")
+    parser.add_argument("--k", type=int, default=None, help="retriever k (varsayılan runtime ayarı)")
+    parser.add_argument("--no-cache", action="store_true", help="önbelleği okuma, hepsini yeniden üret")
+    parser.add_argument("--ragas", type=int, default=0, help="RAGAS için örnek büyüklüğü (0 = çalıştırma)")
+    parser.add_argument("--out", default=None, help="rapor JSON yolu (varsayılan cache/eval/report_<zaman>.json)")
+    args = parser.parse_args(argv)
+
+    runtime = get_runtime()
+    if args.k is not None:
+        runtime.retriever.k = args.k
+
+    items = generate(runtime.players, runtime.teams, args.per_player, args.players, args.seed, args.kinds)
+    if args.limit is not None and args.limit < len(items):
+        items = random.Random(args.seed).sample(items, args.limit)
+
+    prompt, model = prompt_version(runtime), model_name(runtime.llm)
+    version = runtime.data_version
+    keys = {item["id"]: generation_key(item["question"], prompt, model, version, runtime.retriever.k)
+            for item in items}
+
+    cache = GenerationCache(os.path.join(EVAL_DIR, "generations.sqlite3"))
+    cached = {} if args.no_cache else cache.get_many(keys.values())
+    pending = [(keys[item["id"]], item["question"]) for item in items if keys[item["id"]] not in cached]
+    print(f"{len(items)} soru: {len(items) - len(pending)} önbellekte, {len(pending)} üretilecek "
+          f"(prompt {prompt}, model {model}, veri {version}, k={runtime.retriever.k})", file=sys.stderr)
+
+    started = time.perf_counter()
+    generated, failed = run_sync(generate_missing(runtime, pending, cache, args.concurrency, args.rate))
+    generation_s = time.perf_counter() - started
+    cache.close()
+    records = {**cached, **generated}
+
+    rows = []
+    for item in items:
+        record = records.get(keys[item["id"]])
+        if record is None:
+            continue
+        rows.append({**item, **record, "score": score_answer(item, record["answer"])})
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"prompt_version": prompt, "model": model, "data_version": version,
+                   "k": runtime.retriever.k, "questions": len(items)},
+        "generation": {"cached": len(items) - len(pending), "generated": len(generated),
+                       "failed": len(failed), "seconds": round(generation_s, 1)},
+        "embedding_cache": runtime.embeddings.cache.stats() if hasattr(runtime.embeddings, "cache") else None,
+        "summary": summarize(rows),
+        "failed": failed,
+        "rows": rows,
     }
-]
-intent_system_prompt = """Analyze the question and return ONLY ONE word: 
-TRADE, STATS, GREETING, or GENERAL.
-Question: {query}"""
-intent_prompt = ChatPromptTemplate.from_template(intent_system_prompt)
-intent_chain = intent_prompt | llm | StrOutputParser()
-
-stats_prompt_str = """You are an NBA Data Analyst. Your goal is to provide precise statistical rankings.
-
-Follow these steps:
-1. Extract all players and their relevant numeric values (e.g., AVG_PTS, TOTAL_REB) from the provided Context.
-2. Convert these text-based numbers into a mental list and SORT them numerically (Descending/Ascending as requested).
-3. If the user asks for "top" or "highest", provide the top results based on your sorted list.
-4. Always cite the exact numbers for each player mentioned.
-5. If the data for a specific player is not in the context, state that you don't have that information.
-
-Context:
-{context}
-
-Question: {input}"""
-trade_prompt_str = """You are a professional NBA Fantasy Trade Consultant. 
-Use the provided Context to analyze trades and team needs.
-
-CORE INSTRUCTIONS:
-1. IF TWO PLAYERS ARE PROVIDED: Compare their statistics (AVG_PTS, AVG_REB, AVG_AST, AVG_ST, AVG_BLK, FG_PCT, etc.). Analyze who wins the trade based on which categories they improve. Say 'Accept' or 'Decline' at the end.
-2. IF USER ASKS FOR A 'FAIR TRADE': Look through the Context for players who have similar statistical profiles (e.g., similar AVG_PTS and similar roles). Suggest 2-3 names that would be a fair swap based on their overall contribution.
-3. IF USER WANTS TO IMPROVE A SPECIFIC STAT (e.g., "I need more blocks"): 
-   - Identify players in the Context who have high values in that specific category (e.g., high AVG_BLK).
-   - Suggest a strategic swap: "Trade a player with high AVG_AST for a player with high AVG_BLK if you need defensive stats."
-
-CONSTRAINTS:
-- Use ONLY the provided Context data. No external NBA knowledge.
-- If you don't have enough players in the Context to make a suggestion, say so.
-- Be concise and strategic.
-
-Context:
-{context}
-
-Question: {input}"""
-general_prompt_str = "You are a professional NBA Fantasy expert.\nContext:\n{context}"
-questions, answers, contexts, ground_truths, intents = [], [], [], [], []
-
-for item in test_set:
-    intent = intent_chain.invoke({"query": item["question"]}).strip().upper()
-    
-    if "TRADE" in intent:
-        current_sys_prompt = trade_prompt_str 
-    elif "STATS" in intent:
-        current_sys_prompt = stats_prompt_str
-    else:
-        current_sys_prompt = general_prompt_str
-
-    qa_prompt = ChatPromptTemplate.from_messages([
-        ("system", current_sys_prompt),
-        ("user", "{input}"),
-    ])
-    qa_chain = create_stuff_documents_chain(llm, qa_prompt)
-    temp_rag_chain = create_retrieval_chain(retriever, qa_chain)
-
-    response = temp_rag_chain.invoke({"input": item["question"]})
-    
-
-    questions.append(item["question"])
-    answers.append(response["answer"])
-    contexts.append([doc.page_content for doc in response["context"]])
-    ground_truths.append(item["ground_truth"])
-    intents.append(intent)
-
-    time.sleep(2) 
-
-
-dataset = Dataset.from_dict({
-    "question": questions,
-    "answer": answers,
-    "contexts": contexts,
-    "ground_truth": ground_truths,
-    "intent": intents  
-})
-
-
-print("RAGAS skorları hesaplanıyor")
-
-result = evaluate(
-    dataset=dataset,
-    metrics=[
-        faithfulness,
-        context_recall
-    ],
-    llm=ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        temperature=0
-    ),
-    embeddings=embeddings
-)
-
-print("\n RAGAS Değerlendirme Sonuçları:")
-print(result)
+    if args.ragas:
+        report["ragas"] = str(run_ragas(rows, runtime, args.ragas, args.seed))
+
+    out = args.out or os.path.join(EVAL_DIR, f"report_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\nYerel doğruluk (beklenen sayı ve isimler cevapta mı):")
+    print(json.dumps(report["summary"], indent=2))
+    if failed:
+        print(f"{len(failed)} soru üretilemedi; tekrar çalıştırınca sadece bunlar denenir.")
+    if "ragas" in report:
+        print("\n RAGAS Değerlendirme Sonuçları:")
+        print(report["ragas"])
+    print(f"Rapor: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""Ağa çıkmayan, deterministik sahte chat ve embedding modelleri (benchmark ve offline denemeler için).
+
+Gecikmeler saniye cinsindendir ve gerçek Gemini çağrılarının yerine konmak
+üzere ayarlanabilir; sync yollar time.sleep, async yollar asyncio.sleep kullanır.
+"""
+import asyncio
+import hashlib
+import re
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from prompts import intent_system_prompt
+
+_INTENT_MARKER = intent_system_prompt.split("\n", 1)[0]
+
+
+class FakeEmbeddings(Embeddings):
+    """Metnin hash'inden türetilen birim vektörler; aynı metin her zaman aynı vektörü verir."""
+
+    def __init__(self, size=256, query_latency=0.0, batch_latency=0.0, per_text_latency=0.0):
+        self.size = size
+        self.query_latency = query_latency
+        self.batch_latency = batch_latency
+        self.per_text_latency = per_text_latency
+        self.calls = 0
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+        vec = np.random.default_rng(seed).standard_normal(self.size)
+        return (vec / np.linalg.norm(vec)).tolist()
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.batch_latency + self.per_text_latency * len(texts))
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        self.calls += 1
+        time.sleep(self.query_latency)
+        return self._vector(text)
+
+    def embed_queries(self, texts):
+        """Toplu sorgu embedding'i (tek batch çağrısı gibi bekler)."""
+        self.calls += 1
+        time.sleep(self.batch_latency + self.per_text_latency * len(texts))
+        return [self._vector(t) for t in texts]
+
+    async def aembed_documents(self, texts):
+        self.calls += 1
+        await asyncio.sleep(self.batch_latency + self.per_text_latency * len(texts))
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text):
+        self.calls += 1
+        await asyncio.sleep(self.query_latency)
+        return self._vector(text)
+
+
+class FakeChatModel(BaseChatModel):
+    """İlk token'a kadar `ttft`, sonra token başına `token_latency` bekleyerek cevap akıtan model.
+
+    Niyet promptuna tek kelimelik niyet, diğerlerine promptun uzunluğunu belirten
+    sabit uzunlukta bir cevap döner.
+    """
+
+    ttft: float = 0.0
+    token_latency: float = 0.0
+    answer_tokens: int = 30
+    intent: str = "GENERAL"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply_tokens(self, messages):
+        text = "\n".join(str(m.content) for m in messages)
+        if text.startswith(_INTENT_MARKER):
+            return [self.intent]
+        numbers = re.findall(r"\d+(?:\.\d+)?", text)[:self.answer_tokens]
+        words = [f"Based on {len(text)} prompt characters:"] + numbers
+        words += ["ok"] * max(0, self.answer_tokens - len(words))
+        return [w if i == 0 else f" {w}" for i, w in enumerate(words[:self.answer_tokens])]
+
+    @staticmethod
+    def _usage(messages, n_tokens):
+        # Gerçek modeller gibi usage_metadata bildirir (giriş: karakter/4 tahmini)
+        n_input = sum(len(str(m.content)) for m in messages) // 4
+        return {"input_tokens": n_input, "output_tokens": n_tokens, "total_tokens": n_input + n_tokens}
+
+    def _generate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        tokens = self._reply_tokens(messages)
+        time.sleep(self.ttft + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        tokens = self._reply_tokens(messages)
+        await asyncio.sleep(self.ttft + self.token_latency * len(tokens))
+        message = AIMessage(content="".join(tokens), usage_metadata=self._usage(messages, len(tokens)))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        time.sleep(self.ttft)
+        tokens = self._reply_tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                time.sleep(self.token_latency)
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(self, messages, stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any):
+        await asyncio.sleep(self.ttft)
+        tokens = self._reply_tokens(messages)
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(self.token_latency)
+            usage = self._usage(messages, len(tokens)) if i == len(tokens) - 1 else None
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token, usage_metadata=usage))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -0,0 +1,240 @@
+"""LLM intent_chain'in önünde çalışan yerel niyet sınıflandırıcı.
+
+Sıra: (1) anahtar kelime/regex kuralları, (2) örnek cümlelerin embedding
+merkezlerine (centroid) en yakın niyet, (3) güven düşükse LLM. Kurallar ağa hiç
+çıkmadan milisaniyenin altında cevap verir; LLM sadece belirsiz sorularda çağrılır.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+from embedding_cache import embedding_model_name
+from matchup_sim import STANDINGS_WORDS, mentions_matchup
+from stats_engine import STAT_PATTERNS
+from text_utils import fold_text
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ["TRADE", "STATS", "GREETING", "GENERAL"]
+
+INTENT_EXAMPLES = {
+    "TRADE": [
+        "Should I trade Donovan Mitchell for Nikola Jokic?",
+        "Suggest a fair trade for Luka Doncic",
+        "I need more blocks, I can give up assists",
+        "Is this trade fair: my Jalen Brunson for his Anthony Davis?",
+        "Who can I get in exchange for Trae Young?",
+        "Accept or decline: Ja Morant for Bam Adebayo",
+        "Luka Doncic'i kiminle takas etmeliyim?",
+        "Ribaund lazım, asist verebilirim, ne önerirsin?",
+    ],
+    "STATS": [
+        "Who has the highest average block?",
+        "What is the average points of Luka Doncic?",
+        "Which team has the highest total rebound?",
+        "What is Donovan Mitchell's field goal percentage?",
+        "Top 5 free agents by steals",
+        "How many threes has Stephen Curry made this season?",
+        "En çok asist yapan oyuncu kim?",
+        "Haramball takımının toplam sayısı kaç?",
+        "Will Haramball beat Kadıköy Bulls this week?",
+        "Projected standings for this week",
+    ],
+    "GREETING": [
+        "Hello",
+        "Hi there!",
+        "Good morning",
+        "Hey, how are you?",
+        "Thanks!",
+        "Merhaba",
+        "Selam, nasılsın?",
+        "Teşekkürler",
+    ],
+    "GENERAL": [
+        "Who are Haramball's players?",
+        "How does head-to-head 9-category scoring work?",
+        "Which free agents should I pick up this week?",
+        "Tell me about the Kadıköy Bulls roster",
+        "What position does Victor Wembanyama play?",
+        "Who is on the Ati and The Hippos team?",
+        "Haramball takımının oyuncuları kimler?",
+        "Bu hafta kimi kadroya almalıyım?",
+    ],
+}
+
+_GREETING = (r"^(hi|hello|hey|hiya|yo|howdy|greetings|good (morning|afternoon|evening)|thanks|thank you|"
+             r"merhaba|selam\w*|sa|naber|iyi (gunler|aksamlar)|tesekkur\w*|sag ol)\b")
+# "should I drop/pick up X" waiver sorusudur (GENERAL), "should I get ..." takas nesnesi olmadan belirsizdir
+_TRADE = (r"\b(trade\w*|swap\w*|takas\w*|exchange|accept|decline|fair deal|"
+          r"should i (give|send)|give (up|away)|in return|need more|"
+          r"ihtiyac\w*|lazim|verebilirim)\b")
+_STATS_WORDS = (r"\b(stat\w*|istatistik\w*|average|avg|ortalama\w*|total\w*|toplam\w*|percentage|"
+                r"how many|kac|highest|lowest|most|least|leader\w*|rank\w*|en cok|en az|en yuksek|en dusuk)\b")
+
+
+def _cosine_matrix(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class IntentRouter:
+    """classify(query) -> {"intent", "confidence", "path"}; path: "rules", "centroid" ya da "llm"."""
+
+    def __init__(self, llm_classify, embeddings=None, examples=INTENT_EXAMPLES, llm_aclassify=None,
+                 rule_threshold=0.8, centroid_threshold=0.75, centroid_margin=0.03,
+                 cache_dir=None, model_name=None):
+        self.llm_classify = llm_classify
+        self.llm_aclassify = llm_aclassify
+        self.embeddings = embeddings
+        self.examples = examples
+        self.rule_threshold = rule_threshold
+        self.centroid_threshold = centroid_threshold
+        self.centroid_margin = centroid_margin
+        self.cache_dir = cache_dir
+        # Merkez önbelleği kullanılan embedding modeline bağlı; model değişince yeniden hesaplanır
+        if model_name is None and embeddings is not None:
+            model_name = embedding_model_name(embeddings)
+        self.model_name = model_name
+        self._centroids = None
+        self._centroid_labels = None
+        self._lock = threading.Lock()
+        self.hits = Counter()
+        self.seconds = Counter()
+
+    # 1. Kurallar
+    def classify_rules(self, query):
+        """(niyet, güven) döndürür; hiçbir kural tutmazsa (None, 0.0)."""
+        folded = fold_text(query)
+        if not folded:
+            return "GREETING", 1.0
+
+        has_trade = re.search(_TRADE, folded) is not None
+        has_stat = any(re.search(pattern, folded) for pattern, _ in STAT_PATTERNS)
+        has_stats_word = re.search(_STATS_WORDS, folded) is not None
+
+        if re.search(_GREETING, folded) and len(folded.split()) <= 5 and not (has_trade or has_stat):
+            return "GREETING", 0.95
+        if has_trade:
+            # "need more blocks" gibi takas soruları istatistik kelimesi de içerir
+            return "TRADE", 0.9
+        if mentions_matchup(folded) or re.search(STANDINGS_WORDS, folded):
+            # Haftalık eşleşme/sıralama tahminleri matchup_sim ile STATS yolundan cevaplanır
+            return "STATS", 0.9
+        if has_stat and has_stats_word:
+            return "STATS", 0.95
+        if has_stat or has_stats_word:
+            return "STATS", 0.7
+        return None, 0.0
+
+    # 2. Örnek embedding merkezleri
+    def _cache_path(self):
+        payload = json.dumps([self.model_name, self.examples], sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"intent_centroids_{digest}.npz")
+
+    def _load_centroids(self):
+        if self._centroids is not None:
+            return
+        with self._lock:
+            if self._centroids is not None:
+                return
+            labels = list(self.examples)
+            path = self._cache_path() if self.cache_dir else None
+            if path and os.path.exists(path):
+                centroids = np.load(path)["centroids"]
+            else:
+                centroids = []
+                for label in labels:
+                    vectors = _cosine_matrix(self.embeddings.embed_documents(self.examples[label]))
+                    centroids.append(vectors.mean(axis=0))
+                centroids = _cosine_matrix(centroids)
+                if path:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    np.savez(path, centroids=centroids)
+            self._centroid_labels = labels
+            self._centroids = centroids
+
+    def classify_centroid(self, query, query_vector=None):
+        if query_vector is None:
+            query_vector = self.embeddings.embed_query(query)
+        self._load_centroids()
+        return self._nearest(query_vector)
+
+    def _nearest(self, query_vector):
+        sims = self._centroids @ _cosine_matrix(query_vector)
+        order = np.argsort(-sims)
+        best, second = float(sims[order[0]]), float(sims[order[1]]) if len(order) > 1 else -1.0
+        return self._centroid_labels[order[0]], best, best - second
+
+    def classify(self, query, query_vector=None):
+        started = time.perf_counter()
+        intent, confidence = self.classify_rules(query)
+        path = "rules"
+
+        if confidence < self.rule_threshold and (self.embeddings is not None or query_vector is not None):
+            try:
+                label, sim, margin = self.classify_centroid(query, query_vector)
+            except Exception as e:
+                logger.warning("Centroid sınıflandırma hatası: %s", e)
+            else:
+                if sim >= self.centroid_threshold and margin >= self.centroid_margin:
+                    intent, confidence, path = label, sim, "centroid"
+
+        if path == "rules" and confidence < self.rule_threshold:
+            intent, confidence, path = self.llm_classify(query), 1.0, "llm"
+
+        self.hits[path] += 1
+        self.seconds[path] += time.perf_counter() - started
+        return {"intent": intent, "confidence": round(float(confidence), 3), "path": path}
+
+    async def aclassify(self, query, get_vector=None):
+        """classify'ın async hali. get_vector verilirse (ör. paralel başlamış embedding görevi)
+        centroid adımı query embedding'ini ondan bekler."""
+        started = time.perf_counter()
+        intent, confidence = self.classify_rules(query)
+        path = "rules"
+
+        if confidence < self.rule_threshold and (self.embeddings is not None or get_vector is not None):
+            try:
+                if get_vector is not None:
+                    query_vector = await get_vector()
+                else:
+                    query_vector = await self.embeddings.aembed_query(query)
+                if self._centroids is None:
+                    await asyncio.to_thread(self._load_centroids)
+                label, sim, margin = self._nearest(query_vector)
+            except Exception as e:
+                logger.warning("Centroid sınıflandırma hatası: %s", e)
+            else:
+                if sim >= self.centroid_threshold and margin >= self.centroid_margin:
+                    intent, confidence, path = label, sim, "centroid"
+
+        if path == "rules" and confidence < self.rule_threshold:
+            if self.llm_aclassify is not None:
+                intent = await self.llm_aclassify(query)
+            else:
+                intent = await asyncio.to_thread(self.llm_classify, query)
+            confidence, path = 1.0, "llm"
+
+        self.hits[path] += 1
+        self.seconds[path] += time.perf_counter() - started
+        return {"intent": intent, "confidence": round(float(confidence), 3), "path": path}
+
+    def stats(self):
+        total = sum(self.hits.values())
+        return {
+            path: {
+                "hits": self.hits[path],
+                "share": round(self.hits[path] / total, 3) if total else 0.0,
+                "avg_ms": round(1000 * self.seconds[path] / self.hits[path], 3) if self.hits[path] else 0.0,
+            }
+            for path in ("rules", "centroid", "llm")
+        }
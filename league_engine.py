@@ -0,0 +1,402 @@
+"""Haftalık takım istatistiklerinden lig özetini (toplam/ortalama/FG%-FT%) vektörel hesaplayan motor.
+
+Haftalık satırlar NumPy dizilerinde (satır x SUM_COLUMNS) tutulur; toplamlar
+(lig, takım) bazında ayrı bir matriste saklanır. fold_many() tüm liglerin yeni ya
+da içeriği değişmiş haftalarını tek diziye dizer: sayılar ham metnin baytlarından
+vektörel okunur, toplamlar takım koduna göre sıralanıp tek np.add.reduceat ile
+eklenir; ham dosyadan kalkan haftalar toplamlardan çıkarılır. Görülmüş bir haftanın
+ham metninin özeti saklanan özetle karşılaştırılır, değişmemiş haftalar parse
+edilmez. Son N hafta görünümü ve kategori bazında lig sıralamaları aynı
+dizilerden hesaplanır. Durum pickle olarak saklanıp sonraki çalıştırmada kaldığı
+yerden devam edilir.
+"""
+import hashlib
+import os
+import re
+from operator import itemgetter, methodcaller
+
+import numpy as np
+import pandas as pd
+
+COUNT_STATS = ["3PTM", "PTS", "REB", "AST", "ST", "BLK", "TO"]
+SUM_COLUMNS = ["FGM", "FGA", "FTM", "FTA"] + COUNT_STATS
+# Özet dosyasındaki sıra
+SUMMARY_STATS = ["PTS", "REB", "AST", "ST", "BLK", "3PTM", "TO"]
+# Sıralamada küçük değerin iyi olduğu kategoriler
+LOWER_IS_BETTER = {"TO"}
+RANK_CATEGORIES = SUMMARY_STATS + ["FG%", "FT%"]
+KEY = ["league", "team_name"]
+
+_WEEK_KEY = re.compile(r"^week_(\d+)$")
+# Pickle durumunun biçimi; 2: hafta özetleri ham metinden (eski dosyalar baştan hesaplanır)
+STATE_VERSION = 2
+
+
+def _week_number(key):
+    m = _WEEK_KEY.match(str(key))
+    return int(m.group(1)) if m else None
+
+
+def _week_hash(lines_text, names_text):
+    """Bir haftanın ham satır metni + takım isimlerinin özeti."""
+    h = hashlib.blake2b(lines_text.encode("utf-8"), digest_size=16)
+    h.update(names_text.encode("utf-8"))
+    return h.hexdigest()
+
+
+def _offsets(parts):
+    """Tek karakterlik ayraçla birleştirilmiş metinde her parçanın başlangıcı (sonda: toplam uzunluk + 1)."""
+    lengths = np.fromiter(map(len, parts), dtype=np.int64, count=len(parts)) + 1
+    return np.r_[0, np.cumsum(lengths)].tolist()
+
+
+def _to_float(tokens):
+    """Hızlı yol float(); "-" gibi bozuk değer varsa to_numeric ile NaN'a çevrilir."""
+    try:
+        return np.fromiter(map(float, tokens), dtype=float, count=len(tokens))
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(tokens, dtype=object), errors="coerce").to_numpy(float, copy=True)
+
+
+def _split_fractions(values):
+    """["191/390", ...] -> (pay, payda) dizileri; bozuk değerlerde iki taraf da 0 (eski parse_fraction gibi)."""
+    n = len(values)
+    parts = "/".join(map(str, values)).split("/")
+    if len(parts) != 2 * n:
+        parts = []
+        for val in values:
+            made, sep, att = str(val).partition("/")
+            parts.extend((made, att) if sep and "/" not in att else ("x", "x"))
+    pairs = _to_float(parts).reshape(n, 2)
+    pairs[np.isnan(pairs).any(axis=1)] = 0.0
+    return pairs[:, 0], pairs[:, 1]
+
+
+_RAW_COLUMNS = itemgetter("FGM/A", "FTM/A", *COUNT_STATS)
+_SLASH, _ZERO = ord("/"), ord("0")
+_TEAM_STATS = methodcaller("get", "stats", {})
+_TEAM_NAME = itemgetter("team_name")
+
+
+def row_lines(rows):
+    """Her satırın "FGM/FGA/FTM/FTA/3PTM/.../TO" metni (hafta özeti ve hızlı parse için)."""
+    try:
+        return list(map("/".join, map(_RAW_COLUMNS, rows)))
+    except (KeyError, TypeError):
+        # Eksik alan ya da metin olmayan değer: eski varsayılanlarla
+        return ["/".join(map(str, (s.get("FGM/A", "0/0"), s.get("FTM/A", "0/0"), *(s.get(k, 0) for k in COUNT_STATS))))
+                for s in rows]
+
+
+def _parse_digits(lines):
+    """Satır metinleri sadece "/" ile ayrılmış negatif olmayan tam sayılarsa (satır x SUM_COLUMNS) matris,
+    değilse None. Sayılar Python float()'u yerine baytlar üzerinde okunur: her alanın sonundan
+    geriye k. basamak 10^(k-1) ile çarpılıp eklenir (en uzun alan kadar adım)."""
+    try:
+        buf = np.frombuffer("/".join(lines).encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+    sep = buf == _SLASH
+    digits = buf - np.uint8(_ZERO)  # "/" ve rakam olmayanlar taşar, 9'dan büyük olur
+    if ((digits > 9) & ~sep).any():
+        return None
+    width = len(SUM_COLUMNS)
+    ends = np.append(np.flatnonzero(sep), len(buf))
+    lengths = np.diff(ends, prepend=-1) - 1
+    # Her alan en az bir, en fazla 15 basamak (float64'te tam)
+    if len(ends) != width * len(lines) or lengths.min() < 1 or lengths.max() > 15:
+        return None
+    values = np.zeros(len(ends))
+    scale = 1.0
+    for k in range(1, int(lengths.max()) + 1):
+        # Kısa alanlarda ends - k önceki alana taşar; o basamaklar maskelenir
+        values += np.where(lengths >= k, digits[ends - k], 0) * scale
+        scale *= 10.0
+    return values.reshape(len(lines), width)
+
+
+def parse_rows(rows, lines=None):
+    """[stats dict, ...] -> (satır x SUM_COLUMNS) float matrisi. lines: row_lines(rows), hazırsa."""
+    values = np.zeros((len(rows), len(SUM_COLUMNS)))
+    if not rows:
+        return values
+    fast = _parse_digits(row_lines(rows) if lines is None else lines)
+    if fast is not None:
+        return fast
+    # Eksik alan ya da "-" gibi bozuk değer: sütun sütun, hatalılar 0
+    values[:, 0], values[:, 1] = _split_fractions([s.get("FGM/A", "0/0") for s in rows])
+    values[:, 2], values[:, 3] = _split_fractions([s.get("FTM/A", "0/0") for s in rows])
+    for i, stat in enumerate(COUNT_STATS, start=4):
+        values[:, i] = _to_float([s.get(stat, 0) for s in rows])
+    return np.nan_to_num(values, nan=0.0)
+
+
+def _with_rates(columns):
+    """Toplam sütunlarına (sütun -> dizi) ortalama ve FG%/FT% sütunlarını ekler."""
+    weeks = columns["weeks_played"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for stat in COUNT_STATS:
+            columns[f"AVG_{stat}"] = np.where(weeks > 0, columns[stat] / weeks, 0.0)
+        for pct, made, att in (("FG%", "FGM", "FGA"), ("FT%", "FTM", "FTA")):
+            a = columns[att]
+            columns[pct] = np.where(a > 0, columns[made] / a, 0.0)
+    return columns
+
+
+class LeagueAggregator:
+    def __init__(self):
+        self.teams = []  # kod -> (lig, takım)
+        self._codes = {}  # (lig, takım) -> kod
+        self._sums = np.zeros((0, len(SUM_COLUMNS)))
+        self._weeks_played = np.zeros(0)
+        # Haftalık satırlar: parça listeleri, gerektiğinde birleştirilir
+        self._chunks = []
+        self.week_hashes = {}  # (lig, hafta) -> haftanın ham metninin özeti
+        self._index = None  # takım kodu sırasıyla (lig, takım) MultiIndex'i ve lig kodları
+
+    def _code(self, league, team_name):
+        key = (league, team_name)
+        code = self._codes.get(key)
+        if code is None:
+            code = self._codes[key] = len(self.teams)
+            self.teams.append(key)
+        return code
+
+    def _grow(self):
+        missing = len(self.teams) - len(self._weeks_played)
+        if missing > 0:
+            self._sums = np.vstack([self._sums, np.zeros((missing, len(SUM_COLUMNS)))])
+            self._weeks_played = np.concatenate([self._weeks_played, np.zeros(missing)])
+
+    def _weekly(self):
+        """(takım kodu, hafta, sıra, değerler) dizileri."""
+        if len(self._chunks) > 1:
+            self._chunks = [tuple(np.concatenate(parts) for parts in zip(*self._chunks))]
+        if not self._chunks:
+            return np.zeros(0, int), np.zeros(0, int), np.zeros(0, int), np.zeros((0, len(SUM_COLUMNS)))
+        return self._chunks[0]
+
+    # Güncelleme
+    def fold(self, raw, league="default", recheck=True):
+        """Ligin ham haftalık dosyasının tamamını (hafta -> takımlar) işler.
+
+        Yeni ya da içeriği değişen haftaları ekler, dosyada artık olmayan haftaları çıkarır;
+        (eklenen, değişen, silinen) hafta listelerini döndürür. recheck=True ise daha önce
+        görülmüş haftaların ham metin özeti saklanan özetle karşılaştırılır (parse etmekten
+        çok daha ucuz), sadece farklı olanlar parse edilir; recheck=False ise görülmüş
+        haftalara hiç bakılmaz.
+        """
+        return self.fold_many({league: raw}, recheck)[league]
+
+    def fold_many(self, raws, recheck=True):
+        """fold'un çok ligli hali: {lig: ham dosya} -> {lig: (eklenen, değişen, silinen)}.
+
+        Tüm liglerin aday satırları tek listede toplanır; özet, parse ve toplama bir kez yapılır.
+        """
+        candidates, flat, removed = [], [], {}
+        for league, raw in raws.items():
+            present = set()
+            for key, teams in raw.items():
+                week = _week_number(key)
+                if week is None or not teams:
+                    continue
+                present.add(week)
+                if not recheck and (league, week) in self.week_hashes:
+                    continue
+                candidates.append((league, week, len(flat), len(teams)))
+                flat += teams
+            removed[league] = sorted(week for lg, week in self.week_hashes if lg == league and week not in present)
+
+        dropped = [(league, week) for league, weeks in removed.items() for week in weeks]
+        for key in dropped:
+            self.week_hashes.pop(key)
+
+        rows = list(map(_TEAM_STATS, flat))
+        names = list(map(_TEAM_NAME, flat))
+        lines = row_lines(rows)
+        # Hafta özetleri tek birleşik metnin dilimlerinden
+        lines_text, line_at = "\n".join(lines), _offsets(lines)
+        names_text, name_at = "\x1f".join(names), _offsets(names)
+        added = {league: [] for league in raws}
+        changed = {league: [] for league in raws}
+        keep = np.zeros(len(rows), dtype=bool)
+        kept = []
+        for league, week, start, size in candidates:
+            end = start + size
+            digest = _week_hash(lines_text[line_at[start]:line_at[end] - 1], names_text[name_at[start]:name_at[end] - 1])
+            old = self.week_hashes.get((league, week))
+            if old == digest:
+                continue
+            if old is None:
+                added[league].append(week)
+            else:
+                changed[league].append(week)
+                dropped.append((league, week))
+            self.week_hashes[(league, week)] = digest
+            keep[start:start + size] = True
+            kept.append((league, week, size))
+        if dropped:
+            self._drop_weeks(dropped)
+
+        if kept:
+            idx = np.flatnonzero(keep)
+            if len(idx) < len(rows):
+                positions_list = idx.tolist()
+                rows, lines, names = ([seq[i] for i in positions_list] for seq in (rows, lines, names))
+            values = parse_rows(rows, lines)
+            # Takım kodu satır başına değil, benzersiz (lig, isim) başına bulunur
+            sizes = np.array([size for _, _, size in kept])
+            league_codes, league_names = pd.factorize(np.array([league for league, _, _ in kept], dtype=object))
+            name_codes, unique_names = pd.factorize(np.asarray(names, dtype=object))
+            pairs, pair_codes = np.unique(np.repeat(league_codes, sizes) * len(unique_names) + name_codes,
+                                          return_inverse=True)
+            codes = np.array([self._code(league_names[p // len(unique_names)], unique_names[p % len(unique_names)])
+                              for p in pairs.tolist()], dtype=int)[pair_codes]
+            weeks = np.repeat([week for _, week, _ in kept], sizes)
+            positions = np.arange(len(idx)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+            self._grow()
+            # Tek geçişte: koda göre sırala, her takımın satırlarını reduceat ile topla
+            order = np.argsort(codes, kind="stable")
+            sorted_codes = codes[order]
+            starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+            team_codes = sorted_codes[starts]
+            self._sums[team_codes] += np.add.reduceat(values[order], starts, axis=0)
+            self._weeks_played[team_codes] += np.diff(np.r_[starts, len(order)])
+            self._chunks.append((codes, weeks, positions, values))
+        return {league: (sorted(added[league]), sorted(changed[league]), removed[league]) for league in raws}
+
+    def _drop_weeks(self, pairs):
+        """(lig, hafta) çiftlerinin satırlarını toplamlardan ve haftalık dizilerden çıkarır."""
+        codes, week_arr, positions, values = self._weekly()
+        if not len(codes):
+            return
+        league_ids = {}
+        code_league = np.array([league_ids.setdefault(lg, len(league_ids)) for lg, _ in self.teams], dtype=np.int64)
+        targets = [league_ids[lg] * (2 ** 32) + week for lg, week in pairs if lg in league_ids]
+        mask = np.isin(code_league[codes] * (2 ** 32) + week_arr, targets)
+        np.subtract.at(self._sums, codes[mask], values[mask])
+        np.subtract.at(self._weeks_played, codes[mask], 1.0)
+        keep = ~mask
+        self._chunks = [(codes[keep], week_arr[keep], positions[keep], values[keep])]
+
+    # Görünümler
+    def _team_index(self):
+        """(lig, takım) MultiIndex'i ve takım başına lig kodu; yeni takım gelince yeniden kurulur."""
+        if self._index is None or len(self._index[0]) != len(self.teams):
+            index = pd.MultiIndex.from_tuples(self.teams, names=KEY) if self.teams else \
+                pd.MultiIndex.from_tuples([], names=KEY)
+            self._index = (index, pd.factorize(index.get_level_values("league"))[0])
+        return self._index
+
+    def _view(self, last_n=None):
+        """(aktif takım maskesi, sütun -> dizi): toplamlar, ortalamalar ve oranlar."""
+        if last_n is None:
+            sums, played = self._sums, self._weeks_played
+        else:
+            codes, weeks, _, values = self._weekly()
+            # Her takımın haftalarını yeniden eskiye sırala, ilk last_n satırı al
+            order = np.lexsort((-weeks, codes))
+            sorted_codes = codes[order]
+            starts = np.searchsorted(sorted_codes, sorted_codes, side="left")
+            keep = order[(np.arange(len(order)) - starts) < last_n]
+            sums = np.zeros_like(self._sums)
+            played = np.zeros_like(self._weeks_played)
+            np.add.at(sums, codes[keep], values[keep])
+            np.add.at(played, codes[keep], 1.0)
+        active = played > 0
+        columns = {col: sums[active, i] for i, col in enumerate(SUM_COLUMNS)}
+        columns["weeks_played"] = played[active]
+        return active, _with_rates(columns)
+
+    def totals(self, last_n=None):
+        """(lig, takım) bazında toplamlar, ortalamalar ve oranlar. last_n: sadece son N hafta."""
+        active, columns = self._view(last_n)
+        return pd.DataFrame(columns, index=self._team_index()[0][active])
+
+    def ranks(self, last_n=None):
+        """Her kategoride lig içi sıralama (1 = en iyi; TO'da en az olan; eşitlerde en küçük sıra)."""
+        active, columns = self._view(last_n)
+        index, league_codes = self._team_index()
+        leagues = league_codes[active]
+        positions = np.arange(len(leagues))
+        out = {}
+        for cat in RANK_CATEGORIES:
+            values = columns[f"AVG_{cat}" if cat in COUNT_STATS else cat]
+            key = values if cat in LOWER_IS_BETTER else -values
+            # Lig, sonra değer sırası; her satırın sırası = eşit değer grubunun başı - lig grubunun başı
+            order = np.lexsort((key, leagues))
+            sorted_key, sorted_league = key[order], leagues[order]
+            new_league = np.r_[True, sorted_league[1:] != sorted_league[:-1]]
+            new_value = new_league | np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+            league_start = np.maximum.accumulate(np.where(new_league, positions, 0))
+            value_start = np.maximum.accumulate(np.where(new_value, positions, 0))
+            rank = np.empty(len(leagues), dtype=int)
+            rank[order] = value_start - league_start + 1
+            out[cat] = rank
+        return pd.DataFrame(out, index=index[active])
+
+    def team_order(self, league):
+        """Takımların ilk göründükleri (hafta, sıra) düzeni; eski çıktıdaki sırayı korur."""
+        codes, weeks, positions, _ = self._weekly()
+        first = {}
+        for c, w, p in zip(codes.tolist(), weeks.tolist(), positions.tolist()):
+            if self.teams[c][0] == league and (c not in first or (w, p) < first[c]):
+                first[c] = (w, p)
+        return [self.teams[c][1] for c in sorted(first, key=first.get)]
+
+    def to_records(self, league="default"):
+        """convert_to_avg_total.py'nin yazdığı nba_league_summary.json formatı."""
+        records = []
+        for team_name in self.team_order(league):
+            code = self._codes[(league, team_name)]
+            row = dict(zip(SUM_COLUMNS, self._sums[code].tolist()))
+            wp = int(self._weeks_played[code])
+            summary = {
+                "team_name": team_name,
+                "weeks_counted": wp,
+                "totals": {
+                    **{s: row[s] for s in SUMMARY_STATS},
+                    "FGM/A": f"{int(row['FGM'])}/{int(row['FGA'])}",
+                    "FTM/A": f"{int(row['FTM'])}/{int(row['FTA'])}",
+                },
+                # Yuvarlama Python round ile; eski çıktıyla birebir aynı kalsın
+                "averages": {
+                    **{s: round(row[s] / wp, 2) for s in SUMMARY_STATS},
+                    "FG%": round(row["FGM"] / row["FGA"], 3) if row["FGA"] > 0 else 0,
+                    "FT%": round(row["FTM"] / row["FTA"], 3) if row["FTA"] > 0 else 0,
+                },
+            }
+            summary["text_description"] = (
+                f"{team_name} takımı {wp} hafta boyunca toplam {summary['totals']['PTS']} sayı attı "
+                f"ve maç başına {summary['averages']['PTS']} ortalama yakaladı."
+            )
+            records.append(summary)
+        return records
+
+    # Kalıcılık
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pd.to_pickle({"teams": self.teams, "sums": self._sums, "weeks_played": self._weeks_played,
+                      "weekly": self._weekly(), "week_hashes": self.week_hashes,
+                      "version": STATE_VERSION}, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        agg = cls()
+        if path and os.path.exists(path):
+            try:
+                state = pd.read_pickle(path)
+                if state.get("version") != STATE_VERSION:
+                    # Eski biçimdeki özetler ham metinle karşılaştırılamaz
+                    raise ValueError(f"durum biçimi {state.get('version')}, beklenen {STATE_VERSION}")
+                agg.teams = list(state["teams"])
+                agg._codes = {key: i for i, key in enumerate(agg.teams)}
+                agg._sums, agg._weeks_played = state["sums"], state["weeks_played"]
+                agg._chunks = [state["weekly"]]
+                agg.week_hashes = state["week_hashes"]
+            except Exception as e:
+                print(f"Toplam durumu okunamadı, baştan hesaplanacak: {e}")
+                agg = cls()
+        return agg
@@ -0,0 +1,386 @@
+"""Fetch scriptleri ve uygulamanın paylaştığı tek dosyalık SQLite lig deposu.
+
+Tablolar: oyuncular (güncel kayıt), oyuncu istatistik geçmişi (her fetch'te
+sadece değişen kayıtlar), takım özetleri ve haftalık takım istatistikleri. Her
+değişiklik bir snapshot satırı açar; snapshot ID'si deponun sürümüdür. WAL modu
+sayesinde fetch yazarken uygulama okumaya devam eder. JSON dosyaları uyumluluk
+için export() ile aynı formatta üretilmeye devam eder.
+
+    python league_store.py --import      # data/*.json -> data/league.sqlite3
+    python league_store.py --export      # data/league.sqlite3 -> data/*.json
+    python league_store.py --stats
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from text_utils import fold_text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+STORE_PATH = os.path.join(DATA_DIR, "league.sqlite3")
+PLAYERS_JSON = os.path.join(DATA_DIR, "nba_fantasy_players.json")
+TEAMS_JSON = os.path.join(DATA_DIR, "nba_league_summary.json")
+WEEKS_JSON = os.path.join(DATA_DIR, "nba_league_stats.json")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    source TEXT,
+    created_at REAL NOT NULL,
+    added INTEGER NOT NULL DEFAULT 0,
+    changed INTEGER NOT NULL DEFAULT 0,
+    removed INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS players (
+    player_id TEXT PRIMARY KEY,
+    name TEXT,
+    name_folded TEXT,
+    current_team TEXT,
+    position TEXT,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS players_name ON players(name_folded);
+CREATE INDEX IF NOT EXISTS players_team ON players(current_team);
+CREATE TABLE IF NOT EXISTS player_positions (
+    player_id TEXT NOT NULL,
+    position TEXT NOT NULL,
+    PRIMARY KEY (player_id, position)
+);
+CREATE INDEX IF NOT EXISTS player_positions_position ON player_positions(position);
+CREATE TABLE IF NOT EXISTS player_stats (
+    player_id TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (player_id, snapshot_id)
+);
+CREATE TABLE IF NOT EXISTS teams (
+    team_name TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS team_week_stats (
+    week INTEGER NOT NULL,
+    team_name TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    stats TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    snapshot_id INTEGER NOT NULL,
+    PRIMARY KEY (week, team_name)
+);
+CREATE INDEX IF NOT EXISTS team_week_stats_team ON team_week_stats(team_name);
+CREATE TABLE IF NOT EXISTS exports (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER,
+    size INTEGER,
+    version INTEGER
+);
+"""
+
+
+def _atomic_write(path, write):
+    """write(f) geçici dosyaya yazar, sonra os.replace; okuyan taraf yarım dosya görmez."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".tmp_", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_json(path, data, indent=4):
+    _atomic_write(path, lambda f: json.dump(data, f, ensure_ascii=False, indent=indent))
+
+
+def atomic_write_json_array(path, items, indent=4):
+    """json.dump(list(items), indent=indent) ile aynı çıktı, ama elemanlar tek tek yazılır (liste tutulmaz)."""
+    pad = " " * indent
+
+    def write(f):
+        first = True
+        for item in items:
+            text = json.dumps(item, ensure_ascii=False, indent=indent).replace("\n", "\n" + pad)
+            f.write(("[\n" if first else ",\n") + pad + text)
+            first = False
+        f.write("[]" if first else "\n]")
+
+    _atomic_write(path, write)
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+
+def _hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _file_signature(path):
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _positions(position):
+    return sorted({p for p in str(position or "").split("/") if p and p != "N/A"})
+
+
+class LeagueStore:
+    def __init__(self, path=STORE_PATH, clock=time.time):
+        self.path = path
+        self._clock = clock
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    # Sürüm
+    def version(self):
+        """Son snapshot ID'si (hiç veri yoksa 0). Değişmediyse okuyanın yeniden yüklemesine gerek yok."""
+        row = self._db.execute("SELECT MAX(id) FROM snapshots").fetchone()
+        return row[0] or 0
+
+    def snapshots(self, limit=20):
+        rows = self._db.execute(
+            "SELECT id, kind, source, created_at, added, changed, removed FROM snapshots "
+            "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        keys = ["id", "kind", "source", "created_at", "added", "changed", "removed"]
+        return [dict(zip(keys, row)) for row in rows]
+
+    def _open_snapshot(self, kind, source):
+        cur = self._db.execute("INSERT INTO snapshots (kind, source, created_at) VALUES (?, ?, ?)",
+                               (kind, source, self._clock()))
+        return cur.lastrowid
+
+    def _close_snapshot(self, snapshot_id, added, changed, removed):
+        if added or changed or removed:
+            self._db.execute("UPDATE snapshots SET added = ?, changed = ?, removed = ? WHERE id = ?",
+                             (len(added), len(changed), len(removed), snapshot_id))
+            return snapshot_id
+        # Hiçbir şey değişmediyse sürüm artmasın
+        self._db.execute("DELETE FROM snapshots WHERE id = ?", (snapshot_id,))
+        return None
+
+    # Yazma
+    def upsert_players(self, records, source=None, full=True):
+        """Sadece yeni/değişen oyuncuları yazar ve istatistik geçmişine ekler.
+
+        full=True ise listede olmayan oyuncular güncel tablodan silinir (geçmişleri kalır).
+        """
+        with self._lock, self._db:
+            existing = dict(self._db.execute("SELECT player_id, content_hash FROM players"))
+            snapshot_id = self._open_snapshot("players", source)
+            added, changed, seen = [], [], set()
+            for seq, record in enumerate(records):
+                pid = str(record["player_id"])
+                seen.add(pid)
+                text = _dumps(record)
+                digest = _hash(text)
+                old = existing.get(pid)
+                if old == digest:
+                    self._db.execute("UPDATE players SET seq = ? WHERE player_id = ? AND seq != ?", (seq, pid, seq))
+                    continue
+                (added if old is None else changed).append(pid)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO players (player_id, name, name_folded, current_team, position, "
+                    "seq, data, content_hash, snapshot_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (pid, record.get("name"), fold_text(record.get("name") or ""), record.get("current_team"),
+                     record.get("position"), seq, text, digest, snapshot_id))
+                self._db.execute("DELETE FROM player_positions WHERE player_id = ?", (pid,))
+                self._db.executemany("INSERT INTO player_positions (player_id, position) VALUES (?, ?)",
+                                     [(pid, pos) for pos in _positions(record.get("position"))])
+                self._db.execute("INSERT OR REPLACE INTO player_stats (player_id, snapshot_id, data) VALUES (?, ?, ?)",
+                                 (pid, snapshot_id, text))
+            removed = [pid for pid in existing if pid not in seen] if full else []
+            for pid in removed:
+                self._db.execute("DELETE FROM players WHERE player_id = ?", (pid,))
+                self._db.execute("DELETE FROM player_positions WHERE player_id = ?", (pid,))
+            snapshot = self._close_snapshot(snapshot_id, added, changed, removed)
+        return {"snapshot": snapshot, "added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    def upsert_teams(self, records, source=None):
+        """Takım özetleri (nba_league_summary.json formatı); listede olmayan takımlar silinir."""
+        with self._lock, self._db:
+            existing = dict(self._db.execute("SELECT team_name, content_hash FROM teams"))
+            snapshot_id = self._open_snapshot("teams", source)
+            added, changed, seen = [], [], set()
+            for seq, record in enumerate(records):
+                name = record["team_name"]
+                seen.add(name)
+                text = _dumps(record)
+                digest = _hash(text)
+                old = existing.get(name)
+                if old == digest:
+                    self._db.execute("UPDATE teams SET seq = ? WHERE team_name = ? AND seq != ?", (seq, name, seq))
+                    continue
+                (added if old is None else changed).append(name)
+                self._db.execute("INSERT OR REPLACE INTO teams (team_name, seq, data, content_hash, snapshot_id) "
+                                 "VALUES (?, ?, ?, ?, ?)", (name, seq, text, digest, snapshot_id))
+            removed = [name for name in existing if name not in seen]
+            self._db.executemany("DELETE FROM teams WHERE team_name = ?", [(name,) for name in removed])
+            snapshot = self._close_snapshot(snapshot_id, added, changed, removed)
+        return {"snapshot": snapshot, "added": len(added), "changed": len(changed), "removed": len(removed)}
+
+    def upsert_weeks(self, weeks, source=None):
+        """{"week_N": [{"team_name", "stats"}]} -> sadece içeriği değişen (hafta, takım) satırları yazılır."""
+        with self._lock, self._db:
+            existing = {(w, t): h for w, t, h in
+                        self._db.execute("SELECT week, team_name, content_hash FROM team_week_stats")}
+            snapshot_id = self._open_snapshot("weeks", source)
+            added, changed = [], []
+            for key, teams in weeks.items():
+                week = int(str(key).rsplit("_", 1)[-1])
+                for seq, team in enumerate(teams):
+                    text = _dumps(team.get("stats", {}))
+                    digest = _hash(f"{seq}:{text}")
+                    old = existing.get((week, team["team_name"]))
+                    if old == digest:
+                        continue
+                    (added if old is None else changed).append((week, team["team_name"]))
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO team_week_stats (week, team_name, seq, stats, content_hash, "
+                        "snapshot_id) VALUES (?, ?, ?, ?, ?, ?)",
+                        (week, team["team_name"], seq, text, digest, snapshot_id))
+            snapshot = self._close_snapshot(snapshot_id, added, changed, [])
+        return {"snapshot": snapshot, "added": len(added), "changed": len(changed), "removed": 0}
+
+    # Okuma
+    def players(self):
+        return list(self.iter_players())
+
+    def iter_players(self):
+        return (json.loads(data) for (data,) in self._db.execute("SELECT data FROM players ORDER BY seq"))
+
+    def teams(self):
+        return [json.loads(data) for (data,) in self._db.execute("SELECT data FROM teams ORDER BY seq")]
+
+    def weeks(self):
+        out = {}
+        for week, team_name, stats in self._db.execute(
+                "SELECT week, team_name, stats FROM team_week_stats ORDER BY week, seq"):
+            out.setdefault(f"week_{week}", []).append({"team_name": team_name, "stats": json.loads(stats)})
+        return out
+
+    def completed_weeks(self):
+        return {week for (week,) in self._db.execute("SELECT DISTINCT week FROM team_week_stats")}
+
+    def find_players(self, name=None, team=None, position=None, limit=50):
+        """İndeksli arama: isim (accent/büyük-küçük harf duyarsız, tam eşleşme), fantasy takımı, pozisyon."""
+        sql = "SELECT p.data FROM players p"
+        where, params = [], []
+        if position:
+            sql += " JOIN player_positions pp ON pp.player_id = p.player_id"
+            where.append("pp.position = ?")
+            params.append(position.upper())
+        if name:
+            where.append("p.name_folded = ?")
+            params.append(fold_text(name))
+        if team:
+            where.append("p.current_team = ?")
+            params.append(team)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY p.seq LIMIT ?"
+        params.append(limit)
+        return [json.loads(data) for (data,) in self._db.execute(sql, params)]
+
+    def player_history(self, player_id):
+        rows = self._db.execute(
+            "SELECT s.id, s.created_at, ps.data FROM player_stats ps JOIN snapshots s ON s.id = ps.snapshot_id "
+            "WHERE ps.player_id = ? ORDER BY s.id", (str(player_id),)).fetchall()
+        return [{"snapshot": sid, "created_at": created, "record": json.loads(data)} for sid, created, data in rows]
+
+    def stats(self):
+        counts = {}
+        for table in ("players", "player_stats", "teams", "team_week_stats", "snapshots"):
+            counts[table] = self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        counts["version"] = self.version()
+        return counts
+
+    # JSON uyumluluğu
+    def import_json(self, players_path=PLAYERS_JSON, teams_path=TEAMS_JSON, weeks_path=WEEKS_JSON):
+        result = {}
+        for kind, path, upsert in (("players", players_path, self.upsert_players),
+                                   ("teams", teams_path, self.upsert_teams),
+                                   ("weeks", weeks_path, self.upsert_weeks)):
+            if path and os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    result[kind] = upsert(json.load(f), source=os.path.basename(path))
+                self._record_export(path)
+        return result
+
+    def export_json(self, players_path=PLAYERS_JSON, teams_path=TEAMS_JSON, weeks_path=WEEKS_JSON):
+        """Eski scriptlerin ürettiği JSON dosyalarını aynı formatta (indent=4) yazar. None verilen atlanır."""
+        if players_path:
+            # Oyuncular tek tek yazılır, oyuncu havuzu büyüse de bellek kullanımı sabit kalır
+            atomic_write_json_array(players_path, self.iter_players())
+            self._record_export(players_path)
+        for path, read in ((teams_path, self.teams), (weeks_path, self.weeks)):
+            if path:
+                atomic_write_json(path, read())
+                self._record_export(path)
+
+    def _record_export(self, path):
+        mtime_ns, size = _file_signature(path)
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO exports (path, mtime_ns, size, version) VALUES (?, ?, ?, ?)",
+                             (os.path.abspath(path), mtime_ns, size, self.version()))
+
+    def json_in_sync(self, *paths):
+        """JSON dosyaları en son bu depodan yazıldı/okunduysa ve o zamandan beri elle değişmediyse True.
+
+        Dosya başka bir yoldan (ör. eski notebook) yeniden yazıldıysa okuyanlar JSON'a dönmeli.
+        """
+        for path in paths:
+            row = self._db.execute("SELECT mtime_ns, size FROM exports WHERE path = ?",
+                                   (os.path.abspath(path),)).fetchone()
+            if row is None or not os.path.exists(path) or tuple(row) != _file_signature(path):
+                return False
+        return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite lig deposu.")
+    parser.add_argument("--path", default=STORE_PATH)
+    parser.add_argument("--import", dest="do_import", action="store_true", help="data/*.json dosyalarını depoya aktar")
+    parser.add_argument("--export", action="store_true", help="depodan data/*.json dosyalarını yeniden üret")
+    parser.add_argument("--stats", action="store_true")
+    args = parser.parse_args(argv)
+
+    store = LeagueStore(args.path)
+    if args.do_import:
+        print(f"İçe aktarıldı: {store.import_json()}")
+    if args.export:
+        store.export_json()
+        print("JSON dosyaları yazıldı.")
+    if args.stats or not (args.do_import or args.export):
+        print(store.stats())
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
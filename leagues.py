@@ -0,0 +1,233 @@
+"""Birden çok ligi tek süreçte sunmak için lig kapsamlı yollar ve LRU runtime kayıt defteri.
+
+Varsayılan lig eskisi gibi data/ ve nba_fantasy_db/ kullanır. Diğer her lig
+kendi klasöründedir:
+
+    leagues/<lig_id>/data/*.json, league.sqlite3   (fetch scriptleri --league ile yazar)
+    leagues/<lig_id>/chroma/                        (build_index.py --league ile)
+    leagues/<lig_id>/cache/                         (cevap önbelleği, izler)
+
+LeagueRegistry bir ligin runtime'ını (veri, indeksler, Chroma koleksiyonu) ilk
+istekte kurar ve LRU'da tutar; lig sayısı ya da tahmini bellek sınırı aşılınca
+en uzun süredir kullanılmayan lig bırakılır. Embedding ve LLM istemcileri tüm
+liglerde ortaktır. Bir ligin dosyaları değişirse sadece o lig yeniden kurulur.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LEAGUES_DIR = os.path.join(BASE_DIR, "leagues")
+DEFAULT_LEAGUE = "default"
+
+# Yahoo lig anahtarları "466.l.12345" biçiminde; klasör adı olarak güvenli karakterler
+_LEAGUE_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$")
+
+
+def check_league_id(league_id):
+    if not _LEAGUE_ID.match(league_id or ""):
+        raise ValueError(f"Geçersiz lig ID'si: {league_id!r}")
+    return league_id
+
+
+def league_paths(league_id=DEFAULT_LEAGUE):
+    """Ligin veri, depo, Chroma ve önbellek yolları."""
+    league_id = check_league_id(league_id or DEFAULT_LEAGUE)
+    if league_id == DEFAULT_LEAGUE:
+        root, chroma_dir = BASE_DIR, os.path.join(BASE_DIR, "nba_fantasy_db")
+    else:
+        root = os.path.join(LEAGUES_DIR, league_id)
+        chroma_dir = os.path.join(root, "chroma")
+    data_dir = os.path.join(root, "data")
+    return {
+        "league": league_id,
+        "data_dir": data_dir,
+        "players_path": os.path.join(data_dir, "nba_fantasy_players.json"),
+        "teams_path": os.path.join(data_dir, "nba_league_summary.json"),
+        "stats_path": os.path.join(data_dir, "nba_league_stats.json"),
+        "store_path": os.path.join(data_dir, "league.sqlite3"),
+        "chroma_dir": chroma_dir,
+        "cache_dir": os.path.join(root, "cache"),
+    }
+
+
+def signature_paths(paths):
+    """Değişince lig runtime'ının yeniden kurulduğu dosyalar. Haftalık istatistikler de dahil:
+    eşleşme simülatörü ve data_version onlardan gelir."""
+    return (paths["players_path"], paths["teams_path"], paths["chroma_dir"], paths["stats_path"])
+
+
+def list_leagues():
+    """Verisi hazır (oyuncu ve takım JSON'ları mevcut) ligler; varsayılan lig başta."""
+    found = []
+    candidates = [DEFAULT_LEAGUE]
+    if os.path.isdir(LEAGUES_DIR):
+        candidates += sorted(name for name in os.listdir(LEAGUES_DIR) if _LEAGUE_ID.match(name))
+    for league_id in candidates:
+        paths = league_paths(league_id)
+        if os.path.exists(paths["players_path"]) and os.path.exists(paths["teams_path"]):
+            found.append(league_id)
+    return found
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def estimate_bytes(runtime, paths):
+    """Bir lig runtime'ının yaklaşık bellek kullanımı.
+
+    NumPy indeksleri nbytes ile ölçülür; kayıt sözlükleri ve dökümanlar için JSON
+    boyutunun 5 katı (Python nesne yükü), Chroma için HNSW dosyalarının boyutu alınır.
+    """
+    arrays = 0
+    for table in (runtime.stats_index.players, runtime.stats_index.teams):
+        for group in (table.values, table.order, table.order_asc):
+            arrays += sum(a.nbytes for a in group.values())
+    arrays += runtime.trade_index.z.nbytes
+    json_bytes = sum(os.path.getsize(paths[k]) for k in ("players_path", "teams_path") if os.path.exists(paths[k]))
+    hnsw = sum(_dir_bytes(os.path.join(paths["chroma_dir"], d)) for d in os.listdir(paths["chroma_dir"])
+               if os.path.isdir(os.path.join(paths["chroma_dir"], d))) if os.path.isdir(paths["chroma_dir"]) else 0
+    return arrays + 5 * json_bytes + hnsw
+
+
+class LeagueRegistry:
+    """Lig runtime'larının LRU önbelleği (en fazla max_leagues lig ve ~max_bytes bellek)."""
+
+    def __init__(self, max_leagues=8, max_bytes=2 * 2 ** 30, embeddings=None, llm=None, factory=None):
+        self.max_leagues = max_leagues
+        self.max_bytes = max_bytes
+        self._embeddings = embeddings
+        self._llm = llm
+        self._factory = factory
+        self._entries = OrderedDict()  # lig -> {"runtime", "signature", "bytes", "loaded_at"}
+        self._lock = threading.Lock()
+        self._build_locks = {}
+        self.counts = {"hits": 0, "loads": 0, "reloads": 0, "evictions": 0}
+
+    def _shared_models(self):
+        # Gemini istemcileri ligler arasında paylaşılır; ilk lig kurulurken oluşturulur
+        if self._embeddings is None:
+            from runtime import default_embeddings
+            self._embeddings = default_embeddings()
+        if self._llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            self._llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0.3, max_tokens=500)
+        return self._embeddings, self._llm
+
+    def _build(self, paths):
+        from runtime import ChatbotRuntime, data_signature
+
+        embeddings, llm = self._shared_models()
+        factory = self._factory or ChatbotRuntime
+        runtime = factory(paths["players_path"], paths["teams_path"], paths["chroma_dir"],
+                          embeddings=embeddings, llm=llm, cache_dir=paths["cache_dir"])
+        # Kurulum sırasında Chroma dosyalara dokunmuş olabilir, imzayı sonradan al
+        signature = data_signature(signature_paths(paths))
+        return {"runtime": runtime, "signature": signature, "bytes": estimate_bytes(runtime, paths),
+                "loaded_at": time.time()}
+
+    def get(self, league_id=DEFAULT_LEAGUE):
+        """Ligin runtime'ı; ilk istekte ya da lig dosyaları değiştiyse kurulur."""
+        from runtime import data_signature
+
+        paths = league_paths(league_id)
+        league_id = paths["league"]
+        signature = data_signature(signature_paths(paths))
+        with self._lock:
+            entry = self._entries.get(league_id)
+            if entry is not None and entry["signature"] == signature:
+                self._entries.move_to_end(league_id)
+                self.counts["hits"] += 1
+                return entry["runtime"]
+            build_lock = self._build_locks.setdefault(league_id, threading.Lock())
+
+        # Kurulum lig başına kilitlenir: aynı ligi isteyen oturumlar bekler, diğer ligler etkilenmez
+        with build_lock:
+            with self._lock:
+                entry = self._entries.get(league_id)
+                if entry is not None and entry["signature"] == signature:
+                    self._entries.move_to_end(league_id)
+                    self.counts["hits"] += 1
+                    return entry["runtime"]
+                reload = entry is not None
+            if not os.path.exists(paths["players_path"]):
+                raise FileNotFoundError(f"{league_id} ligi için veri yok: {paths['players_path']}")
+            new_entry = self._build(paths)
+            with self._lock:
+                old = self._entries.get(league_id)
+                if old is not None:
+                    # Eski runtime'ı kullanan istekler sürüyor olabilir; dosya kaynakları onlar bitince
+                    # bırakılır. Yeni runtime aynı Chroma istemcisini kullandığı için o kapatılmaz.
+                    old["runtime"].close_when_unused()
+                self._entries[league_id] = new_entry
+                self._entries.move_to_end(league_id)
+                self.counts["reloads" if reload else "loads"] += 1
+                self._evict(keep=league_id)
+            return new_entry["runtime"]
+
+    def _evict(self, keep):
+        def over():
+            total = sum(e["bytes"] for e in self._entries.values())
+            return len(self._entries) > self.max_leagues or (self.max_bytes and total > self.max_bytes)
+
+        for league_id in list(self._entries):
+            if not over():
+                break
+            if league_id == keep:
+                continue
+            self._drop(league_id)
+
+    def _drop(self, league_id):
+        entry = self._entries.pop(league_id, None)
+        if entry is not None:
+            # Runtime o anda bir istekte kullanılıyor olabilir: kaynaklar son referans bırakılınca
+            # kapanır, lig o arada yeniden yüklendiyse Chroma istemcisi korunur
+            entry["runtime"].close_when_unused(release_index=True,
+                                               index_in_use=lambda: league_id in self._entries)
+            self.counts["evictions"] += 1
+
+    def loaded(self):
+        """Yüklü liglerin runtime'ları (LRU sırası ve imza kontrolüne dokunmadan)."""
+        with self._lock:
+            return {league_id: e["runtime"] for league_id, e in self._entries.items()}
+
+    def evict(self, league_id):
+        with self._lock:
+            self._drop(league_id)
+
+    def stats(self):
+        with self._lock:
+            loaded = {league_id: {"mb": round(e["bytes"] / 2 ** 20, 1),
+                                  "loaded_at": time.strftime("%H:%M:%S", time.localtime(e["loaded_at"]))}
+                      for league_id, e in self._entries.items()}
+            return {
+                "leagues": loaded,
+                "total_mb": round(sum(e["bytes"] for e in self._entries.values()) / 2 ** 20, 1),
+                "max_leagues": self.max_leagues,
+                "max_mb": round(self.max_bytes / 2 ** 20, 1) if self.max_bytes else None,
+                **self.counts,
+            }
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Süreç başına paylaşılan kayıt defteri. Sınırlar ortam değişkenlerinden: MAX_LEAGUES, LEAGUE_MEMORY_MB."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = LeagueRegistry(max_leagues=int(os.getenv("MAX_LEAGUES", "8")),
+                                       max_bytes=int(float(os.getenv("LEAGUE_MEMORY_MB", "2048")) * 2 ** 20))
+        return _registry
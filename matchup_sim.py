@@ -0,0 +1,316 @@
+"""Haftalık H2H 9 kategori eşleşmeleri için vektörel Monte Carlo simülatörü.
+
+    python matchup_sim.py "Haramball" "Kadıköy Bulls"
+    python matchup_sim.py --standings --sims 50000 --last 6
+
+data/nba_league_stats.json'daki haftalık takım satırlarından her takım için
+bir haftalık dağılım kurulur:
+  * hacim kategorileri (FGA, FTA, 3PTM, PTS, REB, AST, ST, BLK, TO) çok değişkenli
+    normal: ortalama takımın haftalık ortalaması, sapma az haftada lig geneli
+    değişim katsayısına doğru büzülür, korelasyon (ör. çok maç oynanan haftada
+    her şeyin artması) tüm takım-haftalardan ortak tahmin edilir
+  * FGM/FTM isabet/denemeden binom çekilir (oran lig ortalamasına doğru büzülür);
+    FG% ve FT% simüle edilmiş isabet/denemeden hesaplanır, ortalama yüzdelerden değil
+Her takım için n_sims hafta tek seferde çekilir; bütün takım çiftleri aynı
+çekimler üzerinde NumPy yayınlamasıyla karşılaştırılır (16 takım, 120 çift x
+20 000 simülasyon ~0.3 sn). Sonuç kategori başına ve genel kazanma olasılıkları ile
+herkesin herkese karşı (all-play) lig sıralaması projeksiyonudur.
+"""
+import argparse
+import json
+import re
+
+import numpy as np
+
+from league_engine import SUM_COLUMNS, _week_number, parse_rows
+from text_utils import fold_text
+
+CATEGORIES = ["FG%", "FT%", "3PTM", "PTS", "REB", "AST", "ST", "BLK", "TO"]
+# Çok değişkenli normalden çekilen sütunlar; isabetler bunlardan binomla türetilir
+VOLUME = ["FGA", "FTA", "3PTM", "PTS", "REB", "AST", "ST", "BLK", "TO"]
+# Karşılaştırmada küçük değerin iyi olduğu kategoriler
+LOWER_IS_BETTER = {"TO"}
+DEFAULT_SIMS = 20000
+
+# Katlanmış metin üzerinde; intent_router da (mentions_matchup ile) eşleşme sorularını STATS'a yönlendirir
+MATCHUP_WORDS = (r"\b(beat\w*|matchups?|match up|head to head|h2h|win (this|next) week|"
+                 r"lose (to|against)|win probability|chances? (of|to) (win|beat\w*)|"
+                 r"yener\w*|yenebilir\w*|yenme\w*|eslesme\w*|mac\w* kim)\b")
+# "LeBron vs Curry", "en çok puan kazanan" da bu kelimeleri içerir: ancak takım ya da
+# kullanıcının kendi takımı/haftası bağlamında eşleşme sayılır
+_WEAK_MATCHUP = r"\b(vs|versus|kazan\w*)\b"
+_MATCHUP_CONTEXT = r"\b(my|our|me|us|benim|bizim|team\w*|takim\w*|week|hafta\w*)\b"
+STANDINGS_WORDS = (r"\b(standings?|power rank\w*|projected (rank\w*|table|finish)|win the league|"
+                   r"puan durumu|siralama tahmini|lig lideri kim olur|sampiyon\w*)\b")
+_ME = r"\b(i|me|my|mine|we|us|our|ben|beni|benim|biz)\b"
+
+
+def _nearest_correlation(corr):
+    """Özdeğerleri pozitife kırpıp tekrar korelasyon matrisine ölçekler (Cholesky için)."""
+    values, vectors = np.linalg.eigh(corr)
+    fixed = vectors @ np.diag(np.maximum(values, 1e-6)) @ vectors.T
+    d = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(d, d)
+
+
+class MatchupSimulator:
+    def __init__(self, weeks, last_n=None, prior_weeks=4, prior_shots=300, seed=0):
+        """weeks: {"week_N": [{"team_name", "stats"}]} (recieve_teams_data.py çıktısı).
+
+        last_n: sadece son N hafta. prior_weeks: sapmanın lig geneline büzülme ağırlığı (hafta
+        cinsinden). prior_shots: FG%/FT% için lig ortalamasından eklenen sahte deneme sayısı.
+        """
+        self.seed = seed
+        self.prior_weeks = prior_weeks
+        self.prior_shots = prior_shots
+        keys = sorted((w for w in map(_week_number, weeks) if w is not None))
+        if last_n:
+            keys = keys[-last_n:]
+        self.weeks = keys
+
+        self.teams = []
+        codes, rows = [], []
+        index = {}
+        for week in keys:
+            for team in weeks.get(f"week_{week}") or []:
+                code = index.setdefault(team["team_name"], len(index))
+                if code == len(self.teams):
+                    self.teams.append(team["team_name"])
+                codes.append(code)
+                rows.append(team.get("stats", {}))
+        if len(self.teams) < 2:
+            raise ValueError("Simülasyon için en az iki takımın haftalık verisi gerekli")
+        self.team_index = index
+        self._fit(np.asarray(codes), parse_rows(rows))
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def _fit(self, codes, values):
+        n_teams = len(self.teams)
+        col = {c: i for i, c in enumerate(SUM_COLUMNS)}
+        volume = values[:, [col[c] for c in VOLUME]]
+        counts = np.bincount(codes, minlength=n_teams).astype(float)
+        self.weeks_played = counts
+
+        mean = np.zeros((n_teams, len(VOLUME)))
+        np.add.at(mean, codes, volume)
+        mean /= counts[:, None]
+        resid = volume - mean[codes]
+        var = np.zeros_like(mean)
+        np.add.at(var, codes, resid ** 2)
+        var /= np.maximum(counts - 1, 1)[:, None]
+
+        # Az haftası olan takımın sapması lig geneli değişim katsayısına doğru çekilir
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cv = np.sqrt(var) / mean
+        pooled_cv = np.nanmedian(np.where(counts[:, None] > 1, cv, np.nan), axis=0)
+        pooled_cv = np.nan_to_num(pooled_cv, nan=0.15)
+        prior_var = (pooled_cv * mean) ** 2
+        n = np.maximum(counts - 1, 0)[:, None]
+        self.mean = mean
+        self.std = np.sqrt((n * var + self.prior_weeks * prior_var) / (n + self.prior_weeks))
+
+        # Ortak korelasyon: takım içi standartlaştırılmış artıklardan
+        z = resid / np.where(self.std[codes] > 0, self.std[codes], 1.0)
+        corr = np.corrcoef(z, rowvar=False) if len(z) > 2 else np.eye(len(VOLUME))
+        corr = np.nan_to_num(corr, nan=0.0)
+        np.fill_diagonal(corr, 1.0)
+        self.corr = _nearest_correlation(corr)
+        self._chol = np.linalg.cholesky(self.corr)
+
+        # Oranlar: takım toplamı + lig ortalamasından prior_shots kadar sahte deneme
+        self.pct = {}
+        for pct, made, att in (("FG%", "FGM", "FGA"), ("FT%", "FTM", "FTA")):
+            m = np.bincount(codes, values[:, col[made]], minlength=n_teams)
+            a = np.bincount(codes, values[:, col[att]], minlength=n_teams)
+            league = m.sum() / a.sum() if a.sum() else 0.0
+            self.pct[pct] = (m + self.prior_shots * league) / (a + self.prior_shots)
+
+    def simulate(self, n_sims=DEFAULT_SIMS, seed=None, rows=None):
+        """(takım, kategori, simülasyon) float32 dizisi; kategori sırası CATEGORIES.
+
+        rows verilirse sadece o takım kodları simüle edilir. Simülasyon ekseni sonda: çift
+        karşılaştırmaları bitişik bellekte çalışır.
+        """
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        rows = np.arange(len(self.teams)) if rows is None else np.asarray(rows)
+        n_teams = len(rows)
+        z = self._chol.astype(np.float32) @ rng.standard_normal((n_teams, len(VOLUME), n_sims), dtype=np.float32)
+        mean, std = self.mean[rows].astype(np.float32), self.std[rows].astype(np.float32)
+        volume = np.rint(np.maximum(mean[:, :, None] + z * std[:, :, None], 0.0))
+
+        out = np.empty((n_teams, len(CATEGORIES), n_sims), dtype=np.float32)
+        for k, (pct, att_col) in enumerate((("FG%", 0), ("FT%", 1))):
+            attempts = volume[:, att_col].astype(np.int64)
+            made = rng.binomial(attempts, self.pct[pct][rows, None])
+            out[:, k] = made / np.maximum(attempts, 1)
+        out[:, 2:] = volume[:, 2:]
+        return out
+
+    @staticmethod
+    def _signed(sims):
+        """Büyük değer iyi olacak şekilde işaretlenmiş kopya (TO ters çevrilir)."""
+        signs = np.array([-1.0 if c in LOWER_IS_BETTER else 1.0 for c in CATEGORIES], dtype=np.float32)
+        return sims * signs[:, None]
+
+    def run(self, n_sims=DEFAULT_SIMS, seed=None):
+        """Bütün çiftler: {"teams", "category_win", "category_tie" (T x T x 9), "win", "tie" (T x T),
+        "outcomes" (T x T x sims; 1 kazanma, 0 beraberlik, -1 kaybetme), "n_sims"}."""
+        signed = self._signed(self.simulate(n_sims, seed))
+        n_teams = len(self.teams)
+        cat_win = np.zeros((n_teams, n_teams, len(CATEGORIES)))
+        cat_tie = np.zeros_like(cat_win)
+        outcomes = np.zeros((n_teams, n_teams, n_sims), dtype=np.int8)
+        for i in range(n_teams - 1):
+            # i'nin her simülasyonu j>i takımlarının aynı sıradaki simülasyonlarıyla karşılaşır
+            a, b = signed[i][None], signed[i + 1:]
+            won, lost = a > b, a < b
+            cat_win[i, i + 1:] = np.count_nonzero(won, axis=2) / n_sims
+            cat_win[i + 1:, i] = np.count_nonzero(lost, axis=2) / n_sims
+            cat_tie[i, i + 1:] = cat_tie[i + 1:, i] = 1.0 - cat_win[i, i + 1:] - cat_win[i + 1:, i]
+            net = won.view(np.int8).sum(axis=1, dtype=np.int8) - lost.view(np.int8).sum(axis=1, dtype=np.int8)
+            result = np.sign(net)
+            outcomes[i, i + 1:] = result
+            outcomes[i + 1:, i] = -result
+        win = np.count_nonzero(outcomes == 1, axis=2) / n_sims
+        tie = np.count_nonzero(outcomes == 0, axis=2) / n_sims
+        np.fill_diagonal(win, 0.0)
+        np.fill_diagonal(tie, 0.0)
+        return {"teams": list(self.teams), "category_win": cat_win, "category_tie": cat_tie,
+                "win": win, "tie": tie, "outcomes": outcomes, "n_sims": n_sims}
+
+    def matchup(self, team_a, team_b, n_sims=DEFAULT_SIMS, seed=None):
+        """İki takımın haftalık eşleşmesi: kategori başına ve genel kazanma/beraberlik/kaybetme olasılıkları."""
+        i, j = self.team_index[team_a], self.team_index[team_b]
+        if i == j:
+            raise ValueError("Bir takım kendisiyle eşleşemez")
+        sims = self.simulate(n_sims, seed, rows=[i, j])
+        a, b = self._signed(sims[0]), self._signed(sims[1])
+        won, lost = a > b, a < b
+        cats_won, cats_lost = won.sum(axis=0), lost.sum(axis=0)
+        categories = {
+            cat: {"win": float(won[k].mean()), "tie": float(1 - won[k].mean() - lost[k].mean()),
+                  "loss": float(lost[k].mean()),
+                  "mean": (float(sims[0, k].mean()), float(sims[1, k].mean()))}
+            for k, cat in enumerate(CATEGORIES)
+        }
+        return {
+            "teams": (team_a, team_b),
+            "win": float((cats_won > cats_lost).mean()),
+            "tie": float((cats_won == cats_lost).mean()),
+            "loss": float((cats_won < cats_lost).mean()),
+            "expected_categories": (float(cats_won.mean()), float(cats_lost.mean())),
+            "categories": categories,
+            "n_sims": n_sims,
+            "weeks": len(self.weeks),
+        }
+
+    def standings(self, result=None, n_sims=DEFAULT_SIMS, seed=None):
+        """All-play projeksiyonu: her takım bir haftada herkesle eşleşseydi beklenen G-B-M, beklenen
+        kategori sayısı, simülasyonların kaçında birinci olduğu ve ortalama sırası. Sıralı satırlar."""
+        result = result or self.run(n_sims, seed)
+        outcomes = result["outcomes"]
+        n_teams = len(self.teams)
+        wins = (outcomes == 1).sum(axis=1) + 0.5 * (outcomes == 0).sum(axis=1) - 0.5  # kendisiyle "beraberlik" çıkar
+        # Simülasyon başına sıra (1 = en iyi); eşitlikte en iyi sıra
+        ranks = 1 + (wins[None, :, :] > wins[:, None, :]).sum(axis=1)
+        cat_wins = result["category_win"].sum(axis=(1, 2)) / (n_teams - 1)
+        rows = []
+        for i, team in enumerate(self.teams):
+            rows.append({
+                "team": team,
+                "win": float(result["win"][i].sum()),
+                "tie": float(result["tie"][i].sum()),
+                "loss": float(n_teams - 1 - result["win"][i].sum() - result["tie"][i].sum()),
+                "categories_per_matchup": float(cat_wins[i]),
+                "p_first": float((ranks[i] == 1).mean()),
+                "mean_rank": float(ranks[i].mean()),
+            })
+        return sorted(rows, key=lambda r: (-r["win"] - 0.5 * r["tie"], r["mean_rank"]))
+
+
+def mentions_matchup(folded, has_teams=False):
+    """Katlanmış metin eşleşme sorusu mu; has_teams soruda fantasy takımı geçtiğini bildirir."""
+    if re.search(MATCHUP_WORDS, folded):
+        return True
+    return re.search(_WEAK_MATCHUP, folded) is not None and (
+        has_teams or re.search(_MATCHUP_CONTEXT, folded) is not None)
+
+
+def parse_question(text, teams, my_team=None):
+    """("matchup", (a, b)), ("standings", None) ya da None.
+
+    teams: soruda geçen fantasy takımları (sırayla). "I/my" gibi zamirler my_team'e çevrilir.
+    """
+    folded = fold_text(text)
+    if re.search(STANDINGS_WORDS, folded):
+        return "standings", None
+    if not mentions_matchup(folded, has_teams=bool(teams)):
+        return None
+    teams = list(dict.fromkeys(teams))
+    if len(teams) == 1 and my_team and my_team != teams[0] and re.search(_ME, folded):
+        teams = [my_team, teams[0]]
+    if len(teams) >= 2:
+        return "matchup", (teams[0], teams[1])
+    return None
+
+
+def render_matchup(result):
+    """Eşleşme sonucunu LLM'e verilecek kısa metne çevirir."""
+    a, b = result["teams"]
+    ea, eb = result["expected_categories"]
+    lines = [f"{a} vs {b}: weekly 9-category head-to-head, {result['n_sims']} simulations "
+             f"from {result['weeks']} weeks of history",
+             f"{a} wins {result['win']:.1%}, ties {result['tie']:.1%}, loses {result['loss']:.1%}; "
+             f"expected categories {ea:.1f}-{eb:.1f}"]
+    for cat, c in result["categories"].items():
+        fmt = "{:.3f}" if cat in ("FG%", "FT%") else "{:.1f}"
+        lines.append(f"{cat}: {a} {c['win']:.0%} / tie {c['tie']:.0%} / {b} {c['loss']:.0%} "
+                     f"(projected {fmt.format(c['mean'][0])} vs {fmt.format(c['mean'][1])})")
+    return "\n".join(lines)
+
+
+def render_standings(rows, n_sims):
+    lines = [f"Projected all-play standings for one week ({n_sims} simulations; every team "
+             f"plays every other team, ties count half)"]
+    for i, r in enumerate(rows, 1):
+        lines.append(f"{i}. {r['team']} - {r['win']:.1f}-{r['loss']:.1f}-{r['tie']:.1f}, "
+                     f"{r['categories_per_matchup']:.1f} categories per matchup, "
+                     f"first in {r['p_first']:.0%} of weeks, mean rank {r['mean_rank']:.1f}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    import time
+
+    from leagues import DEFAULT_LEAGUE, league_paths
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("teams", nargs="*", help="eşleşecek iki takım")
+    parser.add_argument("--standings", action="store_true", help="tüm çiftler ve lig sıralaması projeksiyonu")
+    parser.add_argument("--sims", type=int, default=DEFAULT_SIMS)
+    parser.add_argument("--last", type=int, default=None, help="sadece son N haftayı kullan")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--league", default=DEFAULT_LEAGUE)
+    args = parser.parse_args(argv)
+
+    sim = MatchupSimulator.from_file(league_paths(args.league)["stats_path"], last_n=args.last, seed=args.seed)
+    if len(args.teams) == 2:
+        print(render_matchup(sim.matchup(*args.teams, n_sims=args.sims)))
+    elif args.teams:
+        parser.error("iki takım ismi verin")
+    if args.standings or not args.teams:
+        started = time.perf_counter()
+        result = sim.run(args.sims)
+        rows = sim.standings(result)
+        elapsed = time.perf_counter() - started
+        print(render_standings(rows, args.sims))
+        print(f"{len(sim.teams)} takım, {len(sim.teams) * (len(sim.teams) - 1) // 2} çift, "
+              f"{elapsed:.3f} sn")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""Niyet sınıflandırma ile query embedding + retrieval'ı eşzamanlı çalıştıran async akış.
+
+Retrieval niyete bağlı değil; bu yüzden soru gelir gelmez query embedding'i ve
+onu kullanan vektör araması spekülatif olarak başlatılır, niyet aynı anda
+belirlenir. Niyet GREETING çıkarsa (ya da STATS/TRADE sorusu stats_engine /
+trade_engine'den cevaplanırsa, ya da cevap önbellekten gelirse) retrieval iptal edilir.
+Senkron adımlar (motorlar, vektör araması, bağlam tablosu) thread'de çalışır;
+ortak event loop'u (Streamlit arka plan loop'u, HTTP servisi) hiçbir istek bloklamaz.
+Her aşamanın başlangıç/bitiş zamanları kaydedilir, örtüşme buradan görülür;
+izleme açıksa (tracing.py) aynı aşamalar token sayıları ve döküman ID'leriyle
+birlikte iz dosyasına yazılır.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+from context_format import estimate_tokens
+from prompts import GREETING_MESSAGE
+from tracing import TokenUsage, capture_usage
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimer:
+    """Aşamaların isteğin başlangıcına göre başlangıç/bitiş zamanları (ms)."""
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages = {}
+
+    def now_ms(self):
+        return round(1000 * (time.perf_counter() - self.t0), 1)
+
+    async def timed(self, name, fn, *args):
+        """fn(*args) coroutine'ini ölçerek bekler. Coroutine burada oluşturulur; görev başlamadan
+        iptal edilirse hiç beklenmemiş coroutine uyarısı çıkmaz."""
+        start = self.now_ms()
+        status = "ok"
+        try:
+            return await fn(*args)
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            end = self.now_ms()
+            self.stages[name] = {"start_ms": start, "end_ms": end, "ms": round(end - start, 1), "status": status}
+
+    def record(self, name, start_ms):
+        end = self.now_ms()
+        self.stages[name] = {"start_ms": start_ms, "end_ms": end, "ms": round(end - start_ms, 1), "status": "ok"}
+
+    def overlap_ms(self, a, b):
+        """İki aşamanın aynı anda çalıştığı süre."""
+        if a not in self.stages or b not in self.stages:
+            return 0.0
+        sa, sb = self.stages[a], self.stages[b]
+        return round(max(0.0, min(sa["end_ms"], sb["end_ms"]) - max(sa["start_ms"], sb["start_ms"])), 1)
+
+
+def _cancel(*tasks):
+    for task in tasks:
+        if task is None:
+            continue
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            # Hata zaten ele alındı; "exception was never retrieved" uyarısı çıkmasın
+            task.exception()
+
+
+class AsyncPipeline:
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+    @staticmethod
+    def _trace_done(trace, timer, response, *usages):
+        """İsteğin özetini ize yazar; usages aşama başına {"input_tokens", "output_tokens"} sözlükleri."""
+        tokens = {
+            "input_tokens": sum(u["input_tokens"] for u in usages),
+            "output_tokens": sum(u["output_tokens"] for u in usages),
+            "estimated": any(u.get("estimated", False) for u in usages),
+        }
+        trace.set(intent=response["intent"], path=response["route"]["path"], cached=response["cached"],
+                  context_ids=[doc.id for doc in response["context"] if doc.id],
+                  total_ms=timer.now_ms(), tokens=tokens)
+
+    async def _embed(self, query):
+        return await self.runtime.embeddings.aembed_query(query)
+
+    async def _retrieve(self, query, embedding_task):
+        """Query embedding'i hazır olunca vektör aramasını onunla yapar (ikinci kez embed edilmez)."""
+        retriever = self.runtime.retriever
+        try:
+            query_vector = await asyncio.shield(embedding_task)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            return await retriever.ainvoke(query)
+        return await asyncio.to_thread(retriever.search, query, query_vector)
+
+    async def stream(self, query, use_cache=True):
+        """runtime.ask_stream ile aynı olayları üretir; son olayın cevabında "stages" da bulunur."""
+        rt = self.runtime
+        timer = StageTimer()
+        # İzleme kapalıyken trace None; aşağıdaki tüm "if trace" blokları atlanır
+        trace = rt.tracer.start(query)
+        intent_usage = TokenUsage() if trace else None
+        error = None
+
+        embedding_task = asyncio.ensure_future(timer.timed("query_embedding", self._embed, query))
+        retrieval_task = asyncio.ensure_future(timer.timed("retrieval", self._retrieve, query, embedding_task))
+        try:
+            with capture_usage(intent_usage):
+                route = await timer.timed(
+                    "intent", rt.intent_router.aclassify, query, lambda: asyncio.shield(embedding_task))
+            intent = route["intent"]
+            if trace:
+                trace.annotate("intent", intent=intent, path=route["path"], confidence=route["confidence"],
+                               **intent_usage.as_dict())
+            yield {"type": "route", "intent": intent, "route": route}
+
+            response = {"input": query, "intent": intent, "route": route, "context": [], "cached": False}
+            if intent == "GREETING":
+                _cancel(retrieval_task, embedding_task)
+                response["answer"] = GREETING_MESSAGE
+                response["stages"] = timer.stages
+                if trace:
+                    self._trace_done(trace, timer, response, intent_usage.as_dict())
+                yield {"type": "token", "text": GREETING_MESSAGE}
+                yield {"type": "done", "response": response}
+                return
+
+            prepared = None
+            engine = {"STATS": ("stats_engine", rt.prepare_stats),
+                      "TRADE": ("trade_engine", rt.prepare_trade)}.get(intent)
+            if engine is not None:
+                stage, prepare = engine
+                start = timer.now_ms()
+                # Motorlar (ve yedek retrieval'ları) senkron; loop'taki diğer akışları bekletmesin
+                prepared = await asyncio.to_thread(prepare, query)
+                timer.record(stage, start)
+                if prepared is not None:
+                    _cancel(retrieval_task)
+                if trace:
+                    trace.annotate(stage, hit=prepared is not None,
+                                   doc_ids=[doc.id for doc in prepared["context"]] if prepared else [])
+
+            version = rt.data_version
+            query_vector = None
+            if use_cache:
+                try:
+                    query_vector = await asyncio.shield(embedding_task)
+                except Exception as e:
+                    logger.warning("Önbellek için embedding alınamadı: %s", e)
+                entry = await asyncio.to_thread(rt.answer_cache.lookup, intent, query, version, query_vector)
+                if trace:
+                    trace.annotate("answer_cache", hit=entry is not None,
+                                   match=entry["match"] if entry is not None else None)
+                if entry is not None:
+                    _cancel(retrieval_task)
+                    response["context"] = [rt.docs_by_id[i] for i in entry["context_ids"] if i in rt.docs_by_id]
+                    response["answer"] = entry["answer"]
+                    response["cached"] = entry["match"]
+                    response["stages"] = timer.stages
+                    if trace:
+                        self._trace_done(trace, timer, response, intent_usage.as_dict())
+                    yield {"type": "context", "context": response["context"], "tokens": None}
+                    yield {"type": "token", "text": entry["answer"]}
+                    yield {"type": "done", "response": response}
+                    return
+
+            if prepared is None:
+                docs = await retrieval_task
+                start = timer.now_ms()
+                prepared = await asyncio.to_thread(rt.prepare_docs, query, intent, docs)
+                timer.record("format", start)
+                if trace:
+                    trace.annotate("retrieval", doc_ids=[doc.id for doc in docs])
+                    trace.annotate("format", **{k: v for k, v in prepared["tokens"].items() if k != "prompt_tokens"})
+
+            response["context"] = prepared["context"]
+            response["tokens"] = prepared["tokens"]
+            yield {"type": "context", "context": prepared["context"], "tokens": prepared["tokens"]}
+
+            generation_start = timer.now_ms()
+            first_token = None
+            parts = []
+            generation_usage = TokenUsage() if trace else None
+            config = {"callbacks": [generation_usage]} if trace else None
+            async for chunk in prepared["chain"].astream(prepared["inputs"], config=config):
+                if not chunk:
+                    continue
+                if first_token is None:
+                    first_token = timer.now_ms()
+                parts.append(chunk)
+                yield {"type": "token", "text": chunk}
+            timer.record("generation", generation_start)
+            finished = timer.now_ms()
+
+            response["answer"] = "".join(parts)
+            response["stages"] = timer.stages
+            response["timings"] = {
+                "prepare_ms": generation_start,
+                "ttft_ms": first_token if first_token is not None else finished,
+                "generation_ms": round(finished - generation_start, 1),
+                "total_ms": finished,
+                "intent_retrieval_overlap_ms": timer.overlap_ms("intent", "retrieval"),
+            }
+            rt.timings.append({"intent": intent, **response["timings"]})
+            if trace:
+                usage = generation_usage.as_dict()
+                if not generation_usage.reported:
+                    # Model token sayısı bildirmediyse tahmin (karakter/4) kullanılır
+                    usage.update(input_tokens=prepared["tokens"]["prompt_tokens"],
+                                 output_tokens=estimate_tokens(response["answer"]), estimated=True)
+                trace.annotate("generation", **usage)
+                trace.set(ttft_ms=response["timings"]["ttft_ms"])
+                self._trace_done(trace, timer, response, intent_usage.as_dict(), usage)
+
+            if use_cache:
+                context_ids = [doc.id for doc in prepared["context"] if doc.id]
+                await asyncio.to_thread(rt.answer_cache.store, intent, query, version, response["answer"],
+                                        context_ids, query_vector)
+            yield {"type": "done", "response": response}
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _cancel(retrieval_task, embedding_task)
+            if trace:
+                rt.tracer.finish(trace, timer.stages, error)
+
+    async def run(self, query, use_cache=True):
+        response = None
+        async for event in self.stream(query, use_cache=use_cache):
+            if event["type"] == "done":
+                response = event["response"]
+        return response
+
+
+# Senkron kod (Streamlit, notebook) async akışı tek bir arka plan event loop'u üzerinden
+# çalıştırır; async istemciler her istekte farklı bir loop'a bağlanmamış olur.
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def background_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="pipeline-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coro):
+    return asyncio.run_coroutine_threadsafe(coro, background_loop()).result()
+
+
+def iterate_async(agen):
+    """Async generator'ı senkron generator olarak tüketir."""
+    loop = background_loop()
+    try:
+        while True:
+            try:
+                item = asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
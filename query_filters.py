@@ -0,0 +1,156 @@
+"""Sorudaki yapısal kısıtları (takım, pozisyon, free agent, "X'ten fazla istatistik") Chroma `where` filtresine çevirir.
+
+"Haramball's players", "best free-agent centers", "guards averaging more than 20
+points" gibi sorularda benzerlik araması tüm koleksiyon yerine sadece filtreye
+uyan kayıtlarda yapılır; aday kümesi küçükse hiç vektör araması yapılmadan
+kümenin tamamı döner. Filtrelenen alanlar documents.record_metadata ile
+indekslenir.
+"""
+import re
+
+from stats_engine import (_ASCENDING, _DESCENDING, _POSITION_WORDS, _RAW_POSITION, CATEGORIES, FREE_AGENT,
+                          STAT_PATTERNS)
+from text_utils import fold_text
+
+POSITIONS = ("PG", "SG", "SF", "PF", "C", "G", "F")
+# Yüzde istatistiklerinin metadata anahtarları ("%" anahtar içinde kullanılmaz)
+PCT_KEYS = {"FG%": "FG_PCT", "FT%": "FT_PCT"}
+
+_PLAYER_WORDS = r"\b(players?|roster|lineup|who|oyuncu\w*|kadro\w*|kim|kimler)\b"
+_FREE_AGENT = r"\b(free[ -]agents?|fa|serbest oyuncu\w*|bosta\w*)\b"
+# fold_text noktalama işaretlerini siler; ondalıklar ve karşılaştırma işaretleri önce kelimeye çevrilir
+_SYMBOLS = [(r"(?<![\d.,])[.,](\d)", r"0_\1"), (r"(\d)[.,](\d)", r"\1_\2"), (r">=", " atleast "),
+            (r"<=", " atmost "), (r">", " over "), (r"<", " under "), (r"\+", " plus ")]
+_NUMBER = r"(\d+(?:_\d+)?)"
+_GT = r"more than|greater than|over|above|at least|atleast|min(?:imum)?|en az"
+_LT = r"less than|fewer than|under|below|at most|atmost|max(?:imum)?|en fazla"
+# Sayıdan sonra gelen Türkçe kalıplar: "20 sayidan fazla", "2 blok ustu"
+_GT_AFTER = r"(?:\w*\s+)?(?:fazla|ustu|uzeri|ve ustu|plus)"
+_LT_AFTER = r"(?:\w*\s+)?(?:az|alti|ve alti)"
+_STAT_WORDS = "|".join(pattern[3:-3] for pattern, _ in STAT_PATTERNS)
+
+
+def _stat_key(phrase, total):
+    """İfadedeki istatistiğin metadata anahtarı (AVG_PTS, TOTAL_REB, FG_PCT ...); bulunamazsa None."""
+    for pattern, stat in STAT_PATTERNS:
+        if re.search(pattern, phrase):
+            if stat in PCT_KEYS:
+                return PCT_KEYS[stat]
+            if stat in CATEGORIES:
+                return ("TOTAL_" if total else "AVG_") + stat
+            return None
+    return None
+
+
+def _number(text):
+    return float(text.replace("_", "."))
+
+
+class QueryFilterParser:
+    def __init__(self, team_names):
+        # Uzun isimler önce: "Ati and The Hippos" içindeki kısa isimler ayrıca eşleşmesin
+        names = sorted(set(team_names) - {FREE_AGENT}, key=len, reverse=True)
+        self._folded_teams = [(fold_text(name), name) for name in names]
+
+    def parse(self, text, entity_ids=()):
+        """{"record_type", "team", "positions", "free_agent", "thresholds": [(anahtar, op, değer)]};
+        kısıt yoksa None.
+
+        entity_ids soruda çözülmüş kayıtlardır; bir oyuncu adı geçiyorsa pozisyon/eşik kelimeleri o
+        oyuncuyu niteler ("Is Trae Young a good center?") ve soru liste istemiyorsa filtre yapılmaz.
+        """
+        if any(i.startswith("player:") for i in entity_ids):
+            folded = fold_text(text)
+            if not any(re.search(p, folded) for p in (_PLAYER_WORDS, _DESCENDING, _ASCENDING)):
+                return None
+        for pattern, repl in _SYMBOLS:
+            text = re.sub(pattern, repl, text)
+        folded = fold_text(text)
+        total = re.search(r"\b(total|totals|toplam\w*)\b", folded) is not None
+
+        team = None
+        for folded_name, name in self._folded_teams:
+            if re.search(rf"\b{re.escape(folded_name)}\b", folded):
+                team = name
+                folded = folded.replace(folded_name, " ")
+                text = re.sub(re.escape(name), " ", text, flags=re.IGNORECASE)
+                break
+
+        positions = set()
+        for pattern, code in _POSITION_WORDS:
+            if re.search(pattern, folded):
+                positions.add(code)
+                folded = re.sub(pattern, " ", folded)
+        positions.update(re.findall(_RAW_POSITION, text))
+
+        free_agent = re.search(_FREE_AGENT, folded) is not None
+        thresholds = self._thresholds(folded, total)
+
+        has_players = bool(positions or free_agent or thresholds) or re.search(_PLAYER_WORDS, folded) is not None
+        # Takım ismi tek başına (ör. "How is Haramball doing?") filtre değildir; kadro sorusunda filtredir
+        if team is not None and not has_players:
+            team = None
+        if team is None and not positions and not free_agent and not thresholds:
+            return None
+        return {
+            "record_type": "player",
+            "team": FREE_AGENT if free_agent and team is None else team,
+            "positions": sorted(positions),
+            "free_agent": free_agent,
+            "thresholds": thresholds,
+        }
+
+    @staticmethod
+    def _thresholds(folded, total):
+        found = []
+        stat = rf"((?:\w+\s+){{0,2}}?(?:{_STAT_WORDS}))"
+        patterns = [
+            (rf"\b({_GT})\s+{_NUMBER}\s*{stat}", "$gte", 2, 3),
+            (rf"\b({_LT})\s+{_NUMBER}\s*{stat}", "$lte", 2, 3),
+            (rf"{_NUMBER}\s*plus\s*{stat}", "$gte", 1, 2),
+            (rf"{_NUMBER}\s*{stat}\s*{_GT_AFTER}\b", "$gte", 1, 2),
+            (rf"{_NUMBER}\s*{stat}\s*{_LT_AFTER}\b", "$lte", 1, 2),
+            (rf"{stat}\s+(?:of\s+)?({_GT})\s+{_NUMBER}", "$gte", 3, 1),
+            (rf"{stat}\s+(?:of\s+)?({_LT})\s+{_NUMBER}", "$lte", 3, 1),
+        ]
+        seen = set()
+        for pattern, op, number_group, stat_group in patterns:
+            for m in re.finditer(pattern, folded):
+                key = _stat_key(m.group(stat_group), total)
+                if key is None or key in seen:
+                    continue
+                value = _number(m.group(number_group))
+                if key in PCT_KEYS.values() and value > 1:
+                    value /= 100  # "FG% above 48" -> 0.48
+                if re.search(r"\b(more than|greater than|over|above)\b", m.group(0)) and op == "$gte":
+                    op = "$gt"
+                elif re.search(r"\b(less than|fewer than|under|below)\b", m.group(0)) and op == "$lte":
+                    op = "$lt"
+                seen.add(key)
+                found.append((key, op, value))
+        return found
+
+
+def to_where(parsed):
+    """parse() çıktısından Chroma where sözlüğü."""
+    clauses = [{"record_type": parsed["record_type"]}]
+    if parsed["team"] is not None:
+        clauses.append({"current_team": parsed["team"]})
+    if parsed["positions"]:
+        options = [{f"pos_{code}": True} for code in parsed["positions"]]
+        clauses.append(options[0] if len(options) == 1 else {"$or": options})
+    for key, op, value in parsed["thresholds"]:
+        clauses.append({key: {op: value}})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def describe(parsed):
+    """Kısa açıklama (izleme ve arayüz için): "team=Haramball, position=C, AVG_PTS>=20"."""
+    parts = []
+    if parsed["team"] is not None:
+        parts.append(f"team={parsed['team']}")
+    if parsed["positions"]:
+        parts.append("position=" + "/".join(parsed["positions"]))
+    symbols = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+    parts.extend(f"{key}{symbols[op]}{value:g}" for key, op, value in parsed["thresholds"])
+    return ", ".join(parts)
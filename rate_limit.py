@@ -0,0 +1,154 @@
+import asyncio
+import random
+import re
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket; 429 gelince hızı yarıya indirir, başarıda yavaşça geri artırır.
+
+    rate saniyedeki token sayısıdır. Bir API çağrısı varsayılan olarak 1 token harcar.
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None, max_rate=None,
+                 increase=None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.min_rate = float(min_rate if min_rate is not None else rate / 16)
+        self.max_rate = float(max_rate if max_rate is not None else rate)
+        # Her başarılı çağrıda eklenecek hız (additive increase)
+        self.increase = float(increase if increase is not None else self.max_rate / 20)
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled = 0
+        self.waited = 0.0
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1):
+        """Yeterli token birikene kadar bekler, beklenen süreyi döndürür."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._refill(now)
+                if now < self._blocked_until:
+                    delay = self._blocked_until - now
+                elif self._tokens >= tokens:
+                    self._tokens -= tokens
+                    self.waited += waited
+                    return waited
+                else:
+                    delay = (tokens - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def penalize(self, retry_after=None):
+        """429 sonrası: hızı yarıya indir, kovayı boşalt, varsa Retry-After kadar dur."""
+        with self._lock:
+            now = self._clock()
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._tokens = 0.0
+            self._updated = now
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
+            self.throttled += 1
+
+    def reward(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+
+RATE_LIMIT_STATUS = {429, 999}
+# Mesajda sadece durum ifadesi aranır; tek başına "429"/"999" (oyuncu ID'si, port, "999 ms") sayılmaz
+_RATE_LIMIT_TEXT = re.compile(r"\b(resource_exhausted|resource (has been )?exhausted|too many requests|"
+                              r"rate[ -]?limit(ed|s)?|request denied)\b", re.IGNORECASE)
+
+
+def _status_code(exc):
+    for holder in (exc, getattr(exc, "response", None)):
+        for attr in ("status_code", "status", "code"):
+            value = getattr(holder, attr, None)
+            value = value() if callable(value) else value
+            if isinstance(value, int):
+                return value
+    return None
+
+
+def is_rate_limit_error(exc):
+    """Gemini 429/ResourceExhausted, Yahoo ise kotada 999 "Request denied" döner.
+
+    Önce hata tipi ve durum kodu (status_code/status/code, response üzerindekiler dahil),
+    yoksa mesajdaki durum ifadesine bakılır.
+    """
+    if type(exc).__name__ in ("ResourceExhausted", "RateLimitError", "TooManyRequests"):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RATE_LIMIT_STATUS
+    return _RATE_LIMIT_TEXT.search(str(exc)) is not None
+
+
+def backoff_delay(attempt, base_delay=1.0, max_delay=60.0, rng=random):
+    """Full jitter ile üstel bekleme süresi."""
+    return rng.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def call_with_retry(fn, limiter=None, retries=5, base_delay=1.0, max_delay=60.0,
+                    is_retryable=is_rate_limit_error, sleep=time.sleep, rng=random, on_retry=None):
+    """fn'i limiter arkasından çağırır; tekrar denenebilir hatalarda üstel bekleme yapar.
+
+    on_retry(hata, deneme) her tekrar denemeden önce çağrılır (sayaçlar için).
+    """
+    attempt = 0
+    while True:
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            result = fn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            if limiter is not None and is_rate_limit_error(e):
+                limiter.penalize()
+            if on_retry is not None:
+                on_retry(e, attempt)
+            sleep(backoff_delay(attempt, base_delay, max_delay, rng))
+            attempt += 1
+            continue
+        if limiter is not None:
+            limiter.reward()
+        return result
+
+
+async def acall_with_retry(afn, limiter=None, retries=5, base_delay=1.0, max_delay=60.0,
+                           is_retryable=is_rate_limit_error, rng=random, on_retry=None):
+    """call_with_retry'ın async hali; afn() bir coroutine döndürür. Limiter beklemesi
+    event loop'u bloklamasın diye thread'de yapılır."""
+    attempt = 0
+    while True:
+        if limiter is not None:
+            await asyncio.to_thread(limiter.acquire)
+        try:
+            result = await afn()
+        except Exception as e:
+            if attempt >= retries or not is_retryable(e):
+                raise
+            if limiter is not None and is_rate_limit_error(e):
+                limiter.penalize()
+            if on_retry is not None:
+                on_retry(e, attempt)
+            await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay, rng))
+            attempt += 1
+            continue
+        if limiter is not None:
+            limiter.reward()
+        return result
@@ -0,0 +1,42 @@
+"""FakeLeague üzerinde oyuncu çekme akışını seri (1 worker) ve paralel çalıştırıp karşılaştırır.
+
+    python bench_fetch.py --latency 0.05 --workers 8 --rate 20 --fail-rate 0.02
+"""
+import argparse
+import json
+import time
+
+from fake_league import FakeLeague
+from fetch_engine import FetchEngine
+from recieve_players_data import collect_players
+
+
+def run(workers, args):
+    lg = FakeLeague(n_teams=args.teams, latency=args.latency, fail_rate=args.fail_rate, seed=args.seed)
+    engine = FetchEngine(lg, max_workers=workers, rate=args.rate, burst=max(1, workers),
+                         base_delay=0.05, max_delay=1.0)
+    started = time.perf_counter()
+    players = collect_players(engine)
+    elapsed = time.perf_counter() - started
+    return {"workers": workers, "players": len(players), "seconds": round(elapsed, 3),
+            "api_calls": sum(lg.calls.values()), "report": engine.report()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=12)
+    parser.add_argument("--latency", type=float, default=0.05, help="Çağrı başına sahte gecikme (sn)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="999 hatası fırlatma oranı")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=20.0, help="Saniyedeki çağrı sınırı")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    serial = run(1, args)
+    parallel = run(args.workers, args)
+    parallel["speedup"] = round(serial["seconds"] / parallel["seconds"], 2) if parallel["seconds"] else None
+    print(json.dumps({"serial": serial, "parallel": parallel}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
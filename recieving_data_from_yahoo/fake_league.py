@@ -0,0 +1,149 @@
+"""yahoo_fantasy_api.League'in ağa çıkmayan taklidi (çekme motorunu denemek ve ölçmek için).
+
+Her çağrı `latency` saniye bekler; `fail_rate` oranında Yahoo'nun kota cevabına
+benzeyen bir hata fırlatır. Çağrı sayıları `calls` içinde tutulur.
+"""
+import random
+import threading
+import time
+from collections import Counter
+
+POSITIONS = ["PG", "SG", "SF", "PF", "C"]
+
+
+class FakeTeam:
+    def __init__(self, league, key):
+        self.league = league
+        self.key = key
+
+    def roster(self):
+        self.league._call("roster")
+        return [
+            {"player_id": pid, "name": {"full": p["name"]},
+             "eligible_positions": [{"position": pos} for pos in p["positions"]] + [{"position": "UTIL"}]}
+            for pid, p in self.league.players.items() if p["team_key"] == self.key
+        ]
+
+
+class FakeLeague:
+    def __init__(self, n_teams=12, roster_size=13, n_free_agents=250, weeks=20,
+                 latency=0.05, fail_rate=0.0, seed=0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.weeks = weeks
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+        self._teams = {f"nba.l.1.t.{i + 1}": {"team_key": f"nba.l.1.t.{i + 1}", "name": f"Team {i + 1}"}
+                       for i in range(n_teams)}
+        self.players = {}
+        pid = 1000
+        for t_key in self._teams:
+            for _ in range(roster_size):
+                self.players[pid] = self._make_player(pid, t_key)
+                pid += 1
+        for _ in range(n_free_agents):
+            self.players[pid] = self._make_player(pid, None)
+            pid += 1
+
+    def _make_player(self, pid, team_key):
+        rng = self._rng
+        return {
+            "name": f"Player {pid}",
+            "team_key": team_key,
+            "positions": sorted(rng.sample(POSITIONS, rng.randint(1, 2))),
+            "gp": rng.randint(20, 60),
+            "avg": {"PTS": rng.uniform(3, 32), "REB": rng.uniform(1, 13), "AST": rng.uniform(0.5, 10),
+                    "ST": rng.uniform(0.2, 2), "BLK": rng.uniform(0, 3), "3PTM": rng.uniform(0, 4),
+                    "TO": rng.uniform(0.5, 4), "FGA": rng.uniform(3, 22), "FTA": rng.uniform(0, 9)},
+            "fg_pct": rng.uniform(0.38, 0.62),
+            "ft_pct": rng.uniform(0.55, 0.92),
+        }
+
+    def _call(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+            fail = self._rng.random() < self.fail_rate
+        time.sleep(self.latency)
+        if fail:
+            raise RuntimeError("999 Request denied")
+
+    def teams(self):
+        self._call("teams")
+        return dict(self._teams)
+
+    def to_team(self, key):
+        return FakeTeam(self, key)
+
+    def free_agents(self, position):
+        self._call("free_agents")
+        return [
+            {"player_id": pid, "name": {"full": p["name"]},
+             "eligible_positions": [{"position": pos} for pos in p["positions"]]}
+            for pid, p in self.players.items() if p["team_key"] is None
+        ]
+
+    def player_stats(self, player_ids, req_type):
+        self._call(f"player_stats:{req_type}")
+        out = []
+        for pid in player_ids:
+            p = self.players[int(pid)]
+            scale = 1 if req_type == "average_season" else p["gp"]
+            row = {"player_id": int(pid), "name": p["name"]}
+            row.update({k: round(v * scale, 1) for k, v in p["avg"].items() if k not in ("FGA", "FTA")})
+            if req_type == "average_season":
+                row["FG%"] = round(p["fg_pct"], 3)
+                row["FT%"] = round(p["ft_pct"], 3)
+            else:
+                fga, fta = round(p["avg"]["FGA"] * scale), round(p["avg"]["FTA"] * scale)
+                row["FGM/A"] = f"{round(fga * p['fg_pct'])}/{fga}"
+                row["FTM/A"] = f"{round(fta * p['ft_pct'])}/{fta}"
+            out.append(row)
+        return out
+
+    def current_week(self):
+        self._call("current_week")
+        return self.weeks + 1
+
+    def _team_week_stats(self, t_key, week):
+        rng = random.Random(f"{t_key}:{week}")
+        totals = {"FGM": 0, "FGA": 0, "FTM": 0, "FTA": 0, "3PTM": 0, "PTS": 0, "REB": 0,
+                  "AST": 0, "ST": 0, "BLK": 0, "TO": 0}
+        for p in self.players.values():
+            if p["team_key"] != t_key:
+                continue
+            games = rng.randint(2, 4)
+            fga = round(p["avg"]["FGA"] * games)
+            fta = round(p["avg"]["FTA"] * games)
+            totals["FGA"] += fga
+            totals["FTA"] += fta
+            totals["FGM"] += round(fga * p["fg_pct"])
+            totals["FTM"] += round(fta * p["ft_pct"])
+            for k in ("3PTM", "PTS", "REB", "AST", "ST", "BLK", "TO"):
+                totals[k] += round(p["avg"][k] * games * rng.uniform(0.7, 1.3))
+        values = {
+            "9004003": f"{totals['FGM']}/{totals['FGA']}",
+            "5": f"{totals['FGM'] / totals['FGA']:.3f}".lstrip("0") if totals["FGA"] else "-",
+            "9007006": f"{totals['FTM']}/{totals['FTA']}",
+            "8": f"{totals['FTM'] / totals['FTA']:.3f}".lstrip("0") if totals["FTA"] else "-",
+            "10": str(totals["3PTM"]), "12": str(totals["PTS"]), "15": str(totals["REB"]),
+            "16": str(totals["AST"]), "17": str(totals["ST"]), "18": str(totals["BLK"]), "19": str(totals["TO"]),
+        }
+        return {"stats": [{"stat": {"stat_id": k, "value": v}} for k, v in values.items()]}
+
+    def matchups(self, week):
+        """Yahoo'nun iç içe scoreboard cevabının sadeleştirilmiş hali."""
+        self._call("matchups")
+        keys = list(self._teams)
+        matchups = {}
+        for i in range(0, len(keys) - 1, 2):
+            pair = {}
+            for j, t_key in enumerate(keys[i:i + 2]):
+                pair[str(j)] = {"team": [
+                    [{"team_key": t_key}, {"name": self._teams[t_key]["name"]}],
+                    {"team_stats": self._team_week_stats(t_key, week)},
+                ]}
+            matchups[str(i // 2)] = {"matchup": {"0": {"teams": pair}}}
+        return {"fantasy_content": {"league": [{"league_key": "nba.l.1"},
+                                               {"scoreboard": {"week": week, "0": {"matchups": matchups}}}]}}
@@ -0,0 +1,156 @@
+"""Yahoo Fantasy API çağrılarını sınırlı bir thread havuzunda, ortak bir token bucket
+arkasından paralel çalıştıran çekme motoru.
+
+Her çağrı tipi (roster, free_agents, player_stats:average_season ...) için çağrı,
+hata, tekrar deneme ve süre sayaçları tutulur. League nesnesi yerine
+fake_league.FakeLeague verilerek ağa çıkmadan test/benchmark yapılabilir.
+"""
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rate_limit import TokenBucket, call_with_retry  # noqa: E402
+
+
+def chunk(lst, size=25):
+    for i in range(0, len(lst), size):
+        yield lst[i:i + size]
+
+
+def is_retryable(exc):
+    # Kod hataları tekrar denenmez, ağ/kota hataları denenir
+    return not isinstance(exc, (TypeError, KeyError, AttributeError, ValueError))
+
+
+class FetchEngine:
+    def __init__(self, lg, max_workers=8, rate=4.0, burst=4, retries=5, base_delay=1.0, max_delay=30.0):
+        self.lg = lg
+        self.max_workers = max_workers
+        self.limiter = TokenBucket(rate, capacity=burst)
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._stats = defaultdict(lambda: {"calls": 0, "errors": 0, "retries": 0, "seconds": 0.0})
+        self.failed = []  # (çağrı tipi, argümanlar, hata)
+        self.started = time.perf_counter()
+
+    def call(self, kind, fn, *args):
+        """fn(*args)'ı limiter + üstel bekleme (jitter'lı) ile çağırır ve sayaçları günceller."""
+        def on_retry(exc, attempt):
+            with self._lock:
+                self._stats[kind]["retries"] += 1
+
+        started = time.perf_counter()
+        try:
+            return call_with_retry(lambda: fn(*args), limiter=self.limiter, retries=self.retries,
+                                   base_delay=self.base_delay, max_delay=self.max_delay,
+                                   is_retryable=is_retryable, on_retry=on_retry)
+        except Exception:
+            with self._lock:
+                self._stats[kind]["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._stats[kind]["calls"] += 1
+                self._stats[kind]["seconds"] += time.perf_counter() - started
+
+    def run_all(self, jobs, on_result=None, on_error=None):
+        """jobs: {anahtar: (çağrı tipi, fn, args)} -> {anahtar: sonuç}. Başarısız işler self.failed'a yazılır.
+
+        on_result(anahtar, sonuç) verilirse her sonuç bittiği anda ona verilir ve biriktirilmez
+        (dönen sözlük boş kalır); on_error(anahtar, hata) başarısız işler için çağrılır. İkisi de
+        çağıran thread'de çalışır.
+        """
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.call, kind, fn, *args): (key, kind, args)
+                       for key, (kind, fn, args) in jobs.items()}
+            for future in as_completed(futures):
+                key, kind, args = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"{kind} hatası ({key}): {e}")
+                    self.failed.append((kind, args, str(e)))
+                    if on_error is not None:
+                        on_error(key, e)
+                    continue
+                if on_result is not None:
+                    on_result(key, result)
+                else:
+                    results[key] = result
+        return results
+
+    def fetch_rosters(self, teams):
+        """teams: lg.teams() çıktısı -> {takım adı: roster listesi}"""
+        jobs = {
+            t_val['name']: ("roster", lambda key: self.lg.to_team(key).roster(), (t_key,))
+            for t_key, t_val in teams.items()
+        }
+        return self.run_all(jobs)
+
+    def fetch_player_stats(self, player_ids, batch_size=25, req_types=("average_season", "season"),
+                           on_batch=None, on_error=None, skip=()):
+        """{istek tipi: {player_id: stat dict}} döndürür; her batch ve istek tipi ayrı bir iş.
+
+        on_batch(i, {istek tipi: {player_id: stat dict}}) verilirse i. batch'in tüm istek tipleri
+        gelince o batch ona verilir ve birleştirilmez; on_error(i, hata) başarısız batch'ler için
+        çağrılır. skip'teki batch numaraları hiç çekilmez.
+        """
+        jobs = {}
+        for i, batch in enumerate(chunk(player_ids, batch_size)):
+            if i in skip:
+                continue
+            for req_type in req_types:
+                jobs[(req_type, i)] = (f"player_stats:{req_type}", self.lg.player_stats, (batch, req_type))
+
+        merged = {req_type: {} for req_type in req_types}
+        partial, broken = {}, set()
+
+        def by_player(stats):
+            return {str(s.get("player_id")): s for s in stats}
+
+        def on_result(key, stats):
+            req_type, i = key
+            if on_batch is None:
+                merged[req_type].update(by_player(stats))
+                return
+            if i in broken:
+                return
+            parts = partial.setdefault(i, {})
+            parts[req_type] = by_player(stats)
+            if len(parts) == len(req_types):
+                on_batch(i, partial.pop(i))
+
+        def on_job_error(key, exc):
+            _, i = key
+            partial.pop(i, None)
+            if on_error is not None and i not in broken:
+                on_error(i, exc)
+            broken.add(i)
+
+        self.run_all(jobs, on_result=on_result, on_error=on_job_error)
+        return merged
+
+    def report(self):
+        """Çağrı tipi başına çağrı/hata/tekrar sayıları ve saniyedeki çağrı."""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            report = {
+                kind: {
+                    **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in s.items()},
+                    "calls_per_sec": round(s["calls"] / elapsed, 2) if elapsed > 0 else 0.0,
+                }
+                for kind, s in self._stats.items()
+            }
+        report["_total"] = {
+            "elapsed_sec": round(elapsed, 3),
+            "throttled": self.limiter.throttled,
+            "failed": len(self.failed),
+        }
+        return report
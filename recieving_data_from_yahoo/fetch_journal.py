@@ -0,0 +1,146 @@
+"""Çekme birimlerinin (oyuncu batch'i, hafta) NDJSON günlüğü ve kaldığı yerden devam.
+
+Her birim bittiği anda günlüğe tek satır ({"unit", "data"}) olarak eklenir ve
+diske yazılır; bellekte sadece birimlerin dosyadaki konumu tutulur. Yanında
+duran checkpoint dosyası (atomik yazılır) çalıştırmanın anahtarını ve başarısız
+birimleri hatalarıyla saklar. Yarıda kalan bir çalıştırma tekrar başlatılınca
+günlükteki birimler atlanır, sadece eksik ve başarısız olanlar çekilir. Son JSON
+dosyaları günlükten üretilir; her şey bitince günlük ve checkpoint silinir.
+
+    journal = FetchJournal("data/nba_fantasy_players.json", run_key="...")
+    for unit in journal.pending(units):
+        ...
+        journal.write(unit, data)      # ya da journal.fail(unit, hata)
+    for unit, data in journal.records(units):
+        ...
+    journal.finish()
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from league_store import atomic_write_json  # noqa: E402
+
+
+class FetchJournal:
+    def __init__(self, output_path, run_key=None, restart=False, max_age=None, clock=time.time):
+        base = os.path.splitext(output_path)[0]
+        self.path = f"{base}.journal.ndjson"
+        self.checkpoint_path = f"{base}.checkpoint.json"
+        self.run_key = run_key
+        self._clock = clock
+        self._offsets = {}  # birim -> günlükteki satırın bayt konumu
+        self.failed = {}  # birim -> son hata
+        self.resumed = 0
+
+        checkpoint = self._read_checkpoint()
+        stale = (checkpoint is None or checkpoint.get("run_key") != run_key
+                 or max_age is not None and self._clock() - checkpoint.get("started_at", 0) > max_age)
+        if restart or stale:
+            # Farklı ya da çok eski bir çalıştırmanın (veya checkpoint'i olmayan) günlüğü kullanılmaz
+            self._reset()
+        else:
+            self.started_at = checkpoint.get("started_at", self._clock())
+            self.failed = dict(checkpoint.get("failed", {}))
+            self._scan()
+            self.resumed = len(self._offsets)
+        self._file = open(self.path, "ab")
+
+    def _read_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.started_at = self._clock()
+        self.failed = {}
+        self._save_checkpoint()
+
+    def _scan(self):
+        """Günlükteki birimlerin konumlarını toplar; yarım kalmış son satır kesilir."""
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    unit = json.loads(line)["unit"]
+                except (ValueError, KeyError):
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                self._offsets[unit] = good
+                good += len(line)
+        if good != os.path.getsize(self.path):
+            with open(self.path, "r+b") as f:
+                f.truncate(good)
+
+    def _save_checkpoint(self):
+        atomic_write_json(self.checkpoint_path, {
+            "run_key": self.run_key,
+            "started_at": self.started_at,
+            "updated_at": self._clock(),
+            "done": len(self._offsets),
+            "failed": self.failed,
+        })
+
+    # --- Yazma ---
+    def write(self, unit, data):
+        line = json.dumps({"unit": unit, "data": data}, ensure_ascii=False, separators=(",", ":")) + "\n"
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        self._file.write(line.encode("utf-8"))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._offsets[unit] = offset
+        if self.failed.pop(unit, None) is not None:
+            self._save_checkpoint()
+
+    def fail(self, unit, error):
+        self.failed[unit] = str(error)
+        self._save_checkpoint()
+
+    # --- Okuma ---
+    def done(self, unit):
+        return unit in self._offsets
+
+    def pending(self, units):
+        """Günlükte olmayan birimler (önceki çalıştırmada başarısız olanlar dahil), verilen sırayla."""
+        return [unit for unit in units if unit not in self._offsets]
+
+    def get(self, unit, default=None):
+        if unit not in self._offsets:
+            return default
+        with open(self.path, "rb") as f:
+            f.seek(self._offsets[unit])
+            return json.loads(f.readline())["data"]
+
+    def records(self, units):
+        """(birim, veri) çiftleri verilen sırayla; günlükte olmayanlar atlanır. Tek seferde bir satır okunur."""
+        with open(self.path, "rb") as f:
+            for unit in units:
+                if unit in self._offsets:
+                    f.seek(self._offsets[unit])
+                    yield unit, json.loads(f.readline())["data"]
+
+    # --- Bitirme ---
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+            self._save_checkpoint()
+
+    def finish(self):
+        """Çıktılar günlükten üretildikten sonra çağrılır: günlük ve checkpoint silinir."""
+        self._file.close()
+        for path in (self.path, self.checkpoint_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def stats(self):
+        return {"done": len(self._offsets), "resumed": self.resumed, "failed": dict(self.failed)}
@@ -1,9 +1,11 @@
+import argparse
 import os
-import json
-import time
 from dotenv import load_dotenv
-import yahoo_fantasy_api as yfa
-from yahoo_oauth import OAuth2
+
+from fetch_engine import FetchEngine, chunk
+from fetch_journal import FetchJournal
+from league_store import LeagueStore
+from leagues import DEFAULT_LEAGUE, league_paths
 
 def safe_float(val):
     try:
@@ -11,39 +13,38 @@ def safe_float(val):
         return float(val)
     except: return 0.0
 
-def chunk(lst, size=25):
-    for i in range(0, len(lst), size):
-        yield lst[i:i + size]
 # .env dosyasını yükle
 load_dotenv()
 
-data_folder = "data"
-if not os.path.exists(data_folder):
-    os.makedirs(data_folder)
-
-sc = OAuth2(
-    os.getenv("YAHOO_CLIENT_ID"),
-    os.getenv("YAHOO_CLIENT_SECRET")
-)
-
-gm = yfa.Game(sc, "nba")
-league_id = os.getenv("YAHOO_LEAGUE_ID")
-if league_id:
-    # .env dosyanızdaki YAHOO_LEAGUE_ID'nizde bir sıkıntı yoksa o ligin ID'sine göre yükleme yapar
-    lg = gm.to_league(league_id)
-    print(f"Sabit Lig yüklendi: {league_id}")
-else:
-    # Eğer .env'deki YAHOO_LEAGUE_ID boşsa otomatik olarak ilk lig ID'sini alır
-    # Eğer 2025 yılına ait aktif bir liginiz yoksa hata verir.
-    league_id = gm.league_ids(year=2025)[0]
-    lg = gm.to_league(league_id)
-    print(f"Lig otomatik olarak bulundu: {league_id}")
+def connect(league_id=None):
+    # Yahoo kütüphaneleri sadece gerçek bağlantıda gerekir; FakeLeague ile çalışırken yüklenmez
+    import yahoo_fantasy_api as yfa
+    from yahoo_oauth import OAuth2
+
+    sc = OAuth2(
+        os.getenv("YAHOO_CLIENT_ID"),
+        os.getenv("YAHOO_CLIENT_SECRET")
+    )
+
+    gm = yfa.Game(sc, "nba")
+    league_id = league_id or os.getenv("YAHOO_LEAGUE_ID")
+    if league_id:
+        # .env dosyanızdaki YAHOO_LEAGUE_ID'nizde bir sıkıntı yoksa o ligin ID'sine göre yükleme yapar
+        lg = gm.to_league(league_id)
+        print(f"Sabit Lig yüklendi: {league_id}")
+    else:
+        # Eğer .env'deki YAHOO_LEAGUE_ID boşsa otomatik olarak ilk lig ID'sini alır
+        # Eğer 2025 yılına ait aktif bir liginiz yoksa hata verir.
+        league_id = gm.league_ids(year=2025)[0]
+        lg = gm.to_league(league_id)
+        print(f"Lig otomatik olarak bulundu: {league_id}")
+    return lg
 
 # Kadro ve pozisyon bilgileri toplama
 def clean_player_base_info(p, team_name):
     p_name = p.get('name')
     if isinstance(p_name, dict): p_name = p_name.get('full', 'Unknown')
-    
+
     # Burada çıkardığımız pozisyonlar her oyuncuda olanlar onun için bir anlam taşımıyorlar.
     exclude_list = ['P', 'UTIL', 'IL', 'IL+', 'BN']
     all_pos = []
@@ -53,7 +54,7 @@ def clean_player_base_info(p, team_name):
             val = item.get('position') if isinstance(item, dict) else item
             if val and val.upper() not in exclude_list:
                 all_pos.append(val.upper())
-    
+
     unique_pos = sorted(list(set(all_pos)))
     return {
         "player_id": str(p['player_id']),
@@ -62,79 +63,153 @@ def clean_player_base_info(p, team_name):
         "position": "/".join(unique_pos) if unique_pos else "N/A"
     }
 
-player_base_map = {}
-teams = lg.teams()
-for t_key, t_val in teams.items():
-    t_name = t_val['name']
-    team_obj = lg.to_team(t_key)
-    for p in team_obj.roster():
-        info = clean_player_base_info(p, t_name)
-        player_base_map[info["player_id"]] = info
-
-try:
-    fas = lg.free_agents('ALL')
-    for p in fas[:200]:
-        info = clean_player_base_info(p, "Free Agent")
-        player_base_map[info["player_id"]] = info
-except: pass
-
-player_ids = list(player_base_map.keys())
-
-# Average ve Total istatistikleri çekme ve birleştirme
-final_data = []
-print(f"{len(player_ids)} oyuncu için Total ve Average veriler birleştiriliyor")
-
-for batch_ids in chunk(player_ids, 25):
+def build_player_base_map(engine, free_agent_limit=200):
+    """Tüm takım kadroları paralel çekilir; ardından ilk free_agent_limit serbest oyuncu eklenir."""
+    lg = engine.lg
+    player_base_map = {}
+    teams = engine.call("teams", lg.teams)
+    for t_name, roster in engine.fetch_rosters(teams).items():
+        for p in roster:
+            info = clean_player_base_info(p, t_name)
+            player_base_map[info["player_id"]] = info
+
     try:
-        # 1. Ortalamaları Çek
-        avg_stats = lg.player_stats(batch_ids, "average_season")
-        # 2. Toplamları Çek
-        total_stats = lg.player_stats(batch_ids, "season")
-        
-        total_map = {str(ts['player_id']): ts for ts in total_stats}
-
-        for s in avg_stats:
-            pid = str(s.get("player_id"))
-            base = player_base_map.get(pid)
-            ts = total_map.get(pid, {})
-            
-            if not base: continue
-
-            combined_record = {
-                "player_id": pid,
-                "name": base.get("name"),
-                "current_team": base.get("current_team"),
-                "position": base.get("position"),
-                # Ortalamalar (Per Game)
-                "AVG_PTS": safe_float(s.get("PTS")),
-                "AVG_REB": safe_float(s.get("REB")),
-                "AVG_AST": safe_float(s.get("AST")),
-                "AVG_ST": safe_float(s.get("ST", s.get("STL", 0))),
-                "AVG_BLK": safe_float(s.get("BLK")),
-                "AVG_3PTM": safe_float(s.get("3PTM", s.get("10", 0))),
-                "AVG_TO": safe_float(s.get("TO")),
-                "FG%": safe_float(s.get("FG%")),
-                "FT%": safe_float(s.get("FT%")),
-                # Toplamlar (Season Totals)
-                "TOTAL_PTS": safe_float(ts.get("PTS")),
-                "TOTAL_REB": safe_float(ts.get("REB")),
-                "TOTAL_AST": safe_float(ts.get("AST")),
-                "TOTAL_ST": safe_float(ts.get("ST", ts.get("STL", 0))),
-                "TOTAL_BLK": safe_float(ts.get("BLK")),
-                "TOTAL_3PTM": safe_float(ts.get("3PTM", ts.get("10", 0))),
-                "TOTAL_TO": safe_float(ts.get("TO")),
-                "FGM/A": ts.get("FGM/A", "0/0"),
-                "FTM/A": ts.get("FTM/A", "0/0")
-            }
-            final_data.append(combined_record)
-            
-        print(f"İlerleme: {len(final_data)} / {len(player_ids)}")
-        time.sleep(1) 
+        fas = engine.call("free_agents", lg.free_agents, 'ALL')
+        for p in fas[:free_agent_limit]:
+            info = clean_player_base_info(p, "Free Agent")
+            player_base_map[info["player_id"]] = info
     except Exception as e:
-        print(f"Batch hatası: {e}")
+        print(f"Free agent hatası: {e}")
+    return player_base_map
+
+def combine_record(base, s, ts):
+    return {
+        "player_id": base.get("player_id"),
+        "name": base.get("name"),
+        "current_team": base.get("current_team"),
+        "position": base.get("position"),
+        # Ortalamalar (Per Game)
+        "AVG_PTS": safe_float(s.get("PTS")),
+        "AVG_REB": safe_float(s.get("REB")),
+        "AVG_AST": safe_float(s.get("AST")),
+        "AVG_ST": safe_float(s.get("ST", s.get("STL", 0))),
+        "AVG_BLK": safe_float(s.get("BLK")),
+        "AVG_3PTM": safe_float(s.get("3PTM", s.get("10", 0))),
+        "AVG_TO": safe_float(s.get("TO")),
+        "FG%": safe_float(s.get("FG%")),
+        "FT%": safe_float(s.get("FT%")),
+        # Toplamlar (Season Totals)
+        "TOTAL_PTS": safe_float(ts.get("PTS")),
+        "TOTAL_REB": safe_float(ts.get("REB")),
+        "TOTAL_AST": safe_float(ts.get("AST")),
+        "TOTAL_ST": safe_float(ts.get("ST", ts.get("STL", 0))),
+        "TOTAL_BLK": safe_float(ts.get("BLK")),
+        "TOTAL_3PTM": safe_float(ts.get("3PTM", ts.get("10", 0))),
+        "TOTAL_TO": safe_float(ts.get("TO")),
+        "FGM/A": ts.get("FGM/A", "0/0"),
+        "FTM/A": ts.get("FTM/A", "0/0")
+    }
+
+def collect_players(engine, batch_size=25):
+    player_base_map = build_player_base_map(engine)
+    player_ids = list(player_base_map.keys())
+
+    # Average ve Total istatistikleri çekme ve birleştirme
+    print(f"{len(player_ids)} oyuncu için Total ve Average veriler birleştiriliyor")
+    stats = engine.fetch_player_stats(player_ids, batch_size=batch_size)
+    avg_map, total_map = stats["average_season"], stats["season"]
+
+    final_data = []
+    for pid in player_ids:
+        # Ortalaması gelmeyen (başarısız batch) oyuncular eskisi gibi atlanır
+        if pid not in avg_map:
+            continue
+        final_data.append(combine_record(player_base_map[pid], avg_map[pid], total_map.get(pid, {})))
+    return final_data
+
+def journal_players(engine, journal, batch_size=25):
+    """collect_players'ın günlüklü hali: kadro haritası ve her batch bittiği anda günlüğe yazılır.
+
+    Günlükte olan birimler tekrar çekilmez. Batch birimlerinin listesini döndürür.
+    """
+    player_base_map = journal.get("base")
+    if player_base_map is None:
+        player_base_map = build_player_base_map(engine)
+        journal.write("base", player_base_map)
+    batches = list(chunk(list(player_base_map.keys()), batch_size))
+    units = [f"batch:{i}" for i in range(len(batches))]
+    skip = {i for i, unit in enumerate(units) if journal.done(unit)}
+    if skip:
+        print(f"Günlükten devam: {len(skip)}/{len(units)} batch zaten çekilmiş")
+
+    def on_batch(i, stats):
+        avg_map, total_map = stats["average_season"], stats["season"]
+        # Ortalaması gelmeyen oyuncular eskisi gibi atlanır
+        journal.write(units[i], [combine_record(player_base_map[pid], avg_map[pid], total_map.get(pid, {}))
+                                 for pid in batches[i] if pid in avg_map])
+
+    print(f"{len(player_base_map)} oyuncu için Total ve Average veriler birleştiriliyor")
+    engine.fetch_player_stats(list(player_base_map.keys()), batch_size=batch_size, on_batch=on_batch,
+                              on_error=lambda i, e: journal.fail(units[i], e), skip=skip)
+    return units
+
+def main(lg=None, max_workers=8, rate=4.0, league=None, batch_size=25, restart=False, allow_partial=False):
+    # --league verildiyse o Yahoo ligi çekilir ve leagues/<lig>/ altına yazılır
+    paths = league_paths(league)
+    os.makedirs(paths["data_dir"], exist_ok=True)
+    if lg is None:
+        lg = connect(None if paths["league"] == DEFAULT_LEAGUE else paths["league"])
+
+    # Her batch bittiği anda günlüğe yazılır; yarıda kalan çalıştırma (bir gün içinde) kaldığı yerden devam eder
+    output_path = paths["players_path"]
+    journal = FetchJournal(output_path, run_key=f"players:batch={batch_size}", restart=restart,
+                           max_age=24 * 3600)
+    engine = FetchEngine(lg, max_workers=max_workers, rate=rate)
+    try:
+        units = journal_players(engine, journal, batch_size=batch_size)
+    except BaseException:
+        journal.close()
+        raise
+    failed = journal.pending(units)
+
+    for kind, s in engine.report().items():
+        print(f"  {kind}: {s}")
+    if failed and not allow_partial:
+        journal.close()
+        print(f"{len(failed)} batch başarısız oldu; tekrar çalıştırınca sadece bunlar çekilir "
+              f"(eksik haliyle yazmak için --allow-partial): {journal.failed}")
+        return {"written": 0, "failed": failed, "journal": journal.stats()}
+
+    # SQLite deposuna günlükten batch sırasıyla akıtılır (sadece değişen oyuncular yazılır),
+    # JSON uyumluluk için depodan atomik olarak üretilir. Eksik çekimde listede olmayanlar silinmez.
+    written = 0
+
+    def records():
+        nonlocal written
+        for _, batch in journal.records(units):
+            written += len(batch)
+            yield from batch
+
+    store = LeagueStore(paths["store_path"])
+    changes = store.upsert_players(records(), source="yahoo", full=not failed)
+    if changes["snapshot"] is not None or not store.json_in_sync(output_path):
+        store.export_json(players_path=output_path, teams_path=None, weeks_path=None)
+    store.close()
+    print(f"\nBAŞARILI: {written} oyuncu kaydedildi. Değişiklikler: {changes}")
+
+    if failed:
+        journal.close()
+        print(f"{len(failed)} batch eksik yazıldı, tekrar çalıştırınca sadece bunlar çekilir.")
+    else:
+        journal.finish()
+    return {"written": written, "failed": failed, "changes": changes}
 
-# Json dosyasına kaydetme işemi
-output_path = os.path.join(data_folder, "nba_fantasy_players.json")
-with open(output_path, "w", encoding="utf-8") as f:
-    json.dump(final_data, f, ensure_ascii=False, indent=4)
-print(f"\nBAŞARILI: {len(final_data)} oyuncu kaydedildi.")
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Oyuncu kadrolarını ve istatistiklerini çeker.")
+    parser.add_argument("--league", default=None, help="Yahoo lig anahtarı (örn. 466.l.12345); varsayılan .env'deki lig")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--restart", action="store_true", help="yarım kalan çalıştırmanın günlüğünü yok say")
+    parser.add_argument("--allow-partial", action="store_true",
+                        help="başarısız batch'ler varken de çekilenleri yaz")
+    args = parser.parse_args()
+    main(max_workers=args.workers, league=args.league, restart=args.restart, allow_partial=args.allow_partial)
@@ -1,17 +1,141 @@
 import os
 import json
+import argparse
 from dotenv import load_dotenv
-from yahoo_oauth import OAuth2
-import yahoo_fantasy_api as yfa
+
+from fetch_engine import FetchEngine
+from fetch_journal import FetchJournal
+from week_store import WeekStore, week_key
+from league_store import LeagueStore
+from leagues import DEFAULT_LEAGUE, league_paths
 
 # .env dosyasını yükle
 load_dotenv()
 
-def get_league_stats():
+# İSİMLENDİRME MAPPINGI YAHOO STATS ID'LERİ İÇİN
+custom_mapping = {
+    "9004003": "FGM/A",
+    "5": "FG%",
+    "9007006": "FTM/A",
+    "8": "FT%",
+    "10": "3PTM",
+    "12": "PTS",
+    "15": "REB",
+    "16": "AST",
+    "17": "ST",
+    "18": "BLK",
+    "19": "TO"
+}
+
+# takımları bulma fonksiyonu
+def find_teams(obj):
+    if isinstance(obj, dict):
+        if 'team' in obj: yield obj['team']
+        for v in obj.values(): yield from find_teams(v)
+    elif isinstance(obj, list):
+        for item in obj: yield from find_teams(item)
+
+def parse_week(m_raw):
+    """lg.matchups(week) cevabını [{"team_name", "stats"}] listesine çevirir."""
+    week_data = []
+    for team_content in find_teams(m_raw):
+        team_name = "Unknown"
+        stats_dict = {}
+
+        for part in team_content:
+            # Takım İsmi Bulma
+            if isinstance(part, list):
+                for sub in part:
+                    if isinstance(sub, dict) and 'name' in sub:
+                        team_name = sub['name']
+
+            # İstatistik Bulma ve İsimlendirme
+            if isinstance(part, dict) and 'team_stats' in part:
+                for s in part['team_stats']['stats']:
+                    s_id = str(s['stat']['stat_id'])
+                    stat_label = custom_mapping.get(s_id, s_id)
+                    s_val = s['stat']['value']
+                    stats_dict[stat_label] = s_val
+
+        if team_name != "Unknown":
+            week_data.append({"team_name": team_name, "stats": stats_dict})
+
+    # Takımları tekilleştir
+    seen_teams = set()
+    unique_week_data = []
+    for d in week_data:
+        if d['team_name'] not in seen_teams:
+            unique_week_data.append(d)
+            seen_teams.add(d['team_name'])
+    return unique_week_data
+
+def sync_weeks(lg, store, refetch=(), max_workers=4, rate=4.0, league_store=None, restart=False):
+    """Sadece eksik (ya da refetch ile istenen) tamamlanmış haftaları paralel çeker ve depoya yazar.
+
+    Her hafta bittiği anda günlüğe (fetch_journal.FetchJournal) yazılır; yarıda kalan bir
+    çalıştırma günlükteki haftaları tekrar çekmez, önceki çalıştırmada başarısız olan haftalar
+    yeniden denenir. league_store (LeagueStore) verilirse çekilen haftalar SQLite deposuna da yazılır.
+    """
+    engine = FetchEngine(lg, max_workers=max_workers, rate=rate)
+    current_week = engine.call("current_week", lg.current_week)
+    journal = FetchJournal(store.path, run_key="weeks", restart=restart, max_age=24 * 3600)
+    retry = [int(unit.split(":")[1]) for unit in journal.failed]
+
+    # range(1, current_week) -> 1. haftadan başlar, şu anki haftadan BİR ÖNCEKİ haftayı alır.
+    # Şu anki haftayı almamamızın sebebi hafta tamamlanmamış olabilir.
+    weeks = store.missing_weeks(current_week, set(refetch) | set(retry))
+    if not weeks:
+        journal.finish()
+        print(f"Tüm haftalar güncel (1-{current_week - 1}).")
+        return {"current_week": current_week, "fetched": [], "failed": [], "report": engine.report()}
+
+    units = {week: f"week:{week}" for week in weeks}
+    todo = [week for week in weeks if not journal.done(units[week])]
+    if len(todo) < len(weeks):
+        print(f"Günlükten devam: {len(weeks) - len(todo)} hafta zaten çekilmiş")
+    print(f"Çekilecek haftalar: {todo}")
+
+    def on_result(week, result):
+        week_data = parse_week(result)
+        if not week_data:
+            # Boş cevap tamamlanmış sayılmasın; bir sonraki çalıştırmada tekrar denenir
+            print(f"Hafta {week} boş döndü")
+            journal.fail(units[week], "boş cevap")
+            return
+        journal.write(units[week], week_data)
+
+    try:
+        engine.run_all({week: ("matchups", lg.matchups, (week,)) for week in todo},
+                       on_result=on_result, on_error=lambda week, e: journal.fail(units[week], e))
+    except BaseException:
+        journal.close()
+        raise
+
+    fetched = []
+    for unit, week_data in journal.records(units.values()):
+        week = int(unit.split(":")[1])
+        store.update(week, week_data)
+        fetched.append(week)
+    failed = [week for week in weeks if week not in fetched]
+
+    if fetched:
+        store.save()
+        if league_store is not None:
+            league_store.upsert_weeks({week_key(w): store.weeks[week_key(w)] for w in fetched}, source="yahoo")
+    if failed:
+        # Checkpoint kalır: başarısız haftalar (refetch ile istenmiş olsalar da) sonraki çalıştırmada denenir
+        journal.close()
+    else:
+        journal.finish()
+    return {"current_week": current_week, "fetched": fetched, "failed": failed, "report": engine.report()}
+
+def get_league_stats(refetch=(), max_workers=4, league=None, restart=False):
     # 1. ENV DEĞİŞKENLERİNİ ALMA
     client_id = os.getenv('YAHOO_CLIENT_ID')
     client_secret = os.getenv('YAHOO_CLIENT_SECRET')
-    league_id = os.getenv('YAHOO_LEAGUE_ID')
+    # --league verildiyse o Yahoo ligi çekilir ve leagues/<lig>/ altına yazılır
+    paths = league_paths(league)
+    league_id = os.getenv('YAHOO_LEAGUE_ID') if paths["league"] == DEFAULT_LEAGUE else paths["league"]
 
     # ID gelmediyse işlemi durdur
     if not league_id:
@@ -19,16 +143,18 @@ def get_league_stats():
         return
 
     # Data klasörünü kontrol et, yoksa oluştur
-    if not os.path.exists("data"):
-        os.makedirs("data")
+    os.makedirs(paths["data_dir"], exist_ok=True)
 
     # 2. AUTH VE BAĞLANTI
+    from yahoo_oauth import OAuth2
+    import yahoo_fantasy_api as yfa
+
     # OAuth2 için geçici dosya oluşturma
     auth_config = {
-        'consumer_key': client_id, 
+        'consumer_key': client_id,
         'consumer_secret': client_secret
     }
-    
+
     with open('temp_auth.json', 'w') as f:
         json.dump(auth_config, f)
 
@@ -36,92 +162,36 @@ def get_league_stats():
         sc = OAuth2(None, None, from_file='temp_auth.json')
         gm = yfa.Game(sc, 'nba')
         lg = gm.to_league(league_id)
-        print(f"Bağlantı Başarılı: {lg.settings()['name']} (ID: {league_id})")
-
-        # 3. İSİMLENDİRME MAPPINGI YAHOO STATS ID'LERİ İÇİN
-        custom_mapping = {
-            "9004003": "FGM/A",
-            "5": "FG%",
-            "9007006": "FTM/A",
-            "8": "FT%",
-            "10": "3PTM",
-            "12": "PTS",
-            "15": "REB",
-            "16": "AST",
-            "17": "ST",
-            "18": "BLK",
-            "19": "TO"
-        }
-
-        current_week = lg.current_week()
-        all_stats_data = {}
-
-        # 4-HAFTALIK VERİ TOPLAMA
-        # range(1, current_week) -> 1. haftadan başlar, şu anki haftadan BİR ÖNCEKİ haftayı alır.
-        # Şu anki haftayı almamamızın sebebi hafta tamamlanmamış olabilir.
-        for week in range(1, current_week):
-            print(f"Hafta {week} verileri alınıyor...")
-            week_data = []
-            
-            try:
-                m_raw = lg.matchups(week)
-
-                # takımları bulma fonksiyonu
-                def find_teams(obj):
-                    if isinstance(obj, dict):
-                        if 'team' in obj: yield obj['team']
-                        for v in obj.values(): yield from find_teams(v)
-                    elif isinstance(obj, list):
-                        for item in obj: yield from find_teams(item)
-
-                for team_content in find_teams(m_raw):
-                    team_name = "Unknown"
-                    stats_dict = {}
-                    
-                    for part in team_content:
-                        # Takım İsmi Bulma
-                        if isinstance(part, list):
-                            for sub in part:
-                                if isinstance(sub, dict) and 'name' in sub:
-                                    team_name = sub['name']
-                        
-                        # İstatistik Bulma ve İsimlendirme
-                        if isinstance(part, dict) and 'team_stats' in part:
-                            for s in part['team_stats']['stats']:
-                                s_id = str(s['stat']['stat_id'])
-                                stat_label = custom_mapping.get(s_id, s_id)
-                                s_val = s['stat']['value']
-                                stats_dict[stat_label] = s_val
-                    
-                    if team_name != "Unknown":
-                        week_data.append({"team_name": team_name, "stats": stats_dict})
-                
-                # Takımları tekilleştir
-                seen_teams = set()
-                unique_week_data = []
-                for d in week_data:
-                    if d['team_name'] not in seen_teams:
-                        unique_week_data.append(d)
-                        seen_teams.add(d['team_name'])
-
-                all_stats_data[f"week_{week}"] = unique_week_data
-                
-            except Exception as e:
-                print(f"Hafta {week} hatası: {str(e)}")
-
-        # 5. Kayıt
-        output_path = os.path.join("data", "nba_league_stats.json")
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_stats_data, f, ensure_ascii=False, indent=4)
-        
-        print(f"\nİşlem Tamam! Veriler '{output_path}' dosyasına kaydedildi.")
+        print(f"Bağlantı Başarılı (ID: {league_id})")
+
+        # 3. HAFTALIK VERİ TOPLAMA (sadece eksik haftalar)
+        output_path = paths["stats_path"]
+        store = WeekStore(output_path)
+        league_store = LeagueStore(paths["store_path"])
+        result = sync_weeks(lg, store, refetch=refetch, max_workers=max_workers, league_store=league_store,
+                            restart=restart)
+        league_store.close()
+
+        for kind, s in result["report"].items():
+            print(f"  {kind}: {s}")
+        if result["failed"]:
+            print(f"Başarısız haftalar (tekrar çalıştırın): {result['failed']}")
+        print(f"\nİşlem Tamam! {len(result['fetched'])} hafta '{output_path}' dosyasına kaydedildi.")
 
     except Exception as e:
         print(f"Kritik Bağlantı Hatası: {e}")
     # Geçici dosyayı silme
     finally:
-        if os.path.exists('temp_auth.json'): 
+        if os.path.exists('temp_auth.json'):
             os.remove('temp_auth.json')
 
 if __name__ == "__main__":
-    get_league_stats()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Tamamlanmış haftaların matchup istatistiklerini çeker.")
+    parser.add_argument("--refetch", type=int, nargs="*", default=[], help="Yeniden çekilecek hafta numaraları")
+    parser.add_argument("--refetch-all", action="store_true", help="Tüm tamamlanmış haftaları yeniden çek")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--league", default=None, help="Yahoo lig anahtarı (örn. 466.l.12345); varsayılan .env'deki lig")
+    parser.add_argument("--restart", action="store_true", help="yarım kalan çalıştırmanın günlüğünü yok say")
+    args = parser.parse_args()
+    refetch = range(1, 1000) if args.refetch_all else args.refetch
+    get_league_stats(refetch=refetch, max_workers=args.workers, league=args.league, restart=args.restart)
@@ -0,0 +1,52 @@
+"""Hafta anahtarlı kalıcı matchup deposu (data/nba_league_stats.json).
+
+Dosya formatı değişmez: {"week_1": [{"team_name", "stats"}, ...], ...}. Dosyada
+verisi olan hafta tamamlanmış sayılır ve tekrar çekilmez; sadece açıkça istenen
+haftalar yeniden çekilir. Yazma geçici dosya + os.replace ile atomiktir, yarıda
+kalan bir çalıştırma mevcut dosyayı bozmaz.
+"""
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from league_store import atomic_write_json  # noqa: E402
+
+_WEEK_KEY = re.compile(r"^week_(\d+)$")
+
+
+def week_key(week):
+    return f"week_{week}"
+
+
+class WeekStore:
+    def __init__(self, path):
+        self.path = path
+        self.weeks = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.weeks = json.load(f)
+
+    def completed(self):
+        """Verisi olan hafta numaraları."""
+        done = set()
+        for key, teams in self.weeks.items():
+            m = _WEEK_KEY.match(key)
+            if m and teams:
+                done.add(int(m.group(1)))
+        return done
+
+    def missing_weeks(self, current_week, refetch=()):
+        """1..current_week-1 arasında eksik olan haftalar + açıkça yeniden istenenler."""
+        wanted = set(range(1, current_week))
+        return sorted((wanted - self.completed()) | (set(refetch) & wanted))
+
+    def update(self, week, teams):
+        self.weeks[week_key(week)] = teams
+
+    def save(self):
+        # Hafta sırasıyla yaz (week_10, week_2'den sonra gelsin)
+        ordered = dict(sorted(self.weeks.items(),
+                              key=lambda kv: int(_WEEK_KEY.match(kv[0]).group(1)) if _WEEK_KEY.match(kv[0]) else 0))
+        atomic_write_json(self.path, ordered)
@@ -0,0 +1,396 @@
+import os
+import threading
+import weakref
+from collections import deque
+from dotenv import load_dotenv
+from langchain_google_genai import GoogleGenerativeAIEmbeddings, ChatGoogleGenerativeAI
+from langchain_chroma import Chroma
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+
+from answer_cache import AnswerCache, data_version
+from context_format import DEFAULT_TOKEN_BUDGET, estimate_tokens, format_context
+from documents import build_documents, load_json
+from embedding_cache import CachedEmbeddings, EmbeddingCache
+from entity_index import EntityIndex, HybridRetriever
+from intent_router import IntentRouter
+from league_store import STORE_PATH, LeagueStore
+from matchup_sim import DEFAULT_SIMS, MatchupSimulator, parse_question, render_matchup, render_standings
+from pipeline import AsyncPipeline, iterate_async
+from prompts import (  # noqa: F401 (eski importlar için runtime üzerinden de erişilebilir)
+    intent_system_prompt, stats_prompt_str, trade_prompt_str, general_prompt_str,
+    stats_result_prompt_str, trade_result_prompt_str, matchup_result_prompt_str, INTENT_PROMPTS,
+    GREETING_MESSAGE,
+)
+from query_filters import QueryFilterParser
+from stats_engine import StatsIndex, render_ranking
+from trade_engine import TradeIndex, render_trade
+from tracing import Tracer
+
+# Yollar çalışma dizininden bağımsız olsun diye proje köküne göre çözülür
+# (app.py kökten, notebook ise notebooks/ klasöründen çalışıyor).
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PLAYERS_PATH = os.path.join(BASE_DIR, "data", "nba_fantasy_players.json")
+TEAMS_PATH = os.path.join(BASE_DIR, "data", "nba_league_summary.json")
+CHROMA_DIR = os.path.join(BASE_DIR, "nba_fantasy_db")
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+
+load_dotenv(os.path.join(BASE_DIR, ".env"))
+
+
+_embedding_caches = {}
+_embedding_lock = threading.Lock()
+
+
+def default_embeddings(cache_dir=CACHE_DIR):
+    """Gemini embedding'leri, diskteki embedding önbelleğinin arkasında.
+
+    Aynı önbellek dosyası süreç içinde tek bağlantıyla paylaşılır (ligler, değerlendirme).
+    EMBEDDING_CACHE_MB boyut sınırıdır; 0 verilirse önbellek kullanılmaz.
+    """
+    inner = GoogleGenerativeAIEmbeddings(model="models/gemini-embedding-001")
+    max_mb = float(os.getenv("EMBEDDING_CACHE_MB", "512"))
+    if max_mb <= 0:
+        return inner
+    path = os.path.join(cache_dir, "embeddings.sqlite3")
+    with _embedding_lock:
+        cache = _embedding_caches.get(path)
+        if cache is None:
+            cache = _embedding_caches[path] = EmbeddingCache(path, max_bytes=int(max_mb * 2 ** 20))
+    return CachedEmbeddings(inner, cache)
+
+
+def normalize_intent(raw):
+    """LLM'in döndürdüğü metni TRADE/STATS/GREETING/GENERAL etiketlerinden birine indirger."""
+    raw = raw.strip().upper()
+    for label in ("GREETING", "TRADE", "STATS"):
+        if label in raw:
+            return label
+    return "GENERAL"
+
+
+def load_league_data(players_path=PLAYERS_PATH, teams_path=TEAMS_PATH, store_path=STORE_PATH):
+    """(oyuncular, takımlar). JSON dosyaları SQLite deposundan yazılmış ve sonradan
+    değişmemişse kayıtlar depodan okunur, yoksa JSON'dan."""
+    if store_path and os.path.exists(store_path):
+        store = LeagueStore(store_path)
+        try:
+            if store.json_in_sync(players_path, teams_path):
+                return store.players(), store.teams()
+        finally:
+            store.close()
+    return load_json(players_path), load_json(teams_path)
+
+
+def load_documents(players_path=PLAYERS_PATH, teams_path=TEAMS_PATH, players=None, teams=None):
+    # build_index.py ile aynı dökümanlar (aynı kalıcı ID'ler). Kayıtların hepsi
+    # 1000 karakterin altında olduğu için eskiden yapılan chunking'e gerek yok.
+    return build_documents(players_path, teams_path, players=players, teams=teams)
+
+
+def _release(answer_cache, tracer, chroma_dir, release_index=False, index_in_use=None):
+    answer_cache.close()
+    tracer.close()
+    if release_index and not (index_in_use is not None and index_in_use()):
+        from chromadb.api.shared_system_client import SharedSystemClient
+        system = SharedSystemClient._identifier_to_system.pop(chroma_dir, None)
+        if system is not None:
+            system.stop()
+
+
+class ChatbotRuntime:
+    """Embedding, Chroma, LLM ve niyet başına hazır RAG zincirlerini bir kez kurar."""
+
+    def __init__(self, players_path=PLAYERS_PATH, teams_path=TEAMS_PATH, chroma_dir=CHROMA_DIR,
+                 context_token_budget=DEFAULT_TOKEN_BUDGET, embeddings=None, llm=None, cache_dir=CACHE_DIR,
+                 tracing=None):
+        # embeddings/llm verilmezse Gemini kullanılır; benchmark ve testler sahte modeller verir.
+        # tracing None ise RAG_TRACING ortam değişkenine bakılır (varsayılan kapalı)
+        self.context_token_budget = context_token_budget
+        self.players_path = players_path
+        self.teams_path = teams_path
+        self.chroma_dir = chroma_dir
+
+        # Her ligin SQLite deposu kendi veri klasöründe
+        self.players, self.teams = load_league_data(
+            players_path, teams_path, os.path.join(os.path.dirname(players_path), "league.sqlite3"))
+        self.docs = load_documents(players_path, teams_path, self.players, self.teams)
+        self.docs_by_id = {doc.id: doc for doc in self.docs}
+        self.stats_index = StatsIndex(self.players, self.teams)
+        self.trade_index = TradeIndex(self.players)
+        self.embeddings = embeddings or default_embeddings(cache_dir)
+        self.vector_store = Chroma(
+            embedding_function=self.embeddings,
+            persist_directory=chroma_dir
+        )
+        # İsmi geçen oyuncu/takım kayıtları ID ile gelir, kalan yer vektör aramasıyla dolar
+        self.entity_index = EntityIndex(self.players, self.teams)
+        # Takım/pozisyon/free agent/eşik kısıtları Chroma where filtresine dönüşür
+        team_names = {t["team_name"] for t in self.teams} | {p["current_team"] for p in self.players}
+        self.retriever = HybridRetriever(
+            vector_store=self.vector_store,
+            entity_index=self.entity_index,
+            docs_by_id=self.docs_by_id,
+            k=10,
+            filter_parser=QueryFilterParser(team_names),
+        )
+        self.llm = llm or ChatGoogleGenerativeAI(model="gemini-2.5-flash-lite", temperature=0.3, max_tokens=500)
+
+        intent_prompt = ChatPromptTemplate.from_template(intent_system_prompt)
+        self.intent_chain = intent_prompt | self.llm | StrOutputParser()
+        # Çoğu soru yerel kurallarla çözülür, LLM sadece belirsiz sorularda çağrılır
+        self.intent_router = IntentRouter(self.classify_llm, embeddings=self.embeddings,
+                                          llm_aclassify=self.aclassify_llm, cache_dir=cache_dir)
+
+        # Her sorguda yeniden kurmak yerine niyet başına tek hazır üretim zinciri;
+        # retrieval ve kompakt bağlam tablosu prepare() içinde hazırlanır.
+        self.qa_prompts = {}
+        self.generate_chains = {}
+        for intent, sys_prompt in INTENT_PROMPTS.items():
+            qa_prompt = ChatPromptTemplate.from_messages([
+                ("system", sys_prompt),
+                ("user", "{input}"),
+            ])
+            self.qa_prompts[intent] = qa_prompt
+            self.generate_chains[intent] = qa_prompt | self.llm | StrOutputParser()
+
+        stats_result_prompt = ChatPromptTemplate.from_messages([
+            ("system", stats_result_prompt_str),
+            ("user", "{input}"),
+        ])
+        self.stats_chain = stats_result_prompt | self.llm | StrOutputParser()
+
+        trade_result_prompt = ChatPromptTemplate.from_messages([
+            ("system", trade_result_prompt_str),
+            ("user", "{input}"),
+        ])
+        self.trade_chain = trade_result_prompt | self.llm | StrOutputParser()
+
+        matchup_result_prompt = ChatPromptTemplate.from_messages([
+            ("system", matchup_result_prompt_str),
+            ("user", "{input}"),
+        ])
+        self.matchup_chain = matchup_result_prompt | self.llm | StrOutputParser()
+        # Eşleşme simülatörü ilk eşleşme sorusunda haftalık istatistiklerden kurulur
+        self.stats_path = os.path.join(os.path.dirname(players_path), "nba_league_stats.json")
+        self.my_team = os.getenv("YAHOO_TEAM_NAME") or None
+        self._matchup_sim = None
+        self._matchup_lock = threading.Lock()
+
+        self.data_dir = os.path.dirname(players_path)
+        self.cache_dir = cache_dir
+        # Eşleştirici runtime'ı değil indeksi tutar; önbellek runtime'ı canlı tutmasın (close_when_unused)
+        entity_index = self.entity_index
+        self.answer_cache = AnswerCache(os.path.join(cache_dir, "answers.sqlite3"),
+                                        entity_matcher=lambda query: entity_index.match(query)["ids"])
+        # Runtime'ın yüklediği verinin sürümü; dosyalar değişince runtime (ve sürüm) yeniden kurulur
+        self.data_version = data_version(self.data_dir)
+        self.answer_cache.purge(self.data_version)
+        # Son isteklerin ilk token / toplam üretim süreleri
+        self.timings = deque(maxlen=500)
+        # İstek başına aşama izleri (cache/traces/rag_traces.jsonl, dönen dosya)
+        self.tracer = Tracer(os.path.join(cache_dir, "traces", "rag_traces.jsonl"), enabled=tracing)
+        # Niyet sınıflandırma ile query embedding/retrieval'ı paralel çalıştıran async akış
+        self.pipeline = AsyncPipeline(self)
+
+    def close(self, release_index=False):
+        """Dosya tutan kaynakları bırakır. release_index=True ise bu Chroma klasörünün süreç içi
+        istemcisi de (HNSW indeksleri) bellekten atılır; klasörü kullanan başka runtime kalmamalı."""
+        _release(self.answer_cache, self.tracer, self.chroma_dir, release_index)
+
+    def close_when_unused(self, release_index=False, index_in_use=None):
+        """close() ile aynı kaynakları, runtime'ı kullanan son istek de bitip nesne çöp
+        toplandığında bırakır. index_in_use o an True dönerse (klasör yeniden yüklendi)
+        Chroma istemcisine dokunulmaz."""
+        weakref.finalize(self, _release, self.answer_cache, self.tracer, self.chroma_dir,
+                         release_index, index_in_use)
+
+    def classify_llm(self, query):
+        return normalize_intent(self.intent_chain.invoke({"query": query}))
+
+    async def aclassify_llm(self, query):
+        return normalize_intent(await self.intent_chain.ainvoke({"query": query}))
+
+    def route(self, query):
+        """{"intent", "confidence", "path"} döndürür."""
+        return self.intent_router.classify(query)
+
+    def classify(self, query):
+        return self.route(query)["intent"]
+
+    def prepare_stats(self, query):
+        """STATS sıralama sorusu stats_engine ile, haftalık eşleşme/sıralama tahmini matchup_sim ile
+        cevaplanabiliyorsa hazır girdiler, yoksa None."""
+        match = self.entity_index.match(query)
+        result = self.stats_index.query(query, match["ids"] if match["resolved"] else ())
+        if result is None:
+            return self.prepare_matchup(query)
+        ranking = render_ranking(result)
+        context = [self.docs_by_id[row["id"]] for row in result["rows"] if row["id"] in self.docs_by_id]
+        tokens = {
+            "records_used": len(result["rows"]),
+            "records_dropped": 0,
+            "context_tokens": estimate_tokens(ranking),
+            "prompt_tokens": estimate_tokens(stats_result_prompt_str) + estimate_tokens(ranking)
+            + 2 * estimate_tokens(query),
+        }
+        return {"chain": self.stats_chain, "inputs": {"input": query, "ranking": ranking},
+                "context": context, "tokens": tokens, "ranking": result}
+
+    def matchup_simulator(self):
+        """Haftalık istatistik dosyası yoksa ya da yetersizse None."""
+        with self._matchup_lock:
+            if self._matchup_sim is None and os.path.exists(self.stats_path):
+                try:
+                    self._matchup_sim = MatchupSimulator.from_file(self.stats_path)
+                except ValueError:
+                    return None
+            return self._matchup_sim
+
+    def prepare_matchup(self, query):
+        """"Will I beat Kadıköy Bulls?" / "projected standings" soruları için simülasyon sonucu, yoksa None."""
+        teams = [i.split(":", 1)[1] for i in self.entity_index.match(query)["ids"] if i.startswith("team:")]
+        parsed = parse_question(query, teams, self.my_team)
+        sim = self.matchup_simulator() if parsed is not None else None
+        if sim is None:
+            return None
+        kind, pair = parsed
+        if kind == "matchup":
+            if not all(team in sim.team_index for team in pair):
+                return None
+            result = sim.matchup(*pair)
+            projection = render_matchup(result)
+            ids = [f"team:{team}" for team in pair]
+        else:
+            result = sim.standings()
+            projection = render_standings(result, DEFAULT_SIMS)
+            ids = [f"team:{row['team']}" for row in result]
+        context = [self.docs_by_id[i] for i in ids if i in self.docs_by_id]
+        tokens = {
+            "records_used": len(context),
+            "records_dropped": 0,
+            "context_tokens": estimate_tokens(projection),
+            "prompt_tokens": estimate_tokens(matchup_result_prompt_str) + estimate_tokens(projection)
+            + 2 * estimate_tokens(query),
+        }
+        return {"chain": self.matchup_chain, "inputs": {"input": query, "projection": projection},
+                "context": context, "tokens": tokens, "matchup": result}
+
+    def prepare_trade(self, query):
+        """TRADE sorusu trade_engine ile (benzer oyuncu, ihtiyaç, karşılaştırma) cevaplanabiliyorsa
+        hazır girdiler, yoksa None."""
+        ids = self.entity_index.match(query)["ids"]
+        player_ids = [i for i in ids if i.startswith("player:")]
+        teams = [i.split(":", 1)[1] for i in ids if i.startswith("team:")]
+        result = self.trade_index.query(query, player_ids, teams[0] if teams else None)
+        if result is None:
+            return None
+        analysis = render_trade(result)
+        context = [self.docs_by_id[i] for i in self.trade_index.row_ids(result) if i in self.docs_by_id]
+        tokens = {
+            "records_used": len(context),
+            "records_dropped": 0,
+            "context_tokens": estimate_tokens(analysis),
+            "prompt_tokens": estimate_tokens(trade_result_prompt_str) + estimate_tokens(analysis)
+            + 2 * estimate_tokens(query),
+        }
+        return {"chain": self.trade_chain, "inputs": {"input": query, "analysis": analysis},
+                "context": context, "tokens": tokens, "trade": result}
+
+    def prepare_docs(self, query, intent, docs):
+        """Retrieve edilmiş dökümanlardan kompakt bağlam tablosu ve prompt girdileri."""
+        if intent not in self.generate_chains:
+            intent = "GENERAL"
+        text, tokens = format_context(docs, intent, query, self.context_token_budget)
+        tokens["prompt_tokens"] = estimate_tokens(INTENT_PROMPTS[intent]) + estimate_tokens(text) \
+            + 2 * estimate_tokens(query)
+        return {"chain": self.generate_chains[intent], "inputs": {"input": query, "context": text},
+                "context": docs, "tokens": tokens}
+
+    def prepare(self, query, intent):
+        """Üretimden önceki her şey: bağlam dökümanları, prompt girdileri ve kullanılacak zincir.
+
+        STATS sıralama soruları stats_engine'den, TRADE soruları trade_engine'den, diğerleri
+        retrieval + kompakt tablodan beslenir.
+        """
+        engines = {"STATS": self.prepare_stats, "TRADE": self.prepare_trade}
+        if intent in engines:
+            prepared = engines[intent](query)
+            if prepared is not None:
+                return prepared
+        return self.prepare_docs(query, intent, self.retriever.invoke(query))
+
+    def answer(self, query, intent):
+        """Verilen niyetin zinciriyle {"input", "context", "answer", "tokens"} sözlüğü döndürür."""
+        prepared = self.prepare(query, intent)
+        answer = prepared["chain"].invoke(prepared["inputs"])
+        return {"input": query, "context": prepared["context"], "answer": answer, "tokens": prepared["tokens"]}
+
+    def ask_stream(self, query, use_cache=True):
+        """pipeline.AsyncPipeline.stream'in senkron hali (Streamlit ve notebook için).
+
+        Sırasıyla şu olayları üretir:
+          {"type": "route", "intent", "route"}
+          {"type": "context", "context", "tokens"}  (selamlaşmada yok)
+          {"type": "token", "text"}                 (bir ya da daha çok)
+          {"type": "done", "response"}
+        """
+        yield from iterate_async(self.pipeline.stream(query, use_cache=use_cache))
+
+    def ask(self, query, use_cache=True):
+        """ask_stream'in tamamını tüketip son cevabı döndürür.
+
+        {"input", "intent", "route", "context", "answer", "cached", ...}
+        """
+        response = None
+        for event in self.ask_stream(query, use_cache=use_cache):
+            if event["type"] == "done":
+                response = event["response"]
+        return response
+
+
+def _path_signature(path):
+    """Dosya ya da klasörün (mtime, boyut) imzası; klasörlerde içindeki tüm dosyalar sayılır."""
+    if os.path.isfile(path):
+        st = os.stat(path)
+        return ((path, st.st_mtime_ns, st.st_size),)
+    if not os.path.isdir(path):
+        return ((path, None, None),)
+    entries = []
+    for root, _, files in os.walk(path):
+        for name in files:
+            full = os.path.join(root, name)
+            try:
+                st = os.stat(full)
+            except FileNotFoundError:
+                continue
+            entries.append((full, st.st_mtime_ns, st.st_size))
+    return tuple(sorted(entries))
+
+
+def data_signature(paths):
+    return tuple(_path_signature(p) for p in paths)
+
+
+_lock = threading.Lock()
+_runtimes = {}
+
+
+def get_runtime(players_path=PLAYERS_PATH, teams_path=TEAMS_PATH, chroma_dir=CHROMA_DIR):
+    """Süreç başına paylaşılan runtime'ı döndürür.
+
+    Veri dosyaları ya da Chroma klasörü diskte değişmedikçe aynı nesne
+    yeniden kullanılır; değiştiyse runtime baştan kurulur.
+    """
+    key = (players_path, teams_path, chroma_dir)
+    # Haftalık istatistikler de imzada: eşleşme simülatörü ve data_version onlardan
+    files = key + (os.path.join(os.path.dirname(players_path), "nba_league_stats.json"),)
+    signature = data_signature(files)
+    with _lock:
+        cached = _runtimes.get(key)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        runtime = ChatbotRuntime(players_path, teams_path, chroma_dir)
+        # Kurulum sırasında Chroma dosyalara dokunmuş olabilir, imzayı sonradan al
+        _runtimes[key] = (data_signature(files), runtime)
+        return runtime
@@ -0,0 +1,325 @@
+"""Streamlit'ten bağımsız async HTTP servisi (aiohttp).
+
+    python server.py --port 8080 --concurrency 32 --queue 256
+
+    POST /ask          {"query": "...", "league": "default", "use_cache": true} -> JSON cevap
+    POST /ask/stream   aynı gövde -> NDJSON olaylar (route, context, token..., done)
+    GET  /health       hazır mı, yüklü ligler
+    GET  /metrics      kuyruk, birleştirilen istekler, gecikme p50/p95, önbellekler
+
+Tüm istekler aynı süreçteki sıcak runtime'ları (leagues.LeagueRegistry) paylaşır.
+Aynı anda en fazla `concurrency` istek Gemini'ye gider; `queue` kadar istek sıra
+bekler, fazlası 503 + Retry-After ile hemen reddedilir (backpressure). Aynı lig
+ve normalize edilmiş aynı soru zaten işleniyorsa yeni istek ona bağlanır, olaylar
+tekrar üretilmeden iki istemciye de aktarılır.
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter, deque
+
+import numpy as np
+from aiohttp import web
+
+from answer_cache import normalize_query
+from leagues import DEFAULT_LEAGUE, check_league_id, get_registry
+
+MAX_QUERY_CHARS = 1000
+
+
+class Overloaded(Exception):
+    pass
+
+
+class Gate:
+    """En fazla max_active iş aynı anda çalışır, max_waiting iş sıra bekler; fazlası Overloaded."""
+
+    def __init__(self, max_active=32, max_waiting=256):
+        self.max_active = max_active
+        self.max_waiting = max_waiting
+        self._sem = asyncio.Semaphore(max_active)
+        self.active = 0
+        self.waiting = 0
+        self.counts = Counter()
+
+    async def __aenter__(self):
+        if self._sem.locked() and self.waiting >= self.max_waiting:
+            self.counts["rejected"] += 1
+            raise Overloaded()
+        self.waiting += 1
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.counts["admitted"] += 1
+
+    async def __aexit__(self, *exc):
+        self.active -= 1
+        self._sem.release()
+
+    def stats(self):
+        return {"active": self.active, "waiting": self.waiting, "max_active": self.max_active,
+                "max_waiting": self.max_waiting, **self.counts}
+
+
+class Flight:
+    """Tek bir pipeline çalışmasının olayları; her abone baştan itibaren hepsini okur."""
+
+    def __init__(self):
+        self.events = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self._changed = asyncio.Condition()
+
+    async def publish(self, event=None, done=False, error=None):
+        async with self._changed:
+            if event is not None:
+                self.events.append(event)
+            if done:
+                self.done, self.error = True, error
+            self._changed.notify_all()
+
+    async def subscribe(self):
+        i = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: i < len(self.events) or self.done)
+                batch, done, error = self.events[i:], self.done, self.error
+            for event in batch:
+                yield event
+            i += len(batch)
+            if done and i >= len(self.events):
+                if error is not None:
+                    raise error
+                return
+
+
+def doc_json(doc):
+    return {"id": doc.id, "record_type": doc.metadata.get("record_type"), "content": doc.page_content}
+
+
+def event_json(event):
+    """Pipeline olaylarını JSON'a çevirir; Document nesneleri ID'lerine indirgenir."""
+    if event["type"] == "context":
+        return {"type": "context", "context": [doc_json(d) for d in event["context"]], "tokens": event["tokens"]}
+    if event["type"] == "done":
+        return {"type": "done", "response": response_json(event["response"])}
+    return event
+
+
+def response_json(response):
+    keys = ("input", "intent", "route", "answer", "cached", "tokens", "timings", "stages")
+    return {**{k: response.get(k) for k in keys}, "context": [doc_json(d) for d in response["context"]]}
+
+
+class ChatService:
+    def __init__(self, registry=None, max_active=32, max_waiting=256, window=1000):
+        self.registry = registry or get_registry()
+        self.gate = Gate(max_active, max_waiting)
+        self.flights = {}
+        self.latencies = deque(maxlen=window)
+        self.counts = Counter()
+        self.started_at = time.time()
+
+    async def runtime(self, league):
+        # Lig ilk kez isteniyorsa kurulum uzun sürebilir; event loop bloklanmasın
+        return await asyncio.to_thread(self.registry.get, league)
+
+    async def _produce(self, key, flight, league, query, use_cache):
+        started = time.perf_counter()
+        error = None
+        try:
+            async with self.gate:
+                runtime = await self.runtime(league)
+                async for event in runtime.pipeline.stream(query, use_cache=use_cache):
+                    await flight.publish(event_json(event))
+        except asyncio.CancelledError:
+            error = ConnectionResetError("istek iptal edildi")
+            raise
+        except Overloaded as e:
+            error = e
+        except Exception as e:
+            error = e
+            self.counts["errors"] += 1
+        finally:
+            self.flights.pop(key, None)
+            if error is None:
+                self.latencies.append(1000 * (time.perf_counter() - started))
+            await flight.publish(done=True, error=error)
+
+    async def events(self, league, query, use_cache=True):
+        """Sorunun olayları; aynı soru zaten işleniyorsa o çalışmaya bağlanır."""
+        key = (league, normalize_query(query), use_cache)
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = Flight()
+            flight.task = asyncio.ensure_future(self._produce(key, flight, league, query, use_cache))
+            self.counts["requests"] += 1
+        else:
+            self.counts["merged"] += 1
+        flight.subscribers += 1
+        try:
+            async for event in flight.subscribe():
+                yield event
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Bekleyen kimse kalmadı (istemciler koptu), Gemini çağrısı boşa sürmesin
+                flight.task.cancel()
+
+    async def ask(self, league, query, use_cache=True):
+        response = None
+        async for event in self.events(league, query, use_cache):
+            if event["type"] == "done":
+                response = event["response"]
+        return response
+
+    def metrics(self):
+        latencies = np.asarray(self.latencies, dtype=float)
+        metrics = {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "gate": self.gate.stats(),
+            "in_flight": len(self.flights),
+            **self.counts,
+            "latency_ms": {"n": len(latencies),
+                           "p50": round(float(np.percentile(latencies, 50)), 1) if len(latencies) else None,
+                           "p95": round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None},
+            "leagues": self.registry.stats(),
+        }
+        for league, runtime in self.registry.loaded().items():
+            metrics.setdefault("answer_cache", {})[league] = runtime.answer_cache.stats()
+            if runtime.tracer.enabled:
+                metrics.setdefault("stages", {})[league] = runtime.tracer.stage_stats()
+            if hasattr(runtime.embeddings, "cache"):
+                metrics["embedding_cache"] = runtime.embeddings.cache.stats()
+        return metrics
+
+
+# --- HTTP katmanı ---
+
+def _error(status, message, **headers):
+    return web.json_response({"error": message}, status=status, headers=headers)
+
+
+async def _parse(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise web.HTTPBadRequest(text=json.dumps({"error": "gövde JSON olmalı"}), content_type="application/json")
+    query = (body.get("query") or "").strip() if isinstance(body, dict) else ""
+    if not query or len(query) > MAX_QUERY_CHARS:
+        raise web.HTTPBadRequest(text=json.dumps({"error": f"query 1-{MAX_QUERY_CHARS} karakter olmalı"}),
+                                 content_type="application/json")
+    league = body.get("league") or DEFAULT_LEAGUE
+    try:
+        check_league_id(league)
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=json.dumps({"error": str(e)}), content_type="application/json")
+    return league, query, bool(body.get("use_cache", True))
+
+
+def _known_errors(e):
+    if isinstance(e, Overloaded):
+        return _error(503, "sunucu dolu, biraz sonra tekrar deneyin", **{"Retry-After": "1"})
+    if isinstance(e, FileNotFoundError):
+        return _error(404, str(e))
+    return None
+
+
+async def handle_ask(request):
+    service = request.app["service"]
+    league, query, use_cache = await _parse(request)
+    try:
+        response = await service.ask(league, query, use_cache)
+    except Exception as e:
+        known = _known_errors(e)
+        if known is None:
+            raise
+        return known
+    return web.json_response(response, dumps=lambda obj: json.dumps(obj, ensure_ascii=False))
+
+
+async def handle_stream(request):
+    service = request.app["service"]
+    league, query, use_cache = await _parse(request)
+    events = service.events(league, query, use_cache)
+    try:
+        # İlk olay gelmeden başlık gönderilmez; dolu sunucu ya da geçersiz lig düz hata döner
+        first = await events.__anext__()
+    except StopAsyncIteration:
+        first = None
+    except Exception as e:
+        known = _known_errors(e)
+        if known is None:
+            raise
+        return known
+
+    stream = web.StreamResponse(headers={"Content-Type": "application/x-ndjson; charset=utf-8",
+                                         "Cache-Control": "no-cache"})
+    await stream.prepare(request)
+
+    async def write(event):
+        await stream.write((json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    try:
+        if first is not None:
+            await write(first)
+        async for event in events:
+            await write(event)
+    except (ConnectionResetError, asyncio.CancelledError):
+        raise
+    except Exception as e:
+        await write({"type": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        await events.aclose()
+    await stream.write_eof()
+    return stream
+
+
+async def handle_health(request):
+    service = request.app["service"]
+    loaded = list(service.registry.stats()["leagues"])
+    return web.json_response({"status": "ok" if loaded else "starting", "leagues": loaded,
+                              "in_flight": len(service.flights), "waiting": service.gate.waiting})
+
+
+async def handle_metrics(request):
+    return web.json_response(request.app["service"].metrics())
+
+
+def create_app(service=None, warm=(DEFAULT_LEAGUE,), max_active=32, max_waiting=256):
+    """aiohttp uygulaması. Servis olay döngüsü içinde kurulur (Gate'in semaforu o döngüye bağlı)."""
+    app = web.Application(client_max_size=64 * 1024)
+
+    async def startup(app):
+        app["service"] = service or ChatService(max_active=max_active, max_waiting=max_waiting)
+        for league in warm:
+            # İlk istek soğuk başlamasın: veri, indeksler ve Chroma açılışta yüklenir
+            await app["service"].runtime(league)
+
+    app.on_startup.append(startup)
+    app.router.add_post("/ask", handle_ask)
+    app.router.add_post("/ask/stream", handle_stream)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--concurrency", type=int, default=32, help="aynı anda işlenen en fazla istek")
+    parser.add_argument("--queue", type=int, default=256, help="sırada bekleyebilecek en fazla istek")
+    parser.add_argument("--warm", nargs="*", default=[DEFAULT_LEAGUE], help="açılışta yüklenecek ligler")
+    args = parser.parse_args(argv)
+    web.run_app(create_app(warm=args.warm, max_active=args.concurrency, max_waiting=args.queue),
+                host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""STATS niyetindeki sıralama soruları için deterministik, sütun tabanlı istatistik indeksi.
+
+Tüm oyuncu ve takım kayıtları NumPy dizilerine çevrilir, her istatistik için
+sıralama bir kez önceden hesaplanır. "Who has the highest average block?" gibi
+bir soru benzerlik aramasına gitmeden, tüm lig üzerinde mikro saniyeler içinde
+cevaplanır; LLM sadece sonucu cümleye döker.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+from text_utils import fold_text
+
+CATEGORIES = ["PTS", "REB", "AST", "ST", "BLK", "3PTM", "TO"]
+PCT_STATS = {"FG%": "FGA", "FT%": "FTA"}
+VOLUME_STATS = ["FGM", "FGA", "FTM", "FTA"]
+FREE_AGENT = "Free Agent"
+
+# (kalıp, istatistik) — sıra önemli: daha özel kalıplar önce
+STAT_PATTERNS = [
+    (r"\b(field goals? made|fgm)\b", "FGM"),
+    (r"\b(field goals? attempt\w*|fga)\b", "FGA"),
+    (r"\b(free throws? made|ftm)\b", "FTM"),
+    (r"\b(free throws? attempt\w*|fta)\b", "FTA"),
+    (r"\b(field goal\w*|fg ?%|fg pct|fg|sut yuzdesi)\b", "FG%"),
+    (r"\b(free throw\w*|ft ?%|ft pct|ft|serbest atis\w*)\b", "FT%"),
+    (r"\b(three\w*|3 ?pt\w*|3s|3 pointers?|uclu\w*)\b", "3PTM"),
+    (r"\b(turnovers?|tov|top kayb\w*)\b", "TO"),
+    (r"\b(steals?|stl|spg|top calma\w*)\b", "ST"),
+    (r"\b(blocks?|blk|bpg|blok\w*)\b", "BLK"),
+    (r"\b(assists?|ast|apg|asist\w*)\b", "AST"),
+    (r"\b(rebounds?|reb|rebs|rpg|ribaund\w*)\b", "REB"),
+    (r"\b(points?|pts|ppg|scor\w*|sayi\w*)\b", "PTS"),
+]
+# Kısaltmalar İngilizce kelimelerle karışmasın diye ham metinde büyük harfle aranır ("to" / "TO")
+_RAW_STAT_PATTERNS = [(r"\bTO\b", "TO"), (r"\bST\b", "ST")]
+
+_POSITION_WORDS = [
+    (r"\bpoint guards?\b", "PG"),
+    (r"\bshooting guards?\b", "SG"),
+    (r"\bsmall forwards?\b", "SF"),
+    (r"\bpower forwards?\b", "PF"),
+    (r"\b(centers?|centres?|pivot\w*)\b", "C"),
+    (r"\bguards?\b", "G"),
+    (r"\bforwards?\b", "F"),
+]
+_RAW_POSITION = r"\b(PG|SG|SF|PF|C|G|F)\b"
+
+_ASCENDING = r"\b(lowest|least|fewest|worst|bottom|minimum|min|en az|en dusuk|en kotu)\b"
+_DESCENDING = r"\b(highest|most|top|best|leader\w*|leading|maximum|max|en cok|en yuksek|en iyi|lider\w*)\b"
+_RANKING = r"\b(rank\w*|sort\w*|who has|which player|which team|sirala\w*|hangi)\b"
+# İsmi geçen kayıtların kendi aralarındaki karşılaştırmasında ("Who has fewer turnovers, A or B?")
+_COMPARE_ASCENDING = r"\b(fewer|less|lower|worse|daha az|daha dusuk)\b"
+_TEAM_ENTITY = r"\b((which|what|hangi) (fantasy )?(team|takim)|teams|takimlar\w*)\b"
+_PLAYER_WORDS = r"\b(players?|who|oyuncu\w*|kim)\b"
+_TOTAL = r"\b(total|totals|toplam\w*)\b"
+_COUNT = r"\b(?:top|bottom|ilk|son|best|worst|first|last)\s+(\d{1,3})\b|\b(\d{1,3})\s+(?:players|teams|oyuncu|takim)"
+
+DEFAULT_N = 5
+MAX_N = 50
+
+
+def parse_fraction(val):
+    """'191/390' gibi değerleri pay ve payda olarak ayırır ('-/-' -> 0, 0)."""
+    try:
+        made, att = map(float, str(val).split('/'))
+        return made, att
+    except (ValueError, TypeError):
+        return 0.0, 0.0
+
+
+def _split_fraction_column(series):
+    parts = series.astype(str).str.split("/", n=1, expand=True).reindex(columns=[0, 1])
+    made = pd.to_numeric(parts[0], errors="coerce").fillna(0.0)
+    att = pd.to_numeric(parts[1], errors="coerce").fillna(0.0)
+    return made.to_numpy(float), att.to_numpy(float)
+
+
+def players_frame(players):
+    frame = pd.DataFrame(players)
+    for col in [f"AVG_{c}" for c in CATEGORIES] + [f"TOTAL_{c}" for c in CATEGORIES] + list(PCT_STATS):
+        frame[col] = pd.to_numeric(frame.get(col), errors="coerce").fillna(0.0)
+    frame["FGM"], frame["FGA"] = _split_fraction_column(frame["FGM/A"])
+    frame["FTM"], frame["FTA"] = _split_fraction_column(frame["FTM/A"])
+    frame["id"] = "player:" + frame["player_id"].astype(str)
+    return frame
+
+
+def teams_frame(teams):
+    rows = []
+    for team in teams:
+        totals = team.get("totals", {})
+        averages = team.get("averages", {})
+        row = {"id": f"team:{team['team_name']}", "name": team["team_name"],
+               "weeks_counted": team.get("weeks_counted", 0)}
+        for c in CATEGORIES:
+            row[f"TOTAL_{c}"] = float(totals.get(c, 0) or 0)
+            row[f"AVG_{c}"] = float(averages.get(c, 0) or 0)
+        row["FGM"], row["FGA"] = parse_fraction(totals.get("FGM/A", "0/0"))
+        row["FTM"], row["FTA"] = parse_fraction(totals.get("FTM/A", "0/0"))
+        # Oranlar yuvarlanmış ortalamalardan değil, toplam isabet/denemeden hesaplanır
+        row["FG%"] = row["FGM"] / row["FGA"] if row["FGA"] else 0.0
+        row["FT%"] = row["FTM"] / row["FTA"] if row["FTA"] else 0.0
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+class StatsTable:
+    """Bir kayıt tipinin (oyuncu/takım) istatistik sütunları ve önceden hesaplanmış sıralamaları."""
+
+    def __init__(self, frame, stat_columns):
+        self.frame = frame.reset_index(drop=True)
+        self.size = len(self.frame)
+        self.values = {c: self.frame[c].to_numpy(float) for c in stat_columns}
+        # Azalan sıra; eşitlikte dosyadaki sıra korunur
+        self.order = {c: np.argsort(-v, kind="stable") for c, v in self.values.items()}
+        self.order_asc = {c: np.argsort(v, kind="stable") for c, v in self.values.items()}
+        self.records = self.frame.to_dict("records")
+        self.row_of = {record["id"]: i for i, record in enumerate(self.records)}
+
+        # Yüzdelerde 1/1 atan oyuncu lider olmasın: denemesi medyanın yarısının altındakiler elenir
+        self.eligible = {}
+        for pct, att_col in PCT_STATS.items():
+            att = self.values[att_col]
+            positive = att[att > 0]
+            threshold = max(1.0, 0.5 * float(np.median(positive))) if positive.size else 1.0
+            self.eligible[pct] = (att >= threshold, threshold)
+
+        activity = self.values["FGA"] + self.values["FTA"] + self.values["TOTAL_PTS"]
+        self.active = activity > 0
+
+    def rank(self, stat, n=DEFAULT_N, ascending=False, mask=None, qualify=True):
+        """qualify=False: yüzde eşiği ve aktiflik elemesi yapılmaz (isimle sorulan kayıtlar)."""
+        order = self.order_asc[stat] if ascending else self.order[stat]
+        keep = mask
+        if qualify and stat in self.eligible:
+            eligible = self.eligible[stat][0]
+            keep = eligible if keep is None else keep & eligible
+        if qualify and ascending:
+            # En düşükler listesi hiç oynamamış oyunculardan oluşmasın
+            keep = self.active if keep is None else keep & self.active
+        if keep is not None:
+            order = order[keep[order]]
+        return order[:n]
+
+
+class StatsIndex:
+    """Oyuncu ve takım istatistikleri üzerinde top-N / bottom-N sorguları."""
+
+    def __init__(self, players, teams):
+        player_columns = ([f"AVG_{c}" for c in CATEGORIES] + [f"TOTAL_{c}" for c in CATEGORIES]
+                          + list(PCT_STATS) + VOLUME_STATS)
+        self.players = StatsTable(players_frame(players), player_columns)
+        self.teams = StatsTable(teams_frame(teams), player_columns)
+
+        frame = self.players.frame
+        self.team_names = sorted(set(frame["current_team"]) - {FREE_AGENT}, key=len, reverse=True)
+        self._folded_teams = [(fold_text(name), name) for name in self.team_names]
+        # Takım başına önceden maske tutmak takım x oyuncu bellek ister; kodlar tutulup maske sorguda üretilir
+        self._team_codes, uniques = pd.factorize(frame["current_team"])
+        self._team_code = {name: code for code, name in enumerate(uniques)}
+        position_sets = [set(str(p).split("/")) for p in frame["position"]]
+        self.position_masks = {
+            code: np.array([code in pos for pos in position_sets], dtype=bool)
+            for code in ("PG", "SG", "SF", "PF", "C", "G", "F")
+        }
+
+    def team_mask(self, team):
+        """Oyuncu tablosunda `team` takımındaki oyuncuların boolean maskesi (takım yoksa hepsi False)."""
+        code = self._team_code.get(team)
+        if code is None:
+            return np.zeros(self.players.size, dtype=bool)
+        return self._team_codes == code
+
+    def parse(self, text, ids=()):
+        """Soruyu {"entity", "stat", "ascending", "n", "team", "positions", "free_agent", "ids"} sözlüğüne çevirir.
+
+        ids soruda birebir çözülmüş kayıt ID'leridir (entity_index). Aynı tipte iki ya da daha
+        fazla kayıt varsa ("Who has more rebounds, Jokic or Embiid?") soru lig sıralaması değil
+        karşılaştırmadır: sıralama sadece bu kayıtlarla yapılır. Soru bir sıralama sorusu değilse
+        ya da istatistik bulunamazsa None döner.
+        """
+        folded = fold_text(text)
+        # Türkçe "top kaybı / top çalma" ifadelerindeki "top" sıralama kelimesi sayılmasın
+        direction_text = re.sub(r"\btop (kayb|calma)", " ", folded)
+        ascending = re.search(_ASCENDING, direction_text) is not None
+        count = re.search(_COUNT, direction_text)
+        if not (ascending or count or re.search(_DESCENDING, direction_text)
+                or re.search(_RANKING, direction_text)):
+            return None
+
+        base = None
+        for pattern, stat in STAT_PATTERNS:
+            if re.search(pattern, folded):
+                base = stat
+                break
+        if base is None:
+            for pattern, stat in _RAW_STAT_PATTERNS:
+                if re.search(pattern, text):
+                    base = stat
+                    break
+        if base is None:
+            return None
+
+        if base in CATEGORIES:
+            prefix = "TOTAL_" if re.search(_TOTAL, folded) else "AVG_"
+            stat = prefix + base
+        else:
+            stat = base
+
+        team = None
+        for folded_name, name in self._folded_teams:
+            if re.search(rf"\b{re.escape(folded_name)}\b", folded):
+                team = name
+                break
+
+        positions = set()
+        for pattern, code in _POSITION_WORDS:
+            if re.search(pattern, folded):
+                positions.add(code)
+                # "point guard" ayrıca "guard" olarak da sayılmasın
+                folded = re.sub(pattern, " ", folded)
+        # "G-Force" gibi takım isimlerindeki harfler pozisyon sanılmasın
+        raw = re.sub(re.escape(team), " ", text, flags=re.IGNORECASE) if team else text
+        positions.update(re.findall(_RAW_POSITION, raw))
+
+        free_agent = re.search(r"\b(free agents?|fa|serbest oyuncu\w*|bosta\w*)\b", folded) is not None
+
+        entity = "player"
+        if team is None and not positions and not free_agent:
+            if re.search(_TEAM_ENTITY, folded) or (
+                    re.search(r"\b(team|takim)\b", folded) and not re.search(_PLAYER_WORDS, folded)):
+                entity = "team"
+
+        n = DEFAULT_N
+        if count:
+            n = int(count.group(1) or count.group(2))
+        n = max(1, min(MAX_N, n))
+
+        named = []
+        for kind in ("player", "team"):
+            same = [i for i in dict.fromkeys(ids) if i.startswith(f"{kind}:")]
+            if len(same) >= 2:
+                named = same
+                break
+        if named:
+            # Karşılaştırma: takım/pozisyon filtreleri uygulanmaz, isimler zaten adayların kendisi
+            entity = named[0].split(":", 1)[0]
+            ascending = ascending or re.search(_COMPARE_ASCENDING, direction_text) is not None
+            n = len(named)
+            team, positions, free_agent = None, set(), False
+
+        return {
+            "entity": entity,
+            "stat": stat,
+            "ascending": ascending,
+            "n": n,
+            "team": team,
+            "positions": sorted(positions),
+            "free_agent": free_agent,
+            "ids": named,
+        }
+
+    def top(self, stat, n=DEFAULT_N, ascending=False, entity="player",
+            team=None, positions=(), free_agent=False, ids=()):
+        table = self.teams if entity == "team" else self.players
+        if stat not in table.values:
+            raise KeyError(f"Bilinmeyen istatistik: {stat}")
+
+        mask = None
+        if ids:
+            mask = np.zeros(table.size, dtype=bool)
+            mask[[table.row_of[i] for i in ids if i in table.row_of]] = True
+        elif entity == "player":
+            if team is not None:
+                mask = self.team_mask(team)
+            if free_agent:
+                fa = self.team_mask(FREE_AGENT)
+                mask = fa if mask is None else mask & fa
+            if positions:
+                pos_mask = np.zeros(table.size, dtype=bool)
+                for code in positions:
+                    pos_mask |= self.position_masks.get(code, False)
+                mask = pos_mask if mask is None else mask & pos_mask
+
+        rows = []
+        for idx in table.rank(stat, n, ascending, mask, qualify=not ids):
+            record = table.records[idx]
+            row = {
+                "id": record["id"],
+                "name": record["name"],
+                "stat": stat,
+                "value": float(table.values[stat][idx]),
+            }
+            if entity == "player":
+                row["team"] = record["current_team"]
+                row["position"] = record["position"]
+            if stat in PCT_STATS:
+                made_col = "FGM" if stat == "FG%" else "FTM"
+                row["made"] = int(table.values[made_col][idx])
+                row["attempts"] = int(table.values[PCT_STATS[stat]][idx])
+            rows.append(row)
+        return rows
+
+    def query(self, text, ids=()):
+        """Doğal dildeki sıralama sorusunu cevaplar; anlaşılamazsa None döner."""
+        parsed = self.parse(text, ids)
+        if parsed is None:
+            return None
+        rows = self.top(**parsed)
+        return {"query": parsed, "rows": rows}
+
+
+def render_ranking(result):
+    """Sonucu LLM'e verilecek kısa metin tablosuna çevirir."""
+    q = result["query"]
+    filters = []
+    if q.get("team"):
+        filters.append(f"team={q['team']}")
+    if q.get("positions"):
+        filters.append("position=" + "/".join(q["positions"]))
+    if q.get("free_agent"):
+        filters.append("free agents only")
+    if q.get("ids"):
+        filters.append("only the records named in the question")
+    order = "ascending" if q["ascending"] else "descending"
+    header = f"{q['entity']}s by {q['stat']} ({order}"
+    header += f"; {', '.join(filters)})" if filters else ")"
+
+    lines = [header]
+    if not result["rows"]:
+        lines.append("No matching records.")
+    for i, row in enumerate(result["rows"], 1):
+        value = f"{row['value']:.3f}" if row["stat"] in PCT_STATS else f"{row['value']:g}"
+        line = f"{i}. {row['name']}"
+        if "team" in row:
+            line += f" ({row['team']}, {row['position']})"
+        line += f" - {row['stat']}: {value}"
+        if "attempts" in row:
+            line += f" ({row['made']}/{row['attempts']})"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,128 @@
+"""Gerçek veriyle aynı şemada, istenen büyüklükte sentetik oyuncu/takım JSON'ları üretir.
+
+    python synthetic_data.py --records 100000 --out /tmp/league_100k
+
+İstatistikler gerçek oyunculardan (data/nba_fantasy_players.json) döngüsel
+olarak alınıp rastgele oynatılır; böylece dağılımlar gerçekçi kalır. İsimler
+hece birleşimlerinden üretilir ve benzersizdir.
+"""
+import argparse
+import json
+import os
+import random
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_PLAYERS = os.path.join(BASE_DIR, "data", "nba_fantasy_players.json")
+ROSTER_SIZE = 13
+
+_SYLLABLES = ["ka", "lo", "mi", "ra", "te", "zu", "do", "ne", "vi", "sa",
+              "ba", "jo", "ri", "ta", "ko", "le", "ma", "no", "pe", "su"]
+_AVG_STATS = ["AVG_PTS", "AVG_REB", "AVG_AST", "AVG_ST", "AVG_BLK", "AVG_3PTM", "AVG_TO"]
+_TEAM_STATS = ["PTS", "REB", "AST", "ST", "BLK", "3PTM", "TO"]
+
+
+def _word(i, length=3):
+    n = len(_SYLLABLES)
+    parts = []
+    for _ in range(length):
+        parts.append(_SYLLABLES[i % n])
+        i //= n
+    return "".join(parts).capitalize()
+
+
+def player_name(i):
+    # 20^3 = 8000 ad x 8000 soyad; benzersiz
+    return f"{_word(i % 8000)} {_word(i // 8000 + 37)}"
+
+
+def _jitter_fraction(value, rng, scale):
+    try:
+        made, att = (float(x) for x in str(value).split("/"))
+    except ValueError:
+        return "0/0"
+    att2 = max(0, round(att * scale))
+    pct = made / att if att else 0.0
+    pct = min(1.0, max(0.0, pct + rng.uniform(-0.03, 0.03)))
+    return f"{round(att2 * pct)}/{att2}"
+
+
+def generate_players(n, team_names, templates, seed=0):
+    rng = random.Random(seed)
+    players = []
+    rostered = len(team_names) * ROSTER_SIZE
+    for i in range(n):
+        base = templates[i % len(templates)]
+        scale = rng.uniform(0.7, 1.3)
+        record = {
+            "player_id": str(100000 + i),
+            "name": player_name(i),
+            "current_team": team_names[i // ROSTER_SIZE] if i < rostered else "Free Agent",
+            "position": base.get("position", "N/A"),
+        }
+        for stat in _AVG_STATS:
+            record[stat] = round(float(base.get(stat, 0)) * scale, 1)
+        for pct in ("FG%", "FT%"):
+            record[pct] = round(min(1.0, max(0.0, float(base.get(pct, 0)) + rng.uniform(-0.03, 0.03))), 3)
+        for stat in _AVG_STATS:
+            total = stat.replace("AVG_", "TOTAL_")
+            record[total] = round(float(base.get(total, 0)) * scale)
+        record["FGM/A"] = _jitter_fraction(base.get("FGM/A", "0/0"), rng, scale)
+        record["FTM/A"] = _jitter_fraction(base.get("FTM/A", "0/0"), rng, scale)
+        players.append(record)
+    return players
+
+
+def generate_teams(team_names, weeks=10, seed=0):
+    rng = random.Random(seed + 1)
+    teams = []
+    for name in team_names:
+        weekly = {"PTS": rng.uniform(420, 620), "REB": rng.uniform(130, 220), "AST": rng.uniform(85, 150),
+                  "ST": rng.uniform(22, 50), "BLK": rng.uniform(12, 40), "3PTM": rng.uniform(35, 75),
+                  "TO": rng.uniform(55, 85)}
+        fga, fta = round(rng.uniform(380, 460) * weeks), round(rng.uniform(90, 150) * weeks)
+        fgm, ftm = round(fga * rng.uniform(0.44, 0.50)), round(fta * rng.uniform(0.72, 0.84))
+        totals = {s: float(round(weekly[s] * weeks)) for s in _TEAM_STATS}
+        summary = {
+            "team_name": name,
+            "weeks_counted": weeks,
+            "totals": {**totals, "FGM/A": f"{fgm}/{fga}", "FTM/A": f"{ftm}/{fta}"},
+            "averages": {**{s: round(totals[s] / weeks, 2) for s in _TEAM_STATS},
+                         "FG%": round(fgm / fga, 3), "FT%": round(ftm / fta, 3)},
+        }
+        summary["text_description"] = (
+            f"{name} takımı {weeks} hafta boyunca toplam {totals['PTS']} sayı attı "
+            f"ve maç başına {summary['averages']['PTS']} ortalama yakaladı."
+        )
+        teams.append(summary)
+    return teams
+
+
+def generate_league(records, seed=0, templates_path=TEMPLATE_PLAYERS):
+    """Toplam `records` kayıt (oyuncu + takım). Takım sayısı gerçek ligdeki oranla ölçeklenir."""
+    with open(templates_path, "r", encoding="utf-8") as f:
+        templates = json.load(f)
+    n_teams = max(2, round(records / 28))
+    team_names = [f"{_word(i + 4001)} {_word(i // 8000 + 5, 2)}s" for i in range(n_teams)]
+    players = generate_players(records - n_teams, team_names, templates, seed)
+    return players, generate_teams(team_names, seed=seed)
+
+
+def write_league(out_dir, records, seed=0):
+    """(players_path, teams_path) döndürür."""
+    os.makedirs(out_dir, exist_ok=True)
+    players, teams = generate_league(records, seed)
+    players_path = os.path.join(out_dir, "nba_fantasy_players.json")
+    teams_path = os.path.join(out_dir, "nba_league_summary.json")
+    for path, data in ((players_path, players), (teams_path, teams)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    return players_path, teams_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sentetik lig verisi üretir.")
+    parser.add_argument("--records", type=int, default=450)
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(write_league(args.out, args.records, args.seed))
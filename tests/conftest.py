@@ -0,0 +1,18 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session")
+def league():
+    """Repodaki örnek lig verisi: (oyuncular, takımlar)."""
+    with open(os.path.join(ROOT, "data", "nba_fantasy_players.json"), encoding="utf-8") as f:
+        players = json.load(f)
+    with open(os.path.join(ROOT, "data", "nba_league_summary.json"), encoding="utf-8") as f:
+        teams = json.load(f)
+    return players, teams
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from answer_cache import AnswerCache
+from entity_index import EntityIndex
+
+VECTOR = np.ones(8, dtype=np.float32)  # Tüm sorular aynı embedding: sadece imza ayırt eder
+
+
+@pytest.fixture
+def cache(tmp_path, league):
+    entities = EntityIndex(*league)
+    cache = AnswerCache(str(tmp_path / "answers.sqlite3"), entity_matcher=lambda q: entities.match(q)["ids"])
+    yield cache
+    cache.close()
+
+
+def test_similar_hit_requires_same_entities(cache):
+    cache.store("STATS", "Jokic rebounds last week", "v1", "answer", [], VECTOR)
+    assert cache.lookup("STATS", "Embiid rebounds last week", "v1", VECTOR) is None
+    assert cache.lookup("STATS", "Nikola Jokic rebounds last week?", "v1", VECTOR)["match"] == "similar"
+
+
+def test_similar_hit_requires_same_numbers_and_stat(cache):
+    cache.store("STATS", "guards with over 20 points", "v1", "answer", [], VECTOR)
+    assert cache.lookup("STATS", "guards with over 25 points", "v1", VECTOR) is None
+    assert cache.lookup("STATS", "guards with over 20 rebounds", "v1", VECTOR) is None
+    assert cache.lookup("STATS", "guards scoring over 20 points", "v1", VECTOR) is not None
@@ -0,0 +1,41 @@
+import pytest
+
+from chat_session import ChatSession
+from fake_models import FakeChatModel, FakeEmbeddings
+from runtime import ChatbotRuntime
+
+
+@pytest.fixture(scope="module")
+def runtime(tmp_path_factory):
+    tmp = tmp_path_factory.mktemp("chat")
+    return ChatbotRuntime(chroma_dir=str(tmp / "chroma"), cache_dir=str(tmp / "cache"),
+                          embeddings=FakeEmbeddings(), llm=FakeChatModel(), tracing=False)
+
+
+def ask(session, query):
+    return list(session.ask_stream(query))[-1]["response"]["session"]
+
+
+def test_turkish_her_is_not_a_pronoun(runtime):
+    session = ChatSession(runtime)
+    ask(session, "How many points did Luka Doncic score?")
+    assert session.rewrite("Her takımın toplam ribaundu kaç?") == "Her takımın toplam ribaundu kaç?"
+    assert "Luka" in session.rewrite("what about his rebounds?")
+
+
+def test_only_followups_skip_the_pipeline(runtime):
+    session = ChatSession(runtime)
+    ask(session, "How many points did Luka Doncic score?")
+    # İsimleri birebir çözen ama yeni bir soru: normal akış
+    assert ask(session, "How many rebounds did Luka Doncic get?") == {
+        "rewritten": None, "followup": False, "turn": 2}
+    followup = ask(session, "and his assists?")
+    assert followup["followup"] and "Luka" in followup["rewritten"]
+
+
+def test_session_docs_are_read_first(runtime):
+    session = ChatSession(runtime)
+    doc_id = next(iter(runtime.docs_by_id))
+    cached = runtime.docs_by_id[doc_id].model_copy()
+    session._remember([cached])
+    assert session._doc(doc_id) is cached
@@ -0,0 +1,49 @@
+import asyncio
+
+from embedding_cache import TOUCH_FLUSH_ROWS, CachedEmbeddings, EmbeddingCache
+from fake_models import FakeEmbeddings
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _last_used(cache):
+    return dict(cache._db.execute("SELECT key, last_used FROM embeddings"))
+
+
+def test_hits_are_touched_in_batches(tmp_path):
+    clock = Clock()
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"), clock=clock)
+    texts = [f"text {i}" for i in range(TOUCH_FLUSH_ROWS)]
+    cache.put_many("m", "query", texts, [[float(i)] for i in range(len(texts))])
+    before = _last_used(cache)
+
+    clock.now = 1.0
+    cache.get_many("m", "query", texts[:1])
+    assert _last_used(cache) == before
+    cache.get_many("m", "query", texts)
+    assert set(_last_used(cache).values()) == {1.0}
+
+
+def test_eviction_sees_pending_touches(tmp_path):
+    clock = Clock()
+    cache = EmbeddingCache(str(tmp_path / "e.sqlite3"), max_bytes=3 * 4, clock=clock)
+    cache.put_many("m", "query", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+    clock.now = 1.0
+    cache.get_many("m", "query", ["a"])
+    clock.now = 2.0
+    cache.put_many("m", "query", ["d"], [[4.0]])
+    vectors = cache.get_many("m", "query", ["a", "b", "c", "d"])
+    assert vectors[0] is not None and vectors[1] is None
+
+
+def test_async_embeddings_match_sync(tmp_path):
+    embeddings = CachedEmbeddings(FakeEmbeddings(size=8), EmbeddingCache(str(tmp_path / "e.sqlite3")))
+    first = asyncio.run(embeddings.aembed_query("Who leads in blocks?"))
+    assert first == embeddings.embed_query("Who leads in blocks?")
+    assert asyncio.run(embeddings.aembed_documents(["a", "b"])) == embeddings.embed_documents(["a", "b"])
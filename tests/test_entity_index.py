@@ -0,0 +1,29 @@
+import pytest
+
+from entity_index import EntityIndex
+
+
+@pytest.fixture(scope="module")
+def index(league):
+    return EntityIndex(*league)
+
+
+def test_common_word_at_sentence_start_is_not_a_player(index):
+    # "Will" eskiden Will Richard'a eşleşiyordu
+    assert index.match("Will I beat Kadıköy Bulls this week?") == {
+        "ids": ["team:Kadıköy Bulls"], "resolved": True, "fuzzy": False}
+
+
+def test_common_words_are_not_partial_aliases(index):
+    assert index.match_exact("Is Trae Young a good center?") == index.match_exact("Is Trae Young good?")
+    assert index.match("How is Black doing?")["ids"] == []
+
+
+def test_full_name_and_surname_aliases(index):
+    match = index.match("Who has more rebounds, Jokic or Embiid?")
+    assert match["resolved"] and len(match["ids"]) == 2
+
+
+def test_sentence_initial_surname_is_found_but_unresolved(index):
+    match = index.match("Jokic or Embiid?")
+    assert len(match["ids"]) == 2 and not match["resolved"]
@@ -0,0 +1,48 @@
+import copy
+import json
+import os
+
+import pytest
+
+from league_engine import LeagueAggregator
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def raw():
+    with open(os.path.join(ROOT, "data", "nba_league_stats.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fresh(raw):
+    agg = LeagueAggregator()
+    agg.fold(raw)
+    return agg.to_records()
+
+
+def test_unchanged_reload_parses_nothing(raw):
+    agg = LeagueAggregator()
+    agg.fold(raw)
+    assert agg.fold(copy.deepcopy(raw)) == ([], [], [])
+
+
+def test_changed_week_is_replaced(raw):
+    agg = LeagueAggregator()
+    agg.fold(raw)
+    edited = copy.deepcopy(raw)
+    week = edited["week_3"][0]["stats"]
+    week["PTS"] = str(float(week["PTS"]) + 10)
+    assert agg.fold(edited) == ([], [3], [])
+    assert agg.to_records() == _fresh(edited)
+
+
+def test_removed_week_is_dropped(raw, tmp_path):
+    agg = LeagueAggregator()
+    agg.fold(raw)
+    path = str(tmp_path / "state.pkl")
+    agg.save(path)
+    trimmed = {key: teams for key, teams in raw.items() if key != "week_10"}
+    agg = LeagueAggregator.load(path)
+    assert agg.fold(trimmed) == ([], [], [10])
+    assert agg.to_records() == _fresh(trimmed)
@@ -0,0 +1,60 @@
+import gc
+import os
+import shutil
+import sqlite3
+
+import pytest
+from chromadb.api.shared_system_client import SharedSystemClient
+
+from fake_models import FakeChatModel, FakeEmbeddings
+import leagues
+from leagues import DEFAULT_LEAGUE, LeagueRegistry
+from runtime import ChatbotRuntime
+
+
+@pytest.fixture
+def registry(tmp_path):
+    chroma_dir = str(tmp_path / "chroma")
+
+    def factory(players_path, teams_path, _chroma_dir, **kwargs):
+        kwargs["cache_dir"] = str(tmp_path / "cache")
+        return ChatbotRuntime(players_path, teams_path, chroma_dir, tracing=False, **kwargs)
+
+    registry = LeagueRegistry(embeddings=FakeEmbeddings(), llm=FakeChatModel(), factory=factory)
+    registry.chroma_dir = chroma_dir
+    return registry
+
+
+def test_evicted_runtime_stays_usable_until_released(registry):
+    runtime = registry.get(DEFAULT_LEAGUE)
+    cache = runtime.answer_cache
+    registry.evict(DEFAULT_LEAGUE)
+
+    # Çıkarılan lig o anda bir istekte kullanılıyor olabilir
+    assert runtime.retriever.invoke("How is Trae Young doing?")
+    runtime.answer_cache.store("STATS", "q", runtime.data_version, "a", [])
+    assert runtime.answer_cache.lookup("STATS", "q", runtime.data_version) is not None
+
+    del runtime
+    gc.collect()
+    with pytest.raises(sqlite3.ProgrammingError):
+        cache.lookup("STATS", "q", "v")
+    assert registry.chroma_dir not in SharedSystemClient._identifier_to_system
+
+
+def test_stats_file_change_rebuilds_runtime(registry, tmp_path, monkeypatch):
+    paths = leagues.league_paths(DEFAULT_LEAGUE)
+    data_dir = str(tmp_path / "data")
+    shutil.copytree(paths["data_dir"], data_dir)
+    monkeypatch.setattr(leagues, "league_paths", lambda league_id=DEFAULT_LEAGUE: {
+        **paths, "data_dir": data_dir,
+        **{k: os.path.join(data_dir, os.path.basename(paths[k])) for k in ("players_path", "teams_path", "stats_path")}})
+
+    runtime = registry.get(DEFAULT_LEAGUE)
+    assert registry.get(DEFAULT_LEAGUE) is runtime
+    # Sadece haftalık istatistikler değişti: eşleşme simülatörü ve data_version eskimesin
+    with open(os.path.join(data_dir, "nba_league_stats.json"), "a", encoding="utf-8") as f:
+        f.write("\n")
+    rebuilt = registry.get(DEFAULT_LEAGUE)
+    assert rebuilt is not runtime and rebuilt.data_version != runtime.data_version
+    assert registry.counts["reloads"] == 1
@@ -0,0 +1,15 @@
+from matchup_sim import mentions_matchup, parse_question
+from text_utils import fold_text
+
+
+def test_bare_vs_and_kazan_need_team_context():
+    assert not mentions_matchup(fold_text("LeBron vs Curry, who scores more?"))
+    assert not mentions_matchup(fold_text("En çok puan kazanan oyuncu kim?"))
+    assert mentions_matchup(fold_text("Bu hafta takımım kazanır mı?"))
+    assert mentions_matchup(fold_text("Will I beat Haramball?"))
+
+
+def test_vs_between_two_teams_is_a_matchup():
+    teams = ["Haramball", "Kadıköy Bulls"]
+    assert parse_question("Haramball vs Kadıköy Bulls", teams) == ("matchup", ("Haramball", "Kadıköy Bulls"))
+    assert parse_question("LeBron vs Curry", []) is None
@@ -0,0 +1,26 @@
+import pytest
+
+from entity_index import EntityIndex
+from query_filters import QueryFilterParser
+
+
+@pytest.fixture(scope="module")
+def parse(league):
+    players, teams = league
+    index = EntityIndex(players, teams)
+    parser = QueryFilterParser({t["team_name"] for t in teams} | {p["current_team"] for p in players})
+
+    def run(question):
+        match = index.match(question)
+        return parser.parse(question, match["ids"] if match["resolved"] else ())
+    return run
+
+
+def test_named_player_is_not_a_position_filter(parse):
+    assert parse("Is Trae Young a good center?") is None
+    assert parse("Is Trae Young averaging more than 20 points?") is None
+
+
+def test_list_questions_keep_their_filters(parse):
+    assert parse("Who are the best centers like Trae Young?")["positions"] == ["C"]
+    assert parse("best free-agent centers")["team"] == "Free Agent"
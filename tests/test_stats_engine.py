@@ -0,0 +1,41 @@
+import pytest
+
+from entity_index import EntityIndex
+from stats_engine import StatsIndex
+
+
+@pytest.fixture(scope="module")
+def indexes(league):
+    players, teams = league
+    return StatsIndex(players, teams), EntityIndex(players, teams)
+
+
+def _query(indexes, text):
+    stats, entities = indexes
+    match = entities.match(text)
+    return stats.query(text, match["ids"] if match["resolved"] else ())
+
+
+def test_ranking_question_uses_whole_league(indexes):
+    result = _query(indexes, "Who has the most blocks?")
+    assert result["query"]["ids"] == []
+    assert len(result["rows"]) == 5
+
+
+def test_comparison_is_restricted_to_named_players(indexes):
+    result = _query(indexes, "Who has more rebounds, Jokic or Embiid?")
+    names = [row["name"] for row in result["rows"]]
+    assert names == ["Nikola Jokić", "Joel Embiid"]
+
+
+def test_comparison_direction_for_lower_is_better(indexes):
+    result = _query(indexes, "Who has fewer turnovers, Jokic or Embiid?")
+    assert result["query"]["ascending"]
+    values = [row["value"] for row in result["rows"]]
+    assert values == sorted(values)
+
+
+def test_team_comparison(indexes):
+    result = _query(indexes, "Which team has more steals, Haramball or Kadıköy Bulls?")
+    assert result["query"]["entity"] == "team"
+    assert {row["name"] for row in result["rows"]} == {"Haramball", "Kadıköy Bulls"}
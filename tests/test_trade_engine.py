@@ -0,0 +1,29 @@
+import pytest
+
+from trade_engine import TradeIndex
+
+
+@pytest.fixture(scope="module")
+def index(league):
+    return TradeIndex(league[0])
+
+
+def _ids(index, *names):
+    by_name = {record["name"]: record["id"] for record in index.records}
+    return [by_name[name] for name in names]
+
+
+@pytest.mark.parametrize("question", [
+    "Should I trade Trae Young for Nikola Jokic?",
+    "Should I get Nikola Jokic for Trae Young?",
+    "Trae Young'ı verip Nikola Jokic'i alsam mı?",
+])
+def test_trade_direction(index, question):
+    young, jokic = _ids(index, "Trae Young", "Nikola Jokić")
+    ids = [young, jokic] if question.index("Trae") < question.index("Jokic") else [jokic, young]
+    assert index.parse_sides(question, ids) == ([young], [jokic])
+
+
+def test_negated_need_is_not_a_need():
+    assert TradeIndex.parse_categories("I don't need blocks, I need assists") == {"need": ["AST"], "give": ["BLK"]}
+    assert TradeIndex.parse_categories("I need rebounds but I can't give up blocks") == {"need": ["REB"], "give": []}
@@ -0,0 +1,20 @@
+import re
+import unicodedata
+
+# NFKD ile ayrışmayan Türkçe/Latin harfler
+_EXTRA_FOLD = str.maketrans({"ı": "i", "ø": "o", "ł": "l", "đ": "d", "ß": "ss"})
+
+
+def fold_text(text, casefold=True):
+    """Büyük/küçük harf ve aksanları yok sayarak karşılaştırma için metni sadeleştirir.
+
+    "Kadıköy Bulls" -> "kadikoy bulls", "Señor Popovich" -> "senor popovich"
+    casefold=False ile harf büyüklüğü korunur (kelime bölünmesi aynı kalır).
+    """
+    if casefold:
+        text = text.casefold()
+    text = text.translate(_EXTRA_FOLD)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w%/]+", " ", text)
+    return " ".join(text.split())
@@ -0,0 +1,227 @@
+"""RAG akışı için istek başına izleme (trace).
+
+Her istek için aşama başına bir span kaydedilir: süre, durum, giriş/çıkış token
+sayıları, getirilen döküman ID'leri ve niyet. İzler dönen (rotating) bir JSONL
+dosyasına yazılır, son N isteğin aşama süreleri bellekte tutulur ve p50/p95
+buradan hesaplanır (Streamlit yan paneli).
+
+Açmak için RAG_TRACING=1 (varsayılan kapalı); kapalıyken Tracer.start None
+döndürür ve akış hiçbir ek iş yapmaz. Tüm Tracer'lar tek "rag_trace" logger'ını
+kullanır; her iz dosyasının tek bir handler'ı vardır ve kayıtlar `extra`daki
+dosya yoluna göre ilgili handler'a gider.
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+# LLM çağrıları bu değişkendeki handler'ı kendiliğinden alır (langchain configure hook'u)
+_usage_handler = contextvars.ContextVar("rag_token_usage", default=None)
+register_configure_hook(_usage_handler, inheritable=True)
+
+
+logger = logging.getLogger("rag_trace")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_handlers = {}  # iz dosyası -> [handler, onu kullanan Tracer sayısı]
+_handlers_lock = threading.Lock()
+
+
+class _PathFilter(logging.Filter):
+    """Handler'a sadece kendi dosyasının kayıtlarını geçirir."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def filter(self, record):
+        return getattr(record, "trace_path", None) == self.path
+
+
+def _acquire_handler(path, max_bytes, backups):
+    with _handlers_lock:
+        entry = _handlers.get(path)
+        if entry is None:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                          encoding="utf-8", delay=True)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            handler.addFilter(_PathFilter(path))
+            logger.addHandler(handler)
+            entry = _handlers[path] = [handler, 0]
+        entry[1] += 1
+
+
+def _release_handler(path):
+    with _handlers_lock:
+        entry = _handlers.get(path)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del _handlers[path]
+            logger.removeHandler(entry[0])
+            entry[0].close()
+
+
+def tracing_enabled():
+    return os.getenv("RAG_TRACING", "0").strip().lower() in ("1", "true", "yes", "on")
+
+
+class TokenUsage(BaseCallbackHandler):
+    """LLM cevaplarındaki usage_metadata'yı toplar (model token sayısı vermezse 0 kalır)."""
+
+    # Async akışta her token olayı için thread havuzuna gidilmesin; handler sadece sayı topluyor
+    run_inline = True
+
+    def __init__(self):
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+        self.model = None
+
+    def on_llm_end(self, response, **kwargs):
+        self.calls += 1
+        for generations in response.generations:
+            for generation in generations:
+                message = getattr(generation, "message", None)
+                usage = getattr(message, "usage_metadata", None)
+                if usage:
+                    self.input_tokens += usage.get("input_tokens", 0)
+                    self.output_tokens += usage.get("output_tokens", 0)
+                if message is not None and self.model is None:
+                    self.model = (message.response_metadata or {}).get("model_name")
+
+    @property
+    def reported(self):
+        return bool(self.input_tokens or self.output_tokens)
+
+    def as_dict(self):
+        return {"llm_calls": self.calls, "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens, "model": self.model}
+
+
+@contextmanager
+def capture_usage(usage):
+    """Blok içinde (aynı async görevde) yapılan tüm LLM çağrılarının token'larını `usage`'a yazar."""
+    token = _usage_handler.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage_handler.reset(token)
+
+
+class Trace:
+    """Tek isteğin izi. Span süreleri pipeline.StageTimer'dan, öznitelikler annotate ile gelir."""
+
+    def __init__(self, query):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.started_at = time.time()
+        self.query = query
+        self.attrs = {}
+        self.span_attrs = {}
+
+    def annotate(self, span, **attrs):
+        self.span_attrs.setdefault(span, {}).update(attrs)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_record(self, stages, error=None):
+        spans = []
+        for name, stage in sorted(stages.items(), key=lambda item: item[1]["start_ms"]):
+            spans.append({"name": name, **stage, **self.span_attrs.get(name, {})})
+        for name, attrs in self.span_attrs.items():
+            if name not in stages:
+                spans.append({"name": name, **attrs})
+        record = {
+            "trace_id": self.trace_id,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started_at)),
+            "query": self.query,
+            **self.attrs,
+            "spans": spans,
+        }
+        if error is not None:
+            record["error"] = f"{type(error).__name__}: {error}"
+        return record
+
+
+class Tracer:
+    """İzleri dönen JSONL dosyasına yazar ve aşama başına kayan p50/p95 tutar."""
+
+    def __init__(self, path, enabled=None, max_bytes=5 * 2 ** 20, backups=3, window=500):
+        self.path = os.path.abspath(path)
+        self.enabled = tracing_enabled() if enabled is None else enabled
+        self.recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._open = False
+        if self.enabled:
+            # Aynı dosyaya yazan Tracer'lar (ör. lig yeniden yüklenirken eski ve yeni runtime) handler'ı paylaşır
+            _acquire_handler(self.path, max_bytes, backups)
+            self._open = True
+
+    def close(self):
+        with self._lock:
+            if not self._open:
+                return
+            self._open = False
+        _release_handler(self.path)
+
+    def start(self, query):
+        """Kapalıyken None; akış tüm izleme adımlarını bu kontrolle atlar."""
+        return Trace(query) if self.enabled else None
+
+    def finish(self, trace, stages, error=None):
+        record = trace.to_record(stages, error)
+        sample = {span["name"]: span["ms"] for span in record["spans"]
+                  if "ms" in span and span.get("status") == "ok"}
+        if "total_ms" in record:
+            sample["total"] = record["total_ms"]
+        if "ttft_ms" in record:
+            sample["ttft"] = record["ttft_ms"]
+        tokens = record.get("tokens") or {}
+        with self._lock:
+            self.recent.append({"ms": sample, "input_tokens": tokens.get("input_tokens", 0),
+                                "output_tokens": tokens.get("output_tokens", 0)})
+        try:
+            logger.info(json.dumps(record, ensure_ascii=False, default=str), extra={"trace_path": self.path})
+        except Exception as e:
+            logging.getLogger(__name__).warning("İz yazılamadı: %s", e)
+        return record
+
+    def stage_stats(self):
+        """{aşama: {"n", "p50", "p95"}} (ms), son `window` istek üzerinden."""
+        with self._lock:
+            samples = list(self.recent)
+        by_stage = {}
+        for sample in samples:
+            for name, ms in sample["ms"].items():
+                by_stage.setdefault(name, []).append(ms)
+        stats = {}
+        for name, values in by_stage.items():
+            arr = np.asarray(values, dtype=float)
+            stats[name] = {"n": len(values), "p50": round(float(np.percentile(arr, 50)), 1),
+                           "p95": round(float(np.percentile(arr, 95)), 1)}
+        return stats
+
+    def token_stats(self):
+        with self._lock:
+            samples = list(self.recent)
+        if not samples:
+            return {"requests": 0}
+        return {
+            "requests": len(samples),
+            "avg_input_tokens": round(sum(s["input_tokens"] for s in samples) / len(samples), 1),
+            "avg_output_tokens": round(sum(s["output_tokens"] for s in samples) / len(samples), 1),
+        }
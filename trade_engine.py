@@ -0,0 +1,332 @@
+"""TRADE niyeti için 9 kategorili z-skor matrisi üzerinde benzerlik ve ihtiyaç sorguları.
+
+Her oyuncu için PTS, REB, AST, ST, BLK, 3PTM, TO ortalamaları ve FG%/FT% etkisi
+bir NumPy matrisine z-skor olarak yazılır. Yüzdeler hacimle ağırlıklıdır: maç
+başına (isabet - lig oranı x deneme), yani 2/2 atan yedek ile 10/20 atan
+yıldız aynı sayılmaz. TO ters çevrilir (pozitif her zaman iyi). Böylece
+"X'e denk kim var?" (en yakın komşular) ve "blok lazım, asist verebilirim"
+(kategori ihtiyacı) soruları tüm lig üzerinde milisaniyeler içinde cevaplanır;
+LLM sadece sonucu açıklar.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+from stats_engine import CATEGORIES, FREE_AGENT, STAT_PATTERNS, _RAW_STAT_PATTERNS, players_frame
+from text_utils import fold_text
+
+NINE_CATS = CATEGORIES + ["FG%", "FT%"]
+LOWER_IS_BETTER = {"TO"}
+# Yapılan/denenen atış soruları da yüzde kategorisine sayılır
+_STAT_TO_CAT = {"FGM": "FG%", "FGA": "FG%", "FTM": "FT%", "FTA": "FT%"}
+
+_GIVE = (r"\b(give|give up|giving|spare|sacrifice\w*|afford to lose|trade away|offer\w*|"
+         r"verebilirim|verebilir\w*|feda\w*|vazgec\w*)\b")
+_NEED = (r"\b(need\w*|more|want|improve|boost|help with|weak\w*|lack\w*|"
+         r"lazim|ihtiyac\w*|artir\w*|guclen\w*)\b")
+_CLAUSE = r"[,.;!?]|\b(?:but|while|ama|fakat|ancak)\b"
+_FAIR = r"\b(fair|similar|equivalent|comparable|same value|like|denk|benzer|esdeger)\b"
+# "I don't need blocks" / "blok lazım değil": ihtiyaç değil, verilebilir kategori
+_NEGATION = r"\b(don t|dont|do not|doesn t|can t|cant|cannot|won t|not|no|never|without|degil|yok|istemiyorum|gerek yok)\b"
+
+# Takas yönü: İngilizcede ipucu ismin önünde ("trade X for Y", "get Y"), Türkçede fiil
+# ismin arkasında ("X'i verip Y'yi alsam") gelir. "for" bir önceki oyuncunun tersidir.
+_SIDE_BEFORE = [
+    (r"\b(give|giving|gave|send\w*|trade|trading|offer\w*|spare|deal)\b", "give"),
+    (r"\b(get|getting|receiv\w*|acquir\w*|take|taking|land)\b", "get"),
+    (r"\b(for|karsiliginda)\b", "for"),
+]
+_SIDE_AFTER = [
+    (r"\b(ver|verip|versem|verir\w*|verebilir\w*|vermek\w*|gonder\w*)\b", "give"),
+    (r"\b(al|alip|alsam|alir\w*|alabilir\w*|almak\w*)\b", "get"),
+]
+
+DEFAULT_K = 5
+# İhtiyaç sorgusunda verilen oyuncuyla değer farkının ceza katsayısı (adil takas)
+FAIRNESS = 0.3
+
+
+def _games(frame):
+    """Maç sayısı tahmini: en büyük ortalamaya sahip kategoride TOTAL / AVG (yuvarlama hatası en az)."""
+    avg = np.column_stack([frame[f"AVG_{c}"].to_numpy(float) for c in CATEGORIES])
+    total = np.column_stack([frame[f"TOTAL_{c}"].to_numpy(float) for c in CATEGORIES])
+    best = avg.argmax(axis=1)
+    rows = np.arange(len(frame))
+    best_avg, best_total = avg[rows, best], total[rows, best]
+    return np.divide(best_total, best_avg, out=np.zeros(len(frame)), where=best_avg > 0)
+
+
+def _zscore(values, active):
+    pool = values[active]
+    if pool.size == 0:
+        return np.zeros_like(values)
+    std = pool.std()
+    return (values - pool.mean()) / (std if std > 0 else 1.0)
+
+
+def _smallest(keys, k):
+    """keys içinde en küçük k değerin sıralı konumları (tüm diziyi sıralamadan)."""
+    if k < keys.size:
+        part = np.argpartition(keys, k)[:k]
+        return part[np.argsort(keys[part], kind="stable")]
+    return np.argsort(keys, kind="stable")
+
+
+class TradeIndex:
+    """Oyuncuların 9 kategori z-skorları (n x 9) ve toplam değerleri."""
+
+    def __init__(self, players):
+        frame = players_frame(players).reset_index(drop=True)
+        self.size = len(frame)
+        self.records = frame[["id", "name", "current_team", "position"]].to_dict("records")
+        self._index = {record["id"]: i for i, record in enumerate(self.records)}
+        self.teams = frame["current_team"].to_numpy()
+        # Takım maskeleri string karşılaştırması yerine tam sayı kodlarıyla
+        self._team_codes, uniques = pd.factorize(frame["current_team"])
+        self._team_code = {name: code for code, name in enumerate(uniques)}
+
+        self.games = _games(frame)
+        self.active = self.games > 0
+        columns = []
+        for cat in CATEGORIES:
+            z = _zscore(frame[f"AVG_{cat}"].to_numpy(float), self.active)
+            columns.append(-z if cat in LOWER_IS_BETTER else z)
+        for made_col, att_col in (("FGM", "FGA"), ("FTM", "FTA")):
+            made, att = frame[made_col].to_numpy(float), frame[att_col].to_numpy(float)
+            league_pct = made[self.active].sum() / max(att[self.active].sum(), 1.0)
+            safe_games = np.where(self.active, self.games, 1.0)
+            impact = (made - league_pct * att) / safe_games
+            columns.append(_zscore(impact, self.active))
+        self.z = np.column_stack(columns)
+        self.z[~self.active] = 0.0
+        self.value = self.z.sum(axis=1)
+        self.cat_index = {cat: i for i, cat in enumerate(NINE_CATS)}
+
+    def index_of(self, record_id):
+        return self._index.get(record_id)
+
+    def _row(self, idx, **extra):
+        record = self.records[idx]
+        return {
+            "id": record["id"], "name": record["name"], "team": record["current_team"],
+            "position": record["position"], "value": round(float(self.value[idx]), 2),
+            "z": {cat: round(float(self.z[idx, j]), 2) for j, cat in enumerate(NINE_CATS)},
+            **extra,
+        }
+
+    def _candidates(self, exclude=(), team=None):
+        mask = self.active.copy()
+        for idx in exclude:
+            mask[idx] = False
+        if team is not None and team != FREE_AGENT:
+            # Aynı fantasy takımdan takas önerilmez
+            mask &= self._team_codes != self._team_code.get(team, -2)
+        return mask
+
+    def similar(self, record_id, k=DEFAULT_K):
+        """Kategori profili (z vektörü) en yakın k oyuncu; oyuncunun kendi takımındakiler hariç."""
+        idx = self.index_of(record_id)
+        if idx is None:
+            return []
+        diff = self.z - self.z[idx]
+        dist = np.einsum("ij,ij->i", diff, diff)
+        dist[~self._candidates([idx], self.teams[idx])] = np.inf
+        order = _smallest(dist, min(k, int(np.isfinite(dist).sum())))
+        return [self._row(i, distance=round(float(np.sqrt(dist[i])), 2)) for i in order]
+
+    def need(self, need, give=(), offer_id=None, team=None, k=DEFAULT_K):
+        """İhtiyaç kategorilerinde en güçlü oyuncular.
+
+        offer_id verilirse toplam değeri ona yakın olanlar öne çıkar (adil takas); team verilirse o
+        takımın oyuncuları aday olmaz ve takımdan verilebilecek oyuncular `offers` olarak döner.
+        """
+        need_cols = [self.cat_index[c] for c in need]
+        give_cols = [self.cat_index[c] for c in give]
+        offer = self.index_of(offer_id) if offer_id else None
+        if team is None and offer is not None and self.teams[offer] != FREE_AGENT:
+            team = self.teams[offer]
+
+        score = self.z[:, need_cols].sum(axis=1)
+        if offer is not None:
+            score = score - FAIRNESS * np.abs(self.value - self.value[offer])
+        exclude = [offer] if offer is not None else []
+        candidates = np.flatnonzero(self._candidates(exclude, team))
+        order = candidates[_smallest(-score[candidates], k)]
+        targets = [self._row(i, need_score=round(float(self.z[i, need_cols].sum()), 2)) for i in order]
+
+        offers = []
+        if team is not None and team != FREE_AGENT and offer is None:
+            # Takımdan verilebilecekler: verilebilir kategorilerde güçlü, ihtiyaç kategorilerinde zayıf
+            own = np.flatnonzero(self.active & (self._team_codes == self._team_code.get(team, -2)))
+            own_score = self.z[own][:, give_cols].sum(axis=1) - self.z[own][:, need_cols].sum(axis=1)
+            offers = [self._row(i) for i in own[_smallest(-own_score, k)]]
+        return {"targets": targets, "offers": offers,
+                "offer": self._row(offer) if offer is not None else None, "team": team}
+
+    def _position(self, tokens, idx):
+        """Oyuncu adının soru kelimeleri içindeki ilk konumu (tam ad, yoksa ad/soyad); yoksa None."""
+        name = fold_text(self.records[idx]["name"]).split()
+        for start in range(len(tokens) - len(name) + 1):
+            if tokens[start:start + len(name)] == name:
+                return start
+        for part in reversed(name):
+            if len(part) >= 4 and part in tokens:
+                return tokens.index(part)
+        return None
+
+    def parse_sides(self, text, player_ids):
+        """Sorudaki oyuncuları verilecek/alınacak diye ayırır: (give_ids, get_ids).
+
+        Yön ipucu yoksa eski kural geçerli: ilk oyuncu verilir, kalanlar alınır.
+        """
+        tokens = fold_text(text).split()
+        joined = " ".join(tokens)
+        events = []
+        for idx_id in player_ids:
+            position = self._position(tokens, self.index_of(idx_id))
+            if position is not None:
+                events.append((position, 1, "name", idx_id))
+        for patterns, kind in ((_SIDE_BEFORE, "before"), (_SIDE_AFTER, "after")):
+            for pattern, side in patterns:
+                for m in re.finditer(pattern, joined):
+                    events.append((len(joined[:m.start()].split()), 0, kind, side))
+        events.sort(key=lambda e: (e[0], e[1]))
+
+        sides, pending, role, last = {}, [], None, None
+        for _, _, kind, value in events:
+            if kind == "name":
+                if role is not None:
+                    sides[value] = last = role
+                else:
+                    pending.append(value)
+            elif kind == "before":
+                if value == "for":
+                    role = "get" if last != "get" else "give"
+                else:
+                    role = value
+            else:
+                for record_id in pending:
+                    sides[record_id] = last = value
+                pending, role = [], None
+
+        if not sides:
+            return list(player_ids[:1]), list(player_ids[1:])
+        assigned = set(sides.values())
+        # Yönü belli olmayanlar tek taraf belliyse karşı tarafa, değilse alınanlara yazılır
+        rest = "get" if assigned != {"get"} else "give"
+        give = [r for r in player_ids if sides.get(r, rest) == "give"]
+        get = [r for r in player_ids if sides.get(r, rest) == "get"]
+        return give, get
+
+    def compare(self, give_ids, get_ids):
+        """Verilen ve alınan oyuncuların kategori bazında net z değişimi."""
+        give = [i for i in (self.index_of(r) for r in give_ids) if i is not None]
+        get = [i for i in (self.index_of(r) for r in get_ids) if i is not None]
+        delta = self.z[get].sum(axis=0) - self.z[give].sum(axis=0)
+        return {
+            "give": [self._row(i) for i in give],
+            "get": [self._row(i) for i in get],
+            "delta": {cat: round(float(delta[j]), 2) for j, cat in enumerate(NINE_CATS)},
+            "value_change": round(float(delta.sum()), 2),
+        }
+
+    @staticmethod
+    def parse_categories(text):
+        """{"need": [...], "give": [...]} — cümle parçalarına bölünür, her parçanın rolü ipucu
+        kelimelerinden (need/more/lazım ya da give/spare/verebilirim) belirlenir."""
+        need, give = [], []
+        role = "need"
+        raw_clauses = re.split(_CLAUSE, text)
+        for raw in raw_clauses:
+            clause = fold_text(raw)
+            negated = re.search(_NEGATION, clause) is not None
+            if re.search(_GIVE, clause):
+                # "I can't give up blocks": ne ihtiyaç ne verilebilir
+                role = "keep" if negated else "give"
+            elif re.search(_NEED, clause) or negated:
+                role = "give" if negated else "need"
+            found = []
+            for pattern, stat in STAT_PATTERNS:
+                if re.search(pattern, clause):
+                    found.append(_STAT_TO_CAT.get(stat, stat))
+                    # "free throws made" hem FTM hem FT% sayılmasın
+                    clause = re.sub(pattern, " ", clause)
+            for pattern, stat in _RAW_STAT_PATTERNS:
+                if re.search(pattern, raw):
+                    found.append(stat)
+            if role == "keep":
+                continue
+            target = give if role == "give" else need
+            for cat in found:
+                if cat not in need and cat not in give:
+                    target.append(cat)
+        return {"need": need, "give": give}
+
+    def query(self, text, player_ids=(), team=None, k=DEFAULT_K):
+        """Soru ve sorudaki varlıklardan (EntityIndex) uygun analizi seçer; uygun değilse None.
+
+        - ihtiyaç kategorisi varsa: "need" (verilecek ilk oyuncu teklif sayılır)
+        - iki ya da daha çok oyuncu: "compare" (yön parse_sides ile belirlenir)
+        - tek oyuncu: "similar"
+        """
+        player_ids = [r for r in player_ids if self.index_of(r) is not None]
+        cats = self.parse_categories(text)
+        give_ids, get_ids = self.parse_sides(text, player_ids)
+        if cats["need"]:
+            result = self.need(cats["need"], cats["give"], give_ids[0] if give_ids else None, team, k)
+            return {"mode": "need", **cats, **result}
+        if len(player_ids) >= 2:
+            if not give_ids or not get_ids:
+                give_ids, get_ids = player_ids[:1], player_ids[1:]
+            return {"mode": "compare", **self.compare(give_ids, get_ids)}
+        if len(player_ids) == 1:
+            return {"mode": "similar", "player": self._row(self.index_of(player_ids[0])),
+                    "rows": self.similar(player_ids[0], k), "fair": re.search(_FAIR, fold_text(text)) is not None}
+        return None
+
+    def row_ids(self, result):
+        """Sonuçta geçen tüm oyuncu ID'leri (kaynak dökümanlar için)."""
+        rows = []
+        if result["mode"] == "need":
+            rows = ([result["offer"]] if result["offer"] else []) + result["targets"] + result["offers"]
+        elif result["mode"] == "compare":
+            rows = result["give"] + result["get"]
+        elif result["mode"] == "similar":
+            rows = [result["player"]] + result["rows"]
+        return [row["id"] for row in rows]
+
+
+def _profile(row):
+    cats = " ".join(f"{cat} {row['z'][cat]:+.1f}" for cat in NINE_CATS)
+    return f"{row['name']} ({row['team']}, {row['position']}) - value {row['value']:+.2f} | {cats}"
+
+
+def render_trade(result):
+    """Sonucu LLM'e verilecek kısa metne çevirir."""
+    lines = []
+    if result["mode"] == "similar":
+        lines.append(f"Player: {_profile(result['player'])}")
+        lines.append("Closest category profiles in the league (other fantasy teams and free agents):")
+        for i, row in enumerate(result["rows"], 1):
+            lines.append(f"{i}. {_profile(row)} | distance {row['distance']:.2f}")
+    elif result["mode"] == "compare":
+        lines.append("Giving: " + "; ".join(_profile(r) for r in result["give"]))
+        lines.append("Getting: " + "; ".join(_profile(r) for r in result["get"]))
+        delta = " ".join(f"{cat} {v:+.1f}" for cat, v in result["delta"].items())
+        lines.append(f"Net change per category: {delta}")
+        lines.append(f"Net value change: {result['value_change']:+.2f}")
+    else:
+        header = f"Need: {', '.join(result['need'])}"
+        if result["give"]:
+            header += f" | can give: {', '.join(result['give'])}"
+        lines.append(header)
+        if result["offer"]:
+            lines.append(f"Offering: {_profile(result['offer'])}")
+        lines.append("Best targets" + (" of similar overall value:" if result["offer"] else ":"))
+        for i, row in enumerate(result["targets"], 1):
+            lines.append(f"{i}. {_profile(row)} | need score {row['need_score']:+.2f}")
+        if result["offers"]:
+            lines.append(f"Players {result['team']} could offer:")
+            for i, row in enumerate(result["offers"], 1):
+                lines.append(f"{i}. {_profile(row)}")
+    return "\n".join(lines)